@@ -0,0 +1,265 @@
+"""
+Adaptadores de adquirentes
+Descrição: compila as especificações declarativas de adquirentes.py em um pipeline de
+limpeza vetorizado. Todas as adquirentes passam pelas mesmas etapas, então qualquer
+otimização feita aqui vale para todas de uma vez.
+"""
+
+import logging
+import pandas as pd
+
+from adquirentes import ADQUIRENTES
+
+
+# =========================
+# Conversores nomeados
+# =========================
+def _texto_decimal(serie):
+    return serie.astype(str).str.replace(",", ".", regex=False)
+
+
+def _nao_numericos(serie, texto, valores):
+    """Textos que viraram NaN sem estarem vazios na origem."""
+    return texto[valores.isna() & serie.notna() & (texto.str.strip().str.lower() != "nan")]
+
+
+def _dinheiro_decimal_virgula(serie):
+    """Valor com vírgula decimal; um texto que não é número interrompe a limpeza (como o .astype(float) original)."""
+    texto = _texto_decimal(serie)
+    valores = pd.to_numeric(texto, errors="coerce").astype(float)
+    invalidos = _nao_numericos(serie, texto, valores)
+    if len(invalidos):
+        exemplos = ", ".join(repr(v) for v in invalidos.unique()[:5])
+        raise ValueError(f"❌ {len(invalidos)} valor(es) inválido(s) na coluna '{serie.name}' "
+                         f"(linhas {', '.join(map(str, invalidos.index[:5]))}): {exemplos}")
+    return valores
+
+
+def _dinheiro_decimal_virgula_ou_vazio(serie):
+    """Como decimal_virgula, mas o texto que não é número vira vazio (NaN) e só é registrado no log."""
+    texto = _texto_decimal(serie)
+    valores = pd.to_numeric(texto, errors="coerce").astype(float)
+    invalidos = _nao_numericos(serie, texto, valores)
+    if len(invalidos):
+        logging.warning(f"⚠️ {len(invalidos)} valor(es) inválido(s) na coluna '{serie.name}' ficaram vazios "
+                        f"(linhas {', '.join(map(str, invalidos.index[:10]))})")
+    return valores
+
+
+def _dinheiro_numerico(serie):
+    return pd.to_numeric(serie, errors="coerce")
+
+
+CONVERSORES_DINHEIRO = {
+    "decimal_virgula": _dinheiro_decimal_virgula,
+    "decimal_virgula_ou_vazio": _dinheiro_decimal_virgula_ou_vazio,
+    "numerico": _dinheiro_numerico,
+}
+
+
+def _converter_data(serie, formato):
+    if formato == "dia_primeiro":
+        return pd.to_datetime(serie, dayfirst=True, errors="coerce")
+    return pd.to_datetime(serie, format=formato, errors="coerce")
+
+
+def _inteiro_ou_um(serie):
+    """Parcela vazia (ex: venda no débito) é tratada como parcela 1 de 1."""
+    return pd.to_numeric(serie, errors="coerce").fillna(1).astype(int)
+
+
+# =========================
+# Etapas do pipeline
+# =========================
+def _etapa_separar(separador):
+    def etapa(df):
+        if df.shape[1] == 1:
+            df = df.iloc[:, 0].str.split(separador, expand=True)
+        return df
+    return etapa
+
+
+def _etapa_cabecalho(spec_cabecalho):
+    if "nomes" in spec_cabecalho:
+        nomes = list(spec_cabecalho["nomes"])
+
+        def etapa(df):
+            if df.shape[1] == len(nomes):
+                df.columns = nomes
+            return df
+        return etapa
+
+    marcador = spec_cabecalho["marcador"].strip().lower()
+    limite = spec_cabecalho.get("limite_busca", 50)
+
+    def etapa(df):
+        # Procura a linha de cabeçalho de forma vetorizada nas primeiras linhas
+        topo = df.head(limite).astype(str).apply(lambda col: col.str.strip().str.lower())
+        linhas = topo.index[(topo == marcador).any(axis=1)]
+        if len(linhas) == 0:
+            raise ValueError(f"❌ Cabeçalho não encontrado (coluna '{spec_cabecalho['marcador']}').")
+        posicao = df.index.get_loc(linhas[0])
+        df.columns = df.iloc[posicao]
+        df = df.iloc[posicao + 1:].reset_index(drop=True)
+        df.columns.name = None
+        return df
+    return etapa
+
+
+def _etapa_normalizar_colunas(df):
+    df.columns = df.columns.str.strip().str.lower()
+    return df
+
+
+def _etapa_parcela(spec_parcela):
+    tipo = spec_parcela["tipo"]
+    destino = spec_parcela.get("destino", ["PARCELA", "TOTAL_PARCELAS"])
+
+    if tipo == "colunas":
+        origem = spec_parcela["origem"]
+
+        def etapa(df):
+            df[destino[0]] = _inteiro_ou_um(df[origem[0]])
+            df[destino[1]] = _inteiro_ou_um(df[origem[1]])
+            return df
+        return etapa
+
+    if tipo == "texto":
+        origem, padrao = spec_parcela["origem"], spec_parcela["padrao"]
+
+        def etapa(df):
+            df[destino] = df[origem].str.extract(padrao)
+            df[destino[0]] = _inteiro_ou_um(df[destino[0]])
+            df[destino[1]] = _inteiro_ou_um(df[destino[1]])
+            return df
+        return etapa
+
+    if tipo == "fixo":
+        origem, largura = spec_parcela["origem"], spec_parcela["largura"]
+        meio = largura // 2
+
+        def etapa(df):
+            texto = df[origem].astype(str).str.zfill(largura)
+            df = df.drop(columns=[origem])
+            df[destino[0]] = texto.str[:meio].astype(int)
+            df[destino[1]] = texto.str[meio:].astype(int)
+            return df
+        return etapa
+
+    raise ValueError(f"Tipo de parcela desconhecido: {tipo}")
+
+
+def _mascara_desvio(df, regra):
+    coluna = df[regra["coluna"]]
+    if regra.get("nulo"):
+        return coluna.isna()
+    if "igual" in regra:
+        return coluna.isin(regra["igual"])
+    return coluna.astype(str).str.lower().str.contains(regra["contem"], na=False)
+
+
+# =========================
+# Adaptador compilado
+# =========================
+class Adaptador:
+    """Pipeline de leitura e limpeza compilado a partir de uma especificação."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.nome = spec["nome"]
+        self.rotulo = spec["rotulo"]
+        self.desvios = spec.get("desvios", [])
+        self.etapas = self._compilar(spec)
+
+    @staticmethod
+    def _compilar(spec):
+        etapas = []
+        if spec.get("separador_interno"):
+            etapas.append(_etapa_separar(spec["separador_interno"]))
+        etapas.append(_etapa_cabecalho(spec["cabecalho"]))
+        if spec.get("normalizar_colunas"):
+            etapas.append(_etapa_normalizar_colunas)
+        if spec.get("colunas"):
+            mapa = dict(spec["colunas"])
+            etapas.append(lambda df: df.rename(columns=mapa))
+        if spec.get("manter_antes"):
+            manter_antes = list(spec["manter_antes"])
+            etapas.append(lambda df: df.filter(items=manter_antes))
+
+        conversores = [(col, CONVERSORES_DINHEIRO[nome]) for col, nome in spec.get("dinheiro", {}).items()]
+        if conversores:
+            def etapa_dinheiro(df):
+                for col, conversor in conversores:
+                    df[col] = conversor(df[col])
+                return df
+            etapas.append(etapa_dinheiro)
+
+        if spec.get("parcela"):
+            etapas.append(_etapa_parcela(spec["parcela"]))
+
+        datas = dict(spec.get("datas", {}))
+        if datas:
+            def etapa_datas(df):
+                for col, formato in datas.items():
+                    df[col] = _converter_data(df[col], formato)
+                return df
+            etapas.append(etapa_datas)
+
+        numericos = list(spec.get("numericos", []))
+        if numericos:
+            def etapa_numericos(df):
+                for col in numericos:
+                    df[col] = pd.to_numeric(df[col], errors="coerce")
+                return df
+            etapas.append(etapa_numericos)
+
+        if spec.get("manter"):
+            manter = list(spec["manter"])
+            etapas.append(lambda df: df.filter(items=manter))
+        return etapas
+
+    def ler(self, arquivo):
+        """Lê o arquivo bruto da adquirente conforme a especificação."""
+        leitura = self.spec["leitura"]
+        opcoes = dict(leitura.get("opcoes", {}))
+        if leitura["formato"] == "csv":
+            return pd.read_csv(arquivo, **opcoes)
+        return pd.read_excel(arquivo, **opcoes)
+
+    def limpar(self, df):
+        """
+        Aplica o pipeline de limpeza e separa as linhas desviadas.
+        Retorna (df_limpo, desvios), onde desvios é um dicionário aba -> DataFrame.
+        """
+        for etapa in self.etapas:
+            df = etapa(df)
+
+        desvios = {}
+        retirar = pd.Series(False, index=df.index)
+        for regra in self.desvios:
+            mascara = _mascara_desvio(df, regra)
+            if regra.get("aba"):
+                desvios[regra["aba"]] = df[mascara].copy()
+            if regra["acao"] in ("remover", "descartar"):
+                retirar |= mascara
+
+        if retirar.any():
+            df = df[~retirar]
+        logging.debug(f"🧹 {self.rotulo}: {len(df)} linhas após limpeza, desvios: { {k: len(v) for k, v in desvios.items()} }")
+        return df, desvios
+
+    def fora_das_pendencias(self, df):
+        """Máscara das linhas que não devem aparecer como 'Não conciliado'."""
+        mascara = pd.Series(False, index=df.index)
+        for regra in self.desvios:
+            if regra.get("fora_das_pendencias") and regra["coluna"] in df.columns:
+                mascara |= _mascara_desvio(df, regra)
+        return mascara
+
+
+# Compilados uma única vez, na importação
+ADAPTADORES = {nome: Adaptador(spec) for nome, spec in ADQUIRENTES.items()}
+
+
+def obter_adaptador(nome):
+    return ADAPTADORES[nome]
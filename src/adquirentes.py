@@ -0,0 +1,141 @@
+"""
+Cadastro das adquirentes do Concilia Fácil
+Descrição: especificações declarativas de cada adquirente (leitura, cabeçalho, mapeamento
+de colunas, conversores e linhas a desviar). Este módulo contém apenas dados, sem
+importações pesadas, para que a tela inicial possa listá-las rapidamente. As
+especificações são compiladas em pipelines de limpeza por adaptadores.py.
+
+Para cadastrar uma nova adquirente (ex: Rede, Stone) basta acrescentar uma entrada em
+ADQUIRENTES descrevendo o layout do arquivo dela.
+"""
+
+# =========================
+# Cielo
+# =========================
+CIELO = {
+    "nome": "cielo",
+    "rotulo": "Cielo",
+    "logo": "logos/cielo.png",
+    "modulo": "cielo",
+    "tipos_arquivo": ["xlsx"],
+    "leitura": {"formato": "excel", "opcoes": {"engine": "openpyxl"}},
+    # O relatório da Cielo tem um bloco de textos antes da tabela; o cabeçalho é a
+    # primeira linha que contém a coluna marcadora.
+    "cabecalho": {"marcador": "código da autorização"},
+    "normalizar_colunas": True,
+    "colunas": {
+        "valor bruto": "VALOR DA PARCELA",
+        "valor líquido": "VALOR LÍQUIDO",
+        "número da parcela": "PARCELA",
+        "quantidade total de parcelas": "TOTAL_PARCELAS",
+        "código da autorização": "AUTORIZAÇÃO",
+        "nsu/doc": "NSU/DOC",
+        "data da venda": "DATA DA VENDA",
+        "data prevista de pagamento": "DATA DE VENCIMENTO",
+        "tipo de lançamento": "TIPO DE LANÇAMENTO",
+    },
+    "dinheiro": {"VALOR DA PARCELA": "decimal_virgula", "VALOR LÍQUIDO": "decimal_virgula"},
+    "parcela": {"tipo": "colunas", "origem": ["PARCELA", "TOTAL_PARCELAS"]},
+    "datas": {"DATA DA VENDA": "dia_primeiro", "DATA DE VENCIMENTO": "dia_primeiro"},
+    "manter": [
+        "VALOR DA PARCELA",
+        "VALOR LÍQUIDO",
+        "PARCELA",
+        "TOTAL_PARCELAS",
+        "AUTORIZAÇÃO",
+        "NSU/DOC",
+        "DATA DA VENDA",
+        "DATA DE VENCIMENTO",
+        "TIPO DE LANÇAMENTO",
+    ],
+    # Aluguel e estorno continuam na conciliação, mas também ganham aba própria
+    "desvios": [
+        {"aba": "Aluguel de máquina", "coluna": "TIPO DE LANÇAMENTO", "contem": "aluguel", "acao": "copiar"},
+        {"aba": "Estornos", "coluna": "TIPO DE LANÇAMENTO", "contem": "estorno", "acao": "copiar"},
+    ],
+    "pessoa_titulo": "Cielo",
+    "identificadores": [["AUTORIZAÇÃO", "Autorização"], ["NSU/DOC", "NSU"]],
+}
+
+# =========================
+# Santander (Getnet)
+# =========================
+SANTANDER = {
+    "nome": "santander",
+    "rotulo": "Santander",
+    "logo": "logos/santander.png",
+    "modulo": "santander",
+    "tipos_arquivo": ["xlsx"],
+    "leitura": {
+        "formato": "excel",
+        "opcoes": {"sheet_name": "Detalhado", "dtype": {"NÚMERO COMPROVANTE DE VENDA (NSU)": str}},
+    },
+    "cabecalho": {"marcador": "AUTORIZAÇÃO"},
+    "normalizar_colunas": False,
+    "colunas": {},
+    "manter_antes": [
+        "EC CENTRALIZADOR", "DATA DE VENCIMENTO", "TIPO DE LANÇAMENTO", "PARCELAS", "AUTORIZAÇÃO",
+        "NÚMERO COMPROVANTE DE VENDA (NSU)", "DATA DA VENDA", "VALOR DA PARCELA", "VALOR LÍQUIDO",
+        "BANDEIRA / MODALIDADE",
+    ],
+    "dinheiro": {"VALOR LÍQUIDO": "numerico", "VALOR DA PARCELA": "numerico"},
+    # Na planilha Santander a parcela vem em uma única célula ("1 de 3"); débito vem vazio
+    "parcela": {"tipo": "texto", "origem": "PARCELAS", "padrao": r"(\d+)\s+de\s+(\d+)"},
+    "datas": {"DATA DA VENDA": "%d/%m/%Y", "DATA DE VENCIMENTO": "%d/%m/%Y"},
+    "desvios": [
+        {"aba": "Cancelamentos", "coluna": "TIPO DE LANÇAMENTO", "igual": ["Cancelamento/Chargeback"], "acao": "remover"},
+        {"aba": "Aluguel e Tarifas", "coluna": "TIPO DE LANÇAMENTO", "igual": ["Aluguel/Tarifa"], "acao": "remover"},
+        {"coluna": "TIPO DE LANÇAMENTO", "igual": ["Pagamento Realizado", "Saldo Anterior"], "acao": "descartar"},
+        {"coluna": "TIPO DE LANÇAMENTO", "nulo": True, "acao": "descartar"},
+    ],
+    "pessoa_titulo": "Getnet Adquirencia E Servicos Para Meios de Pagamento S.a.",
+    "identificadores": [["AUTORIZAÇÃO", "Autorização"], ["NÚMERO COMPROVANTE DE VENDA (NSU)", "NSU"]],
+    # Conciliação por loja (estabelecimentos.py): EC -> "1o. Agrupamento" do ERP, ex:
+    # {"9784485": "LE Piauí Mat Construções"}. Também aceita estabelecimentos.json.
+    "estabelecimentos": {"coluna": "EC CENTRALIZADOR", "coluna_erp": "1o. Agrupamento", "mapa": {}},
+}
+
+# =========================
+# CredShop
+# =========================
+CREDSHOP = {
+    "nome": "credshop",
+    "rotulo": "Credshop",
+    "logo": "logos/credshop.png",
+    "modulo": "credshop",
+    "tipos_arquivo": ["csv"],
+    # O CSV da CredShop não tem cabeçalho e é separado por vírgula dentro de uma única coluna
+    "leitura": {"formato": "csv", "opcoes": {"sep": ";", "encoding": "latin1", "header": None}},
+    "separador_interno": ",",
+    "cabecalho": {
+        "nomes": [
+            "Data do Recebimento", "estabelecimento credshop", "pos", "cv", "Tipo de Lançamento",
+            "Data da Venda", "parcela", "Valor Bruto", "Taxa Credshop", "Valor Líquido",
+        ]
+    },
+    "normalizar_colunas": False,
+    "colunas": {
+        "cv": "NSU/DOC",
+        "Valor Bruto": "VALOR DA PARCELA",
+        "Data da Venda": "DATA DA VENDA",
+        "Valor Líquido": "VALOR LÍQUIDO",
+    },
+    # Valor ilegível vira vazio, como no leitor original da CredShop (na Cielo, interrompe)
+    "dinheiro": {"VALOR DA PARCELA": "decimal_virgula_ou_vazio", "Taxa Credshop": "decimal_virgula_ou_vazio",
+                 "VALOR LÍQUIDO": "decimal_virgula_ou_vazio"},
+    # "0606" -> parcela 6 de 6
+    "parcela": {"tipo": "fixo", "origem": "parcela", "largura": 4},
+    "datas": {"DATA DA VENDA": "dia_primeiro", "Data do Recebimento": "dia_primeiro"},
+    "numericos": ["NSU/DOC"],
+    # Aluguel e estorno ganham aba própria e não entram nos "Não conciliados"
+    "desvios": [
+        {"aba": "Aluguel", "coluna": "Tipo de Lançamento", "contem": "aluguel", "acao": "copiar", "fora_das_pendencias": True},
+        {"aba": "Estorno", "coluna": "Tipo de Lançamento", "contem": "estorno", "acao": "copiar", "fora_das_pendencias": True},
+    ],
+    "pessoa_titulo": "Credishop",
+    "identificadores": [["NSU/DOC", "NSU"]],
+}
+
+
+# Ordem de exibição na tela inicial
+ADQUIRENTES = {spec["nome"]: spec for spec in (SANTANDER, CIELO, CREDSHOP)}
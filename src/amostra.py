@@ -0,0 +1,181 @@
+"""
+Prévia por amostra
+Descrição: a conciliação do fechamento do mês (Santander principalmente) leva minutos, e
+um ERP errado ou do período errado só aparecia no fim. A prévia concilia uma amostra das
+vendas da adquirente contra o ERP inteiro, com as mesmas regras e parâmetros (varredura.py),
+e estima a parcela conciliada e os valores com intervalo de confiança em segundos. A
+leitura dos arquivos fica na etapa em cache (etapas.py): a conciliação completa, confirmada
+depois, não lê tudo de novo.
+
+Amostra estratificada por semana da venda x à vista/parcelado (alocação proporcional, ao
+menos MINIMO_POR_ESTRATO linhas por estrato), estimador estratificado com correção de
+população finita. Sozinhas, as linhas sorteadas quase nunca disputam um título entre si e a
+estimativa sairia otimista (no Santander, boa parte das pendências são chaves duplicadas
+desfeitas). Por isso cada linha sorteada é conciliada junto com as vizinhas que podem
+disputar os mesmos títulos (mesma parcela, data e valor próximos); só as sorteadas contam.
+
+O tamanho da amostra vem de CONCILIA_AMOSTRA (padrão 400 linhas).
+"""
+
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+TAMANHO = int(os.environ.get("CONCILIA_AMOSTRA", "400"))
+MINIMO_POR_ESTRATO = 2
+# Quantil da normal para o intervalo de 95%
+Z = 1.96
+SEMENTE = 0
+# Abaixo desta parcela conciliada (limite superior do intervalo), a prévia alerta
+LIMIAR_ALERTA = 0.5
+# Vizinhas (possíveis concorrentes pelos mesmos títulos) conciliadas com cada linha sorteada
+VIZINHOS_POR_LINHA = 20
+
+
+def estratos(df_adq):
+    """Rótulo do estrato de cada linha: semana da venda e à vista/parcelado."""
+    datas = pd.to_datetime(df_adq["DATA DA VENDA"], errors="coerce")
+    semana = datas.dt.to_period("W").astype(str).where(datas.notna(), "sem data")
+    parcelado = np.where(pd.to_numeric(df_adq["TOTAL_PARCELAS"], errors="coerce") > 1, "parcelado", "à vista")
+    return (semana + " · " + parcelado).to_numpy()
+
+
+def sortear(estrato, tamanho=TAMANHO, semente=SEMENTE):
+    """Posições da amostra, em ordem. Com `tamanho` >= linhas, a amostra é o arquivo inteiro."""
+    if tamanho >= len(estrato):
+        return np.arange(len(estrato))
+    gerador = np.random.default_rng(semente)
+    rotulos, codigos = np.unique(estrato, return_inverse=True)
+    sorteadas = []
+    for h in range(len(rotulos)):
+        posicoes = np.flatnonzero(codigos == h)
+        n = min(len(posicoes), max(MINIMO_POR_ESTRATO, round(tamanho * len(posicoes) / len(estrato))))
+        sorteadas.append(gerador.choice(posicoes, n, replace=False))
+    return np.sort(np.concatenate(sorteadas))
+
+
+def vizinhos(df_adq, posicoes, tolerancia_dias, tolerancia_valor):
+    """
+    Posições das linhas sorteadas e das que podem disputar títulos com elas: mesma parcela e
+    total, data e valor a até duas vezes a tolerância. Até VIZINHOS_POR_LINHA por linha
+    sorteada, as de valor mais próximo primeiro.
+    """
+    grupo = pd.factorize(pd.MultiIndex.from_arrays([df_adq["PARCELA"], df_adq["TOTAL_PARCELAS"]]))[0]
+    datas = pd.to_datetime(df_adq["DATA DA VENDA"], errors="coerce").to_numpy(dtype="datetime64[D]")
+    valores = pd.to_numeric(df_adq["VALOR DA PARCELA"], errors="coerce").to_numpy(dtype=np.float64)
+    por_grupo = {}
+    for g in np.unique(grupo[posicoes]):
+        membros = np.flatnonzero(grupo == g)
+        membros = membros[np.argsort(valores[membros], kind="stable")]
+        por_grupo[g] = (membros, valores[membros])
+
+    folga_valor, folga_dias = 2 * tolerancia_valor, np.timedelta64(2 * tolerancia_dias, "D")
+    escolhidas = [posicoes]
+    for p in posicoes:
+        membros, valores_grupo = por_grupo[grupo[p]]
+        inicio = np.searchsorted(valores_grupo, valores[p] - folga_valor, side="left")
+        fim = np.searchsorted(valores_grupo, valores[p] + folga_valor, side="right")
+        proximas = membros[inicio:fim]
+        # Sem data (NaT) a comparação é falsa: a linha não entra como vizinha
+        proximas = proximas[np.abs(datas[proximas] - datas[p]) <= folga_dias]
+        ordem = np.argsort(np.abs(valores[proximas] - valores[p]), kind="stable")
+        escolhidas.append(proximas[ordem[:VIZINHOS_POR_LINHA + 1]])
+    return np.unique(np.concatenate(escolhidas))
+
+
+def _total_estimado(marcadas, codigos, tamanhos, sorteados, valores=None):
+    """
+    Total estratificado das linhas `marcadas` da amostra (contagem ou soma de `valores`) e o
+    desvio padrão da estimativa. A variância de cada estrato usa a proporção suavizada em
+    direção à da amostra inteira, (marcadas + p) / (n + 1): um estrato sem nenhuma linha
+    marcada na amostra não passa a ter incerteza zero.
+    """
+    valores = np.ones(len(marcadas)) if valores is None else valores
+    geral = (marcadas.sum() + 1) / (len(marcadas) + 2)
+    total, variancia = 0.0, 0.0
+    for h, (N, n) in enumerate(zip(tamanhos, sorteados)):
+        no_estrato = codigos == h
+        y, v = valores[no_estrato] * marcadas[no_estrato], valores[no_estrato]
+        total += N * y.mean()
+        p = (marcadas[no_estrato].sum() + geral) / (n + 1)
+        dispersao = max(y.var(ddof=1) if n > 1 else 0.0, p * np.mean(v ** 2) - (p * v.mean()) ** 2)
+        variancia += N ** 2 * (1 - n / N) * dispersao / n
+    return total, np.sqrt(variancia)
+
+
+def _intervalo(estimativa, desvio, minimo, maximo):
+    return (estimativa, max(minimo, estimativa - Z * desvio), min(maximo, estimativa + Z * desvio))
+
+
+def estimar(banco, df_adq, df_erp, parametros, tamanho=TAMANHO, semente=SEMENTE):
+    """
+    Estimativa da conciliação de `df_adq` contra `df_erp` (já limpos) com os `parametros`
+    (etapas.parametros). Devolve os intervalos de 95% e as métricas no formato do painel.
+    """
+    import varredura
+
+    inicio = time.perf_counter()
+    dias, valor = parametros["tolerancia_dias"], parametros["tolerancia_valor"]
+    liquido = pd.to_numeric(df_adq["VALOR LÍQUIDO"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    total_liquido = float(liquido.sum())
+    N = len(df_adq)
+    estrato = estratos(df_adq)
+    posicoes = sortear(estrato, tamanho, semente)
+
+    conciliado = np.zeros(len(posicoes), dtype=bool)
+    conciliadas_juntas = 0
+    if len(posicoes) and len(df_erp):
+        # Na ordem do arquivo, como na conciliação completa (a busca é gulosa)
+        juntas = vizinhos(df_adq, posicoes, dias, valor)
+        conciliadas_juntas = len(juntas)
+        amostra = varredura.preparar(banco, df_adq.iloc[juntas], df_erp, dias, valor)
+        cenario = amostra.cenario(dias, valor, parametros["penalidade_pessoa"])
+        conciliado = cenario["conciliado"][np.searchsorted(juntas, posicoes)]
+
+    rotulos, codigos = np.unique(estrato[posicoes], return_inverse=True)
+    tamanhos = pd.Series(estrato).value_counts().reindex(rotulos).to_numpy()
+    sorteados = np.bincount(codigos, minlength=len(rotulos))
+    qtd, desvio_qtd = _total_estimado(conciliado, codigos, tamanhos, sorteados)
+    # O total líquido é conhecido: estima-se o não conciliado (em geral poucas linhas, menor
+    # variância) e o conciliado é o complemento
+    valor_nao, desvio_valor = _total_estimado(~conciliado, codigos, tamanhos, sorteados, liquido[posicoes])
+
+    qtd = _intervalo(qtd, desvio_qtd, 0, N)
+    valor_nao = _intervalo(valor_nao, desvio_valor, liquido[liquido < 0].sum(), liquido[liquido > 0].sum())
+    valor_conc = (total_liquido - valor_nao[0], total_liquido - valor_nao[2], total_liquido - valor_nao[1])
+    taxa = tuple(q / N for q in qtd) if N else (0.0, 0.0, 0.0)
+
+    avisos = []
+    if not len(df_erp):
+        avisos.append("❌ Nenhum título do ERP no período das vendas: confira o arquivo do ERP.")
+    elif N and taxa[2] < LIMIAR_ALERTA:
+        avisos.append(f"⚠️ No máximo {taxa[2]:.0%} das vendas devem conciliar: confira se o ERP e o "
+                      f"período são os certos antes de rodar a conciliação completa.")
+
+    segundos = round(time.perf_counter() - inicio, 2)
+    logging.info(f"🔍 Prévia {banco}: {len(posicoes)} de {N} linhas em {len(rotulos)} estratos "
+                 f"({conciliadas_juntas} com as vizinhas), "
+                 f"{taxa[0]:.1%} conciliadas (de {taxa[1]:.1%} a {taxa[2]:.1%}) em {segundos}s")
+    return {
+        "linhas": N,
+        "amostra": len(posicoes),
+        "estratos": len(rotulos),
+        "conciliadas_juntas": conciliadas_juntas,
+        "segundos": segundos,
+        "taxa": taxa,
+        "conciliados": qtd,
+        "valor_conciliado": valor_conc,
+        "valor_nao_conciliado": valor_nao,
+        "metricas": [
+            ("✅ Conciliados (estimativa)", f"R$ {valor_conc[0]:,.2f}",
+             f"R$ {valor_conc[1]:,.2f} a R$ {valor_conc[2]:,.2f}"),
+            ("⚠ Não Conciliados (estimativa)", f"R$ {valor_nao[0]:,.2f}",
+             f"R$ {valor_nao[1]:,.2f} a R$ {valor_nao[2]:,.2f}"),
+            ("📈 Taxa de conciliação", f"{taxa[0]:.1%}", f"{taxa[1]:.1%} a {taxa[2]:.1%}"),
+        ],
+        "avisos": avisos,
+    }
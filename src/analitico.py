@@ -0,0 +1,275 @@
+"""
+Modo analítico (DuckDB)
+Descrição: com históricos grandes do ERP, a junção adquirente x ERP em blocos do pandas
+(varredura._gerar_pares) passa a dominar a conciliação. Aqui os dados limpos são
+carregados num DuckDB em processo e a conciliação vira SQL:
+
+- pares candidatos: junção por parcela/total com faixa de datas e de valores;
+- pontuação: a mesma conta dos conciliadores em expressões SQL, com a similaridade dos
+  identificadores (similaridade.ratio) registrada como função vetorizada (Arrow), que
+  recebe um lote de pares por chamada e calcula cada par distinto uma vez;
+- ordem dos candidatos: row_number() por linha da adquirente, em ordem de pontuação.
+
+A atribuição continua a da varredura (varredura.py): na busca gulosa um título usado sai
+da disputa da linha seguinte e a família de parcelas confirmada vale para as próximas, o
+que é sequencial e não cabe numa janela. Por isso o resultado e as abas ("Conciliados",
+"Não conciliados", "Resumo") são os mesmos do caminho em pandas; equivalencia.py compara
+os dois como motores. Vale onde a varredura é usada: a conciliação do Santander, a prévia
+(amostra.py) e a simulação; ligado, a Cielo e a CredShop também conciliam pela varredura
+(etapas.py) em vez do motor guloso (motor.py).
+
+Histórico: cada execução grava os não conciliados em HISTORICO (CONCILIA_HISTORICO, padrão
+cache/historico.duckdb), uma linha por título, substituindo a execução anterior das mesmas
+entradas. `python analitico.py` resume os pendentes por mês; --sql consulta a tabela direto.
+
+Opcional: sem o duckdb instalado, DISPONIVEL fica False. Ligado com CONCILIA_DUCKDB=1.
+
+Uso: python analitico.py [--banco cielo] [--desde 2025-01] [--sql "SELECT ... FROM nao_conciliados"]
+"""
+
+import os
+import sys
+import logging
+import argparse
+import threading
+import importlib.util
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ingestao import COLUNA_ARQUIVO
+from estabelecimentos import COLUNA_LOJA
+from varredura import VarreduraGulosa, VarreduraSantander, _similaridades
+
+
+# duckdb é opcional (só é importado ao conciliar ou consultar o histórico)
+DISPONIVEL = importlib.util.find_spec("duckdb") is not None
+
+ATIVO = DISPONIVEL and os.environ.get("CONCILIA_DUCKDB", "0") == "1"
+HISTORICO = os.environ.get("CONCILIA_HISTORICO",
+                           os.path.join(os.environ.get("CONCILIA_CACHE", "cache"), "historico.duckdb"))
+
+NS_POR_DIA = 86_400_000_000_000
+# Diferença em dias arredondada para baixo, como o .dt.days do pandas e o kernel (o // do
+# DuckDB trunca em direção a zero: -1,5 dia daria -1 em vez de -2)
+DIAS = f"(diferenca_ns // {NS_POR_DIA} - CAST(diferenca_ns % {NS_POR_DIA} < 0 AS BIGINT))"
+
+_trava_historico = threading.Lock()
+
+
+def _ratios(textos_adq, textos_erp):
+    """similaridade.ratio de um lote de pares (arrays Arrow); nulo quando falta um dos textos."""
+    import pyarrow as pa
+
+    adq, erp = textos_adq.to_pandas(), textos_erp.to_pandas()
+    nulos = (adq.isna() | erp.isna()).to_numpy()
+    valores = _similaridades(adq.fillna("").to_numpy(object), erp.fillna("").to_numpy(object))
+    return pa.array(valores, type=pa.float64(), mask=nulos)
+
+
+def _conectar():
+    import duckdb
+
+    con = duckdb.connect()
+    # Mesma similaridade (e o mesmo cache) dos conciliadores, um lote de pares por chamada
+    con.create_function("ratio", _ratios, ["VARCHAR", "VARCHAR"], "DOUBLE", type="arrow", side_effects=False)
+    return con
+
+
+# =========================
+# Pares candidatos em SQL
+# =========================
+# Dias como os conciliadores contam: diferença (Emissão - data) arredondada para baixo em
+# dias, em valor absoluto; o Santander filtra pelo absoluto da diferença arredondado para baixo
+_SQL_PARES = f"""
+    WITH juncao AS (
+        SELECT a.*, e.* EXCLUDE (parcela, total), epoch_ns(e.emissao) - epoch_ns(a.data) AS diferenca_ns,
+               abs(e.valor_erp - a.valor) AS dif_valor
+        FROM adq AS a
+        JOIN erp AS e
+          ON a.parcela = e.parcela AND a.total = e.total
+         AND e.emissao BETWEEN a.data - to_days($dias_max + 1) AND a.data + to_days($dias_max + 1)
+         AND e.valor_erp BETWEEN a.valor - $valor_max - 0.01 AND a.valor + $valor_max + 0.01
+    )
+    SELECT *, abs({DIAS}) AS dias_pontuacao, {{dias}} AS dias
+    FROM juncao
+    WHERE {{dias}} <= $dias_max AND dif_valor <= $valor_max
+"""
+
+
+def _pares(adq, erp, dias_max, valor_max, dias, colunas):
+    """Pares dentro de (dias_max, valor_max) com as `colunas` calculadas a partir deles."""
+    sql = f"SELECT {colunas} FROM ({_SQL_PARES.format(dias=dias)})"
+    with _conectar() as con:
+        con.register("adq", adq)
+        con.register("erp", erp)
+        return con.execute(sql, {"dias_max": int(dias_max), "valor_max": float(valor_max)}).df()
+
+
+def _ordem_por_linha(linha, pos, pontuacao):
+    """Índices dos pares por linha da adquirente, em ordem de (pontuação, posição no ERP)."""
+    pares = pd.DataFrame({"indice": np.arange(len(linha)), "linha": linha, "pos": pos, "pontuacao": pontuacao})
+    with _conectar() as con:
+        con.register("pares", pares)
+        ordem = con.execute("""
+            SELECT indice, row_number() OVER (PARTITION BY linha ORDER BY pontuacao, pos) AS posto
+            FROM pares
+            ORDER BY linha, posto
+        """).df()
+    return ordem["indice"].to_numpy(dtype=np.int64)
+
+
+class VarreduraGulosaDuckDB(VarreduraGulosa):
+    def _gerar(self, adq, erp, dias_max, valor_max, n_identificadores):
+        # Mesma ordem de soma do motor
+        base = "dias_pontuacao * 10 + dif_valor * 100"
+        for k in range(n_identificadores):
+            base = f"({base}) + (100 - ratio(id_{k}, id_erp_{k}))"
+        return _pares(adq, erp, dias_max, valor_max, dias=f"abs({DIAS})",
+                      colunas=f"linha, pos, pessoa_errada, dias, dias_pontuacao, dif_valor, {base} AS base")
+
+    def _ordenar(self, pontuacao):
+        return _ordem_por_linha(self._linha, self._pos, pontuacao)
+
+
+class VarreduraSantanderDuckDB(VarreduraSantander):
+    def _gerar(self, adq, dias_max, valor_max):
+        exato = "(autorizacao = autorizacao_erp OR nsu = nsu_erp)"
+        return _pares(adq, self._erp, dias_max, valor_max, dias=f"abs(diferenca_ns) // {NS_POR_DIA}", colunas=f"""
+            linha, pos, pessoa_errada, dias, dias_pontuacao, dif_valor, {exato} AS exato,
+            dias_pontuacao * 100 + dif_valor * 100
+                + (200 - ((CASE WHEN {exato} THEN 100.0 ELSE ratio(autorizacao, autorizacao_erp) END)
+                          + (CASE WHEN {exato} THEN 100.0 ELSE ratio(nsu, nsu_erp) END))) AS base
+        """)
+
+    def _ordenar(self, pontuacao):
+        return _ordem_por_linha(self._linha, self._pos, pontuacao)
+
+
+def preparar(banco, df_adq, df_erp, dias_max, valor_max):
+    """varredura.preparar com os pares gerados e ordenados no DuckDB."""
+    if banco == "santander":
+        return VarreduraSantanderDuckDB(df_adq, df_erp, dias_max, valor_max)
+    from adquirentes import ADQUIRENTES
+
+    return VarreduraGulosaDuckDB(df_adq, df_erp, ADQUIRENTES[banco], dias_max, valor_max)
+
+
+# =========================
+# Histórico de não conciliados
+# =========================
+# Coluna da aba "Não conciliados" -> coluna do histórico (as que faltarem ficam nulas)
+COLUNAS_HISTORICO = {
+    COLUNA_ARQUIVO: "arquivo",
+    COLUNA_LOJA: "loja",
+    "DATA DA VENDA": "data_venda",
+    "DATA DE VENCIMENTO": "data_vencimento",
+    "PARCELA": "parcela",
+    "TOTAL_PARCELAS": "total_parcelas",
+    "VALOR DA PARCELA": "valor_parcela",
+    "VALOR LÍQUIDO": "valor_liquido",
+    "Status": "status",
+    "Pontuação": "pontuacao",
+}
+# Identificadores da adquirente, pela coluna do ERP com que são comparados (adquirentes.py)
+IDENTIFICADORES_HISTORICO = {"Autorização": "autorizacao", "NSU": "nsu"}
+
+_SQL_HISTORICO = """
+    CREATE TABLE IF NOT EXISTS nao_conciliados (
+        banco VARCHAR, entrada VARCHAR, gravado_em TIMESTAMP, arquivo VARCHAR, loja VARCHAR,
+        data_venda TIMESTAMP, data_vencimento TIMESTAMP, parcela INTEGER, total_parcelas INTEGER,
+        valor_parcela DOUBLE, valor_liquido DOUBLE, autorizacao VARCHAR, nsu VARCHAR,
+        status VARCHAR, pontuacao DOUBLE
+    )
+"""
+
+
+def _linhas_do_historico(banco, entrada, df, spec):
+    origem = {**COLUNAS_HISTORICO,
+              **{col_adq: IDENTIFICADORES_HISTORICO[col_erp] for col_adq, col_erp in spec["identificadores"]
+                 if col_erp in IDENTIFICADORES_HISTORICO}}
+    linhas = pd.DataFrame({"banco": banco, "entrada": entrada, "gravado_em": datetime.now()}, index=range(len(df)))
+    for coluna, destino in origem.items():
+        if coluna not in df.columns:
+            continue
+        valores = df[coluna].reset_index(drop=True)
+        if destino.startswith("data_"):
+            valores = pd.to_datetime(valores, errors="coerce")
+        elif destino in ("parcela", "total_parcelas", "valor_parcela", "valor_liquido", "pontuacao"):
+            valores = pd.to_numeric(valores, errors="coerce")
+        else:
+            valores = valores.astype(object).where(valores.notna(), None).map(lambda v: v if v is None else str(v))
+        linhas[destino] = valores
+    return linhas
+
+
+def registrar_nao_conciliados(banco, df_nao_conciliado, entrada, spec, telemetria=None):
+    """
+    Grava os não conciliados da execução no histórico, no lugar dos da execução anterior com
+    a mesma `entrada` (chave da leitura, etapas.py). Só com o modo analítico ligado; uma
+    falha ao gravar vira aviso no log, sem interromper a conciliação.
+    """
+    if not ATIVO:
+        return
+    import duckdb
+
+    linhas = _linhas_do_historico(banco, entrada, df_nao_conciliado, spec)
+    etapa = telemetria.etapa("Histórico", linhas=len(linhas)) if telemetria is not None else nullcontext()
+    try:
+        with etapa, _trava_historico:
+            os.makedirs(os.path.dirname(HISTORICO) or ".", exist_ok=True)
+            with duckdb.connect(HISTORICO) as con:
+                con.execute(_SQL_HISTORICO)
+                con.register("novas", linhas)
+                con.execute("BEGIN TRANSACTION")
+                con.execute("DELETE FROM nao_conciliados WHERE banco = ? AND entrada = ?", [banco, entrada])
+                con.execute("INSERT INTO nao_conciliados BY NAME SELECT * FROM novas")
+                con.execute("COMMIT")
+    except (duckdb.Error, OSError) as e:
+        logging.warning(f"⚠️ Histórico não gravado: {e}")
+        return
+    logging.info(f"🗃️ {len(linhas)} não conciliado(s) gravados no histórico")
+
+
+def consultar(sql, parametros=None):
+    """Resultado de `sql` sobre o histórico (tabela nao_conciliados), só leitura."""
+    import duckdb
+
+    if not os.path.exists(HISTORICO):
+        raise FileNotFoundError(f"❌ Histórico não encontrado: {HISTORICO}")
+    with duckdb.connect(HISTORICO, read_only=True) as con:
+        return con.execute(sql, parametros or []).df()
+
+
+def pendentes_por_mes(banco=None, desde=None):
+    """Não conciliados por banco e mês da venda. `desde`: "AAAA-MM"."""
+    return consultar("""
+        SELECT banco, strftime(date_trunc('month', data_venda), '%Y-%m') AS mes,
+               count(*) AS titulos, round(sum(valor_liquido), 2) AS valor_liquido,
+               count(DISTINCT entrada) AS execucoes
+        FROM nao_conciliados
+        WHERE ($banco IS NULL OR banco = $banco) AND ($desde IS NULL OR data_venda >= $desde)
+        GROUP BY ALL
+        ORDER BY banco, mes
+    """, {"banco": banco, "desde": datetime.strptime(desde, "%Y-%m") if desde else None})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--banco", choices=["cielo", "credshop", "santander"])
+    parser.add_argument("--desde", help="mês inicial da venda (AAAA-MM)")
+    parser.add_argument("--sql", help="consulta livre sobre a tabela nao_conciliados")
+    args = parser.parse_args()
+
+    if not DISPONIVEL:
+        print("❌ duckdb não instalado (pip install duckdb)")
+        return 1
+    resultado = consultar(args.sql) if args.sql else pendentes_por_mes(args.banco, args.desde)
+    print(resultado.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
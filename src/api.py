@@ -0,0 +1,258 @@
+"""
+API HTTP local
+Descrição: outras ferramentas internas disparam conciliações sem passar pela interface.
+Servidor HTTP da biblioteca padrão, em localhost, sobre o mesmo executor do app (jobs.py):
+no máximo CONCILIA_MAX_JOBS conciliações ao mesmo tempo, cada uma com o progresso, o
+cancelamento e a pasta de saída de um job.
+
+    POST   /conciliacoes/<banco>        multipart: "erp" (CSV), "adquirente" (um ou mais) e,
+                                        opcionais, tolerancia_dias, tolerancia_valor,
+                                        penalidade_pessoa -> 202 {"id": ...}
+    GET    /conciliacoes                jobs conhecidos
+    GET    /conciliacoes/<id>           estado, progresso e, no fim, o resumo em JSON
+    GET    /conciliacoes/<id>/planilha  planilha da conciliação (.xlsx)
+    DELETE /conciliacoes/<id>           cancela
+
+Limites, para uma rajada de pedidos não esgotar a memória: corpo de no máximo LIMITE_MB
+(CONCILIA_API_LIMITE_MB, padrão 200; 413 acima disso) e no máximo MAX_PENDENTES jobs na
+fila ou executando (CONCILIA_API_PENDENTES, padrão 8; 429 com Retry-After acima disso).
+Os arquivos ficam em memória só até o job terminar.
+
+Uso: python api.py [--porta 8765] [--host 127.0.0.1]
+"""
+
+import io
+import os
+import sys
+import json
+import logging
+import argparse
+import importlib
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jobs
+from adquirentes import ADQUIRENTES
+from inicializacao import configurar_logging
+
+
+PORTA = int(os.environ.get("CONCILIA_API_PORTA", "8765"))
+LIMITE_MB = int(os.environ.get("CONCILIA_API_LIMITE_MB", "200"))
+MAX_PENDENTES = int(os.environ.get("CONCILIA_API_PENDENTES", "8"))
+# Segundos sugeridos ao cliente quando a fila está cheia
+ESPERA_FILA_CHEIA = 30
+
+PARAMETROS = {"tolerancia_dias": int, "tolerancia_valor": float, "penalidade_pessoa": int}
+TIPO_PLANILHA = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_trava = threading.Lock()
+
+
+class ErroDaRequisicao(Exception):
+    def __init__(self, status, mensagem, cabecalhos=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.cabecalhos = cabecalhos or {}
+
+
+# =========================
+# Entrada
+# =========================
+def ler_formulario(tipo, corpo):
+    """{campo: [valores]} de um corpo multipart/form-data; arquivos viram BytesIO com .name."""
+    if not tipo.startswith("multipart/form-data"):
+        raise ErroDaRequisicao(415, "Envie os arquivos como multipart/form-data.")
+    mensagem = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {tipo}\r\n\r\n".encode("latin1") + corpo)
+    campos = {}
+    for parte in mensagem.iter_parts():
+        nome = parte.get_param("name", header="content-disposition")
+        if not nome:
+            continue
+        conteudo = parte.get_payload(decode=True) or b""
+        arquivo = parte.get_filename()
+        if arquivo is not None:
+            valor = io.BytesIO(conteudo)
+            valor.name = os.path.basename(arquivo)
+        else:
+            valor = conteudo.decode("utf-8").strip()
+        campos.setdefault(nome, []).append(valor)
+    return campos
+
+
+def _parametros(campos):
+    import etapas
+
+    try:
+        informados = {nome: tipo(campos[nome][0]) for nome, tipo in PARAMETROS.items() if campos.get(nome)}
+        return etapas.parametros(informados) if informados else None
+    except ValueError as e:
+        raise ErroDaRequisicao(400, f"Parâmetro inválido: {e}")
+
+
+def submeter(banco, campos):
+    if banco not in ADQUIRENTES:
+        raise ErroDaRequisicao(404, f"Banco desconhecido: {banco}. Use {', '.join(ADQUIRENTES)}.")
+    erp, adquirente = campos.get("erp", []), campos.get("adquirente", [])
+    if len(erp) != 1 or not isinstance(erp[0], io.BytesIO) or not adquirente \
+            or not all(isinstance(a, io.BytesIO) for a in adquirente):
+        raise ErroDaRequisicao(400, "Envie um arquivo 'erp' e ao menos um arquivo 'adquirente'.")
+    opcoes = {}
+    parametros = _parametros(campos)
+    if parametros is not None:
+        opcoes["parametros"] = parametros
+
+    processar = importlib.import_module(ADQUIRENTES[banco]["modulo"]).processar
+    descricao = " + ".join(a.name for a in [*erp, *adquirente])
+    with _trava:
+        pendentes = sum(1 for j in jobs.listar() if not j.finalizado)
+        if pendentes >= MAX_PENDENTES:
+            raise ErroDaRequisicao(429, f"{pendentes} conciliações na fila; tente de novo em instantes.",
+                                   {"Retry-After": str(ESPERA_FILA_CHEIA)})
+        return jobs.submeter(banco, descricao, processar, erp[0], adquirente, **opcoes)
+
+
+# =========================
+# Saída
+# =========================
+def _tabela(df):
+    return None if df is None else json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+def descrever(job, completo=True):
+    """Estado do job em JSON; com o job concluído e `completo`, também o resumo do resultado."""
+    descricao = {
+        "id": job.id,
+        "banco": job.banco,
+        "descricao": job.descricao,
+        "estado": job.estado,
+        "progresso": round(job.fracao, 4),
+        "texto": job.texto,
+        "criado_em": job.criado_em.isoformat(timespec="seconds"),
+        "finalizado_em": job.finalizado_em.isoformat(timespec="seconds") if job.finalizado_em else None,
+    }
+    if job.erro:
+        descricao["erro"] = job.erro
+    resultado = job.resultado
+    if completo and resultado is not None:
+        descricao["resultado"] = {
+            "metricas": [{"rotulo": r, "valor": v, "detalhe": d} for r, v, d in resultado["metricas"]],
+            "relatorio": _tabela(resultado["relatorio"]),
+            "por_arquivo": _tabela(resultado.get("por_arquivo")),
+            "por_loja": _tabela(resultado.get("por_loja")),
+            "avisos": resultado["avisos"],
+            "planilha": f"/conciliacoes/{job.id}/planilha" if resultado.get("caminho") else None,
+            "desempenho": resultado.get("desempenho"),
+        }
+    return descricao
+
+
+# =========================
+# Servidor
+# =========================
+class _Manipulador(BaseHTTPRequestHandler):
+    server_version = "ConciliaFacil"
+
+    def _responder(self, status, corpo, tipo="application/json; charset=utf-8", cabecalhos=None):
+        if not isinstance(corpo, bytes):
+            corpo = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _job(self, job_id):
+        job = jobs.obter(job_id)
+        if job is None:
+            raise ErroDaRequisicao(404, f"Conciliação não encontrada: {job_id}")
+        return job
+
+    def _atender(self, metodo):
+        partes = [p for p in self.path.split("?")[0].split("/") if p]
+        if not partes or partes[0] != "conciliacoes":
+            raise ErroDaRequisicao(404, "Caminho desconhecido.")
+
+        if metodo == "GET" and len(partes) == 1:
+            return self._responder(200, [descrever(j, completo=False) for j in jobs.listar()])
+        if metodo == "GET" and len(partes) == 2:
+            return self._responder(200, descrever(self._job(partes[1])))
+        if metodo == "GET" and len(partes) == 3 and partes[2] == "planilha":
+            job = self._job(partes[1])
+            caminho = job.resultado.get("caminho") if job.resultado else None
+            if not caminho or not os.path.exists(caminho):
+                raise ErroDaRequisicao(409, f"Planilha indisponível (estado: {job.estado}).")
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+            nome = job.resultado["nome_download"]
+            return self._responder(200, conteudo, TIPO_PLANILHA,
+                                   {"Content-Disposition": f'attachment; filename="{nome}"'})
+        if metodo == "DELETE" and len(partes) == 2:
+            job = self._job(partes[1])
+            job.cancelar()
+            return self._responder(202, descrever(job, completo=False))
+        if metodo == "POST" and len(partes) == 2:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            if tamanho <= 0:
+                raise ErroDaRequisicao(411, "Informe o Content-Length.")
+            if tamanho > LIMITE_MB * 1024 * 1024:
+                raise ErroDaRequisicao(413, f"Corpo acima do limite de {LIMITE_MB} MB.")
+            campos = ler_formulario(self.headers.get("Content-Type", ""), self.rfile.read(tamanho))
+            job = submeter(partes[1], campos)
+            return self._responder(202, descrever(job, completo=False), cabecalhos={"Location": f"/conciliacoes/{job.id}"})
+        raise ErroDaRequisicao(405, "Método não suportado neste caminho.")
+
+    def _tratar(self, metodo):
+        try:
+            self._atender(metodo)
+        except ErroDaRequisicao as e:
+            if e.status == 413:  # corpo não lido: a conexão não pode ser reaproveitada
+                self.close_connection = True
+            self._responder(e.status, {"erro": str(e)}, cabecalhos=e.cabecalhos)
+        except Exception as e:
+            logging.error(f"Erro na API ({metodo} {self.path}): {e}", exc_info=True)
+            self._responder(500, {"erro": str(e)})
+
+    def do_GET(self):
+        self._tratar("GET")
+
+    def do_POST(self):
+        self._tratar("POST")
+
+    def do_DELETE(self):
+        self._tratar("DELETE")
+
+    def log_message(self, formato, *args):
+        logging.info(f"🌐 {self.address_string()} {formato % args}")
+
+
+def criar_servidor(host="127.0.0.1", porta=PORTA):
+    servidor = ThreadingHTTPServer((host, porta), _Manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="endereço de escuta (padrão: só esta máquina)")
+    parser.add_argument("--porta", type=int, default=PORTA)
+    args = parser.parse_args()
+
+    configurar_logging()
+    servidor = criar_servidor(args.host, args.porta)
+    logging.info(f"🌐 API em http://{args.host}:{args.porta}/conciliacoes "
+                 f"({jobs.MAX_JOBS_SIMULTANEOS} simultâneas, até {MAX_PENDENTES} pendentes, {LIMITE_MB} MB)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
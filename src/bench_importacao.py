@@ -0,0 +1,102 @@
+"""
+Benchmark do tempo de importação
+Descrição: mede, com `python -X importtime`, quanto custa importar o que a tela inicial
+precisa e o que cada banco precisa, cada um em um interpretador novo. Falha (código de
+saída 1) quando uma biblioteca pesada volta a ser importada pela tela inicial ou quando o
+tempo passa do limite informado, para pegar regressões no tempo até a primeira tela.
+
+Uso: python bench_importacao.py [--repeticoes 3] [--limite-ms 1500] [--top 10] [--json saida.json]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+
+# Módulos importados por app.py antes de desenhar a tela inicial
+TELA_INICIAL = ("streamlit", "adquirentes", "painel", "inicializacao")
+# Módulos de cada banco (carregados no clique ou pelo pré-aquecimento)
+BANCOS = ("cielo", "credshop", "santander")
+# Não podem aparecer na tela inicial: ficam para o pré-aquecimento
+PESADOS = ("pandas", "numpy", "rapidfuzz", "openpyxl", "numba", "psutil")
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+LINHA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def medir(modulos):
+    """Importa `modulos` num processo novo e devolve {modulo: (proprio_us, acumulado_us, nivel)}."""
+    comando = [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modulos)]
+    saida = subprocess.run(comando, cwd=PASTA, capture_output=True, text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulos}: {saida.stderr.strip().splitlines()[-1:]}")
+    tempos = {}
+    for linha in saida.stderr.splitlines():
+        m = LINHA.match(linha)
+        if m:
+            proprio, acumulado, recuo, nome = m.groups()
+            tempos[nome] = (int(proprio), int(acumulado), (len(recuo) - 1) // 2)
+    return tempos
+
+
+def total_ms(tempos):
+    return sum(acumulado for _, acumulado, nivel in tempos.values() if nivel == 0) / 1000
+
+
+def melhor_de(modulos, repeticoes):
+    """Menor total entre as repetições (reduz o ruído de disco e cache)."""
+    return min((medir(modulos) for _ in range(repeticoes)), key=total_ms)
+
+
+def resumir(tempos, top):
+    mais_caros = sorted(
+        ((nome, acumulado) for nome, (_, acumulado, nivel) in tempos.items() if nivel <= 1),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return {"total_ms": round(total_ms(tempos), 1),
+            "mais_caros": [{"modulo": nome, "ms": round(us / 1000, 1)} for nome, us in mais_caros]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--limite-ms", type=float, default=None,
+                        help="tempo máximo de importação da tela inicial")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    relatorio = {}
+    problemas = []
+
+    tela = melhor_de(TELA_INICIAL, args.repeticoes)
+    relatorio["tela_inicial"] = resumir(tela, args.top)
+    relatorio["tela_inicial"]["pesados"] = [nome for nome in PESADOS if nome in tela]
+    for nome in relatorio["tela_inicial"]["pesados"]:
+        problemas.append(f"tela inicial importa {nome}")
+    if args.limite_ms is not None and relatorio["tela_inicial"]["total_ms"] > args.limite_ms:
+        problemas.append(f"tela inicial levou {relatorio['tela_inicial']['total_ms']} ms (limite {args.limite_ms} ms)")
+
+    for banco in BANCOS:
+        relatorio[banco] = resumir(melhor_de((banco,), args.repeticoes), args.top)
+
+    for alvo, dados in relatorio.items():
+        print(f"\n{alvo}: {dados['total_ms']:.1f} ms")
+        for item in dados["mais_caros"]:
+            print(f"  {item['ms']:>9.1f} ms  {item['modulo']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    if problemas:
+        print("\n❌ " + "\n❌ ".join(problemas))
+        sys.exit(1)
+    print("\n✅ Tela inicial sem bibliotecas pesadas")
+
+
+if __name__ == "__main__":
+    main()
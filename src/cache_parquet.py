@@ -0,0 +1,215 @@
+"""
+Cache em Parquet das entradas já limpas
+Descrição: ler o CSV do ERP e as planilhas XLSX da Cielo/Santander é a parte lenta de
+uma conciliação, e os mesmos arquivos costumam ser enviados de novo (nova tentativa,
+outra adquirente contra o mesmo ERP, servidor reiniciado). O resultado limpo e tipado de
+cada arquivo é guardado em Parquet, numa pasta com o hash do conteúdo do arquivo mais a
+versão do leitor; o próximo envio do mesmo arquivo carrega direto do Parquet.
+
+- Versão do leitor: hash do código dos módulos que leem e limpam o arquivo (banco,
+  adaptadores, cadastro das adquirentes, ingestão) mais VERSAO. Mudou o código, o cache
+  antigo deixa de ser usado.
+- Tamanho: limitado a CONCILIA_CACHE_MB (padrão 1024 MB); os menos usados saem primeiro.
+- ERP: guardado inteiro, mas carregado só com os títulos da janela de datas (filtro do
+  pyarrow na leitura do Parquet, sem montar o ERP inteiro em memória). Um ERP maior que
+  CONCILIA_CACHE_ERP_MB (padrão 200 MB) não passa pelo cache: limpá-lo inteiro para
+  guardar custaria mais memória que a leitura em blocos já recortada pela janela.
+- "Limpar cache" na barra lateral (painel.controle_de_cache) apaga tudo.
+
+Opcional: sem o pyarrow instalado, DISPONIVEL fica False e tudo é lido do arquivo. Também
+pode ser desligado com CONCILIA_CACHE_PARQUET=0.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import importlib
+import importlib.util
+
+# pyarrow é opcional (e pesado: só é importado pelo pandas ao ler/gravar)
+DISPONIVEL = importlib.util.find_spec("pyarrow") is not None
+
+ATIVO = DISPONIVEL and os.environ.get("CONCILIA_CACHE_PARQUET", "1") != "0"
+PASTA = os.path.join(os.environ.get("CONCILIA_CACHE", "cache"), "entradas")
+LIMITE_BYTES = int(os.environ.get("CONCILIA_CACHE_MB", "1024")) * 1024 * 1024
+LIMITE_ERP_BYTES = int(os.environ.get("CONCILIA_CACHE_ERP_MB", "200")) * 1024 * 1024
+# Mude para invalidar todo o cache (ex: troca de versão do pandas/pyarrow)
+VERSAO = 1
+
+_MANIFESTO = "manifesto.json"
+_versoes_de_modulo = {}
+
+
+# =========================
+# Chave
+# =========================
+def versao_do_leitor(*modulos):
+    """Hash do código-fonte dos `modulos` (nomes) que produzem a entrada limpa."""
+    partes = [f"v{VERSAO}"]
+    for nome in modulos:
+        modulo = sys.modules.get(nome) or importlib.import_module(nome)
+        caminho = getattr(modulo, "__file__", None)
+        if caminho not in _versoes_de_modulo:
+            try:
+                with open(caminho, "rb") as f:
+                    _versoes_de_modulo[caminho] = hashlib.sha1(f.read()).hexdigest()
+            except (OSError, TypeError):  # executável empacotado: só o nome e VERSAO
+                _versoes_de_modulo[caminho] = getattr(modulo, "__name__", "?")
+        partes.append(_versoes_de_modulo[caminho])
+    return "|".join(partes)
+
+
+def chave(arquivo, rotulo, versao):
+    """Nome da entrada: rótulo + hash do conteúdo do arquivo e da versão do leitor."""
+    resumo = hashlib.sha1(f"{rotulo}|{versao}|".encode())
+    if hasattr(arquivo, "getbuffer"):  # upload em memória: sem copiar o conteúdo
+        with arquivo.getbuffer() as conteudo:
+            resumo.update(conteudo)
+    else:
+        posicao = arquivo.tell()
+        resumo.update(arquivo.read())
+        arquivo.seek(posicao)
+    return f"{rotulo}-{resumo.hexdigest()}"
+
+
+# =========================
+# Leitura e gravação
+# =========================
+def memorizar(arquivo, rotulo, versao, preparar, telemetria=None, etapa="Leitura (cache)", filtros=None):
+    """
+    Devolve `preparar()` (um DataFrame ou (DataFrame, {aba: DataFrame})), carregando do
+    cache quando o mesmo arquivo já foi preparado pela mesma versão do leitor.
+    Com o cache, a carga vira a etapa `etapa` da telemetria. `filtros`: função que devolve
+    os `filters` do pyarrow aplicados à tabela principal ao carregar do cache (chamada só
+    então); o resultado de `preparar()` volta inteiro, quem chama recorta.
+    """
+    if not ATIVO:
+        return preparar()
+
+    nome = chave(arquivo, rotulo, versao)
+    pasta = os.path.join(PASTA, nome)
+    if os.path.isdir(pasta):
+        resultado = _medir(telemetria, etapa, lambda: _carregar(pasta, filtros() if filtros else None))
+        if resultado is not None:
+            logging.info(f"⚡ {rotulo}: {getattr(arquivo, 'name', '')} carregado do cache")
+            return resultado
+
+    resultado = preparar()
+    try:
+        _guardar(pasta, resultado)
+        podar()
+    except Exception as e:  # tipos que o Parquet não representa, disco cheio...
+        logging.warning(f"{rotulo}: resultado não guardado no cache: {e}")
+    return resultado
+
+
+def cabe_erp(arquivo):
+    """Se o ERP é pequeno o bastante (LIMITE_ERP_BYTES) para ser limpo inteiro e guardado."""
+    if hasattr(arquivo, "getbuffer"):
+        with arquivo.getbuffer() as conteudo:
+            return conteudo.nbytes <= LIMITE_ERP_BYTES
+    posicao = arquivo.tell()
+    tamanho_arquivo = arquivo.seek(0, os.SEEK_END)
+    arquivo.seek(posicao)
+    return tamanho_arquivo <= LIMITE_ERP_BYTES
+
+
+def _medir(telemetria, etapa, funcao):
+    if telemetria is None:
+        return funcao()
+    with telemetria.etapa(etapa) as registro:
+        resultado = funcao()
+        if resultado is not None:
+            principal = resultado[0] if isinstance(resultado, tuple) else resultado
+            registro["linhas"] = len(principal)
+            registro["cache"] = True
+        return resultado
+
+
+def _guardar(pasta, resultado):
+    """Grava numa pasta temporária e renomeia, para uma leitura simultânea não ver pela metade."""
+    if isinstance(resultado, tuple):
+        principal, desvios = resultado
+        manifesto = {"tipo": "com_desvios", "abas": list(desvios)}
+        tabelas = [principal, *desvios.values()]
+    else:
+        manifesto = {"tipo": "tabela", "abas": []}
+        tabelas = [resultado]
+
+    os.makedirs(PASTA, exist_ok=True)
+    temporaria = tempfile.mkdtemp(prefix=".gravando-", dir=PASTA)
+    try:
+        for i, df in enumerate(tabelas):
+            df.to_parquet(os.path.join(temporaria, f"{i}.parquet"), engine="pyarrow")
+        with open(os.path.join(temporaria, _MANIFESTO), "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False)
+        os.rename(temporaria, pasta)
+    except BaseException:
+        shutil.rmtree(temporaria, ignore_errors=True)
+        if not os.path.isdir(pasta):  # outra sessão pode ter guardado o mesmo arquivo antes
+            raise
+
+
+def _carregar(pasta, filtros=None):
+    import pandas as pd
+
+    try:
+        with open(os.path.join(pasta, _MANIFESTO), encoding="utf-8") as f:
+            manifesto = json.load(f)
+        tabelas = [pd.read_parquet(os.path.join(pasta, f"{i}.parquet"), engine="pyarrow",
+                                   filters=filtros if i == 0 else None)
+                   for i in range(len(manifesto["abas"]) + 1)]
+        if filtros:
+            tabelas[0] = tabelas[0].reset_index(drop=True)
+        os.utime(pasta)  # usado agora: último a sair
+    except Exception as e:
+        logging.warning(f"Cache ignorado ({os.path.basename(pasta)}): {e}")
+        shutil.rmtree(pasta, ignore_errors=True)
+        return None
+
+    if manifesto["tipo"] == "tabela":
+        return tabelas[0]
+    return tabelas[0], dict(zip(manifesto["abas"], tabelas[1:]))
+
+
+# =========================
+# Tamanho e limpeza
+# =========================
+def _entradas():
+    if not os.path.isdir(PASTA):
+        return []
+    entradas = []
+    for nome in os.listdir(PASTA):
+        pasta = os.path.join(PASTA, nome)
+        if nome.startswith(".") or not os.path.isdir(pasta):
+            continue
+        tamanho = sum(e.stat().st_size for e in os.scandir(pasta) if e.is_file())
+        entradas.append((os.path.getmtime(pasta), tamanho, pasta))
+    return entradas
+
+
+def tamanho():
+    """(quantidade de arquivos em cache, bytes)."""
+    entradas = _entradas()
+    return len(entradas), sum(t for _, t, _ in entradas)
+
+
+def podar(limite=None):
+    """Remove as entradas usadas há mais tempo até o cache caber em `limite` bytes."""
+    limite = LIMITE_BYTES if limite is None else limite
+    entradas = sorted(_entradas())
+    total = sum(t for _, t, _ in entradas)
+    for _, tamanho_entrada, pasta in entradas:
+        if total <= limite:
+            break
+        shutil.rmtree(pasta, ignore_errors=True)
+        total -= tamanho_entrada
+
+
+def limpar():
+    """Apaga todo o cache de entradas."""
+    shutil.rmtree(PASTA, ignore_errors=True)
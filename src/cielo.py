@@ -1,364 +1,275 @@
-import os
-import pandas as pd
-import streamlit as st
-import logging
-from datetime import datetime
-from rapidfuzz import fuzz
-from openpyxl import load_workbook
-
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.DEBUG,  # ou DEBUG para mais detalhes
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("conciliacao.log", encoding="utf-8"),  # grava em arquivo
-        logging.StreamHandler()  # mostra no console
-    ]
-)
-
-
-# =========================
-# Função de limpeza ERP
-# =========================
-def limpar_erp(df):
-    try:
-        with st.spinner("🧹 Limpando dados do ERP..."):
-            df["Emissão"] = pd.to_datetime(df["Emissão"], dayfirst=True, errors="coerce")
-            parcelas = df["Numero"].str.extract(r"-(\d+)/(\d+)")
-            df["Numero da Parcela"] = parcelas[0].astype(float).fillna(1).astype(int)
-            df["Total Parcelas"] = parcelas[1].astype(float).fillna(1).astype(int)
-
-            df["Valor"] = (
-                df["Valor"].astype(str).str.replace(",", ".", regex=False).astype(float)
-            )
-
-    except Exception as e:
-        logging.error(f"Erro ao limpar dados ERP: {e}", exc_info=True)
-        raise
-
-    return df
-
-# =========================
-# Função de limpeza Cielo
-# =========================
-def limpar_cielo(df):
-    try:
-        with st.spinner("🧹 Limpando dados da Cielo..."):
-            df = df.iloc[8:].reset_index(drop=True)
-            df.columns = df.iloc[0]
-            df = df[1:].reset_index(drop=True)
-            df.columns = df.columns.str.strip().str.lower()
-
-            df = df.rename(columns={
-                "valor bruto": "VALOR DA PARCELA",
-                "valor líquido": "VALOR LÍQUIDO",
-                "número da parcela": "PARCELA",
-                "quantidade total de parcelas": "TOTAL_PARCELAS",
-                "código da autorização": "AUTORIZAÇÃO",
-                "nsu/doc": "NSU/DOC",
-                "data da venda": "DATA DA VENDA",
-                "data prevista de pagamento": "DATA DE VENCIMENTO",
-                "tipo de lançamento": "TIPO DE LANÇAMENTO",
-            })
-
-            for col in ["VALOR DA PARCELA", "VALOR LÍQUIDO"]:
-                df[col] = (
-                    df[col].astype(str).str.replace(",", ".", regex=False).astype(float)
-                )
-
-            df["PARCELA"] = pd.to_numeric(df["PARCELA"], errors="coerce").fillna(1).astype(int)
-            df["TOTAL_PARCELAS"] = pd.to_numeric(df["TOTAL_PARCELAS"], errors="coerce").fillna(1).astype(int)
-
-            for col in ["DATA DA VENDA", "DATA DE VENCIMENTO"]:
-                df[col] = pd.to_datetime(df[col], dayfirst=True, errors="coerce")
-                
-                
-            # Mantém apenas as colunas mencionadas acima:
-            colunas_manter = [
-                "VALOR DA PARCELA",
-                "VALOR LÍQUIDO",
-                "PARCELA",
-                "TOTAL_PARCELAS",
-                "AUTORIZAÇÃO",
-                "NSU/DOC",
-                "DATA DA VENDA",
-                "DATA DE VENCIMENTO",
-                "TIPO DE LANÇAMENTO",
-            ]
-            df = df[colunas_manter]
-    except Exception as e:
-        logging.error(f"Erro ao limpar dados Cielo: {e}", exc_info=True)
-        raise
-    return df
-
-
-
-
-
-# =========================
-# ==Função de conciliação==
-# =========================
-
-def conciliar_cielo_erp(df_cielo, df_erp, tolerancia_dias=5, tolerancia_valor=0.20):
-    df_cielo = df_cielo.copy()
-    df_erp = df_erp.copy()
-
-    # Normalizar chaves
-    df_erp["Chave"] = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64")
-    df_erp["Usada"] = False
-
-    # Adiciona colunas de resultado na df_cielo
-    df_cielo["Autorização ERP"] = None
-    df_cielo["NSU ERP"] = None
-    df_cielo["Chave ERP"] = None
-    df_cielo["Valor ERP"] = None
-    df_cielo["Emissão ERP"] = None
-    df_cielo["Parcela ERP"] = None
-    df_cielo["Total Parcelas ERP"] = None
-    df_cielo["Pessoa do Título"] = None
-    df_cielo["Pessoa do Título"] = None
-    df_cielo["Status"] = "Não conciliado"
-    df_cielo["Pontuação"] = 999
-
-    progress_text = st.empty()  # cria um espaço que podemos atualizar
-    progress_bar = st.progress(0)
-    total = len(df_cielo)
-
-    for i, row in df_cielo.iterrows():
-        progresso = (i + 1) / total
-
-        # Atualiza o texto com os registros já processados
-        progress_text.text(f"🔄 Conciliando ({i + 1}/{total}) registros...")
-
-        # Atualiza a barra
-        progress_bar.progress(progresso)
-
-        # seu processamento da linha aqui
-
-    for i, row in df_cielo.iterrows():
-        if pd.isna(row["AUTORIZAÇÃO"]) or pd.isna(row["NSU/DOC"]):
-            logging.warning(f"⚠️ Linha {i} ignorada por dados ausentes.")
-            continue
-
-        logging.debug(f"🔍 Linha {i} - Aut: {row['AUTORIZAÇÃO']}, NSU: {row['NSU/DOC']}, Parcela: {row['PARCELA']}")
-
-        candidatos = df_erp[
-            (~df_erp["Usada"]) &
-            (abs((df_erp["Emissão"] - row["DATA DA VENDA"]).dt.days) <= tolerancia_dias) &
-            (abs(df_erp["Valor"] - row["VALOR DA PARCELA"]) <= tolerancia_valor) &
-            (df_erp["Numero da Parcela"] == row["PARCELA"]) &
-            (df_erp["Total Parcelas"] == row["TOTAL_PARCELAS"])
-        ]
-
-        logging.debug(f"🔎 {len(candidatos)} candidatos encontrados para a linha {i} da Cielo.")
-
-        melhor = None
-        menor_pontuacao = float("inf")
-
-        for _, linha in candidatos.iterrows():
-            dias_dif = abs((linha["Emissão"] - row["DATA DA VENDA"]).days)
-            valor_dif = abs(linha["Valor"] - row["VALOR DA PARCELA"])
-            sim_aut = fuzz.ratio(str(linha["Autorização"]), str(row["AUTORIZAÇÃO"]))
-            sim_nsu = fuzz.ratio(str(linha["NSU"]), str(row["NSU/DOC"]))
-
-            pontuacao = dias_dif * 10 + valor_dif * 100 + (100 - sim_aut) + (100 - sim_nsu)
-            if "Pessoa do Título" in linha and linha["Pessoa do Título"] != "Cielo":
-                    pontuacao += 101
-
-            logging.debug(f"➡️ Testando Chave {linha['Chave']} | Dias: {dias_dif}, Valor: {valor_dif}, Aut: {sim_aut}, NSU: {sim_nsu}, Pontuação: {pontuacao:.2f}")
-
-            if pontuacao < menor_pontuacao:
-                menor_pontuacao = pontuacao
-                melhor = linha
-
-        if melhor is not None:
-            idx_erp = df_erp.index[df_erp["Chave"] == melhor["Chave"]].tolist()
-            if idx_erp:
-                df_erp.at[idx_erp[0], "Usada"] = True
-
-            df_cielo.at[i, "Autorização ERP"] = melhor["Autorização"]
-            df_cielo.at[i, "NSU ERP"] = melhor["NSU"]
-            df_cielo.at[i, "Chave ERP"] = melhor["Chave"]
-            df_cielo.at[i, "Valor ERP"] = melhor["Valor"]
-            df_cielo.at[i, "Emissão ERP"] = melhor["Emissão"]
-            df_cielo.at[i, "Parcela ERP"] = melhor["Numero da Parcela"]
-            df_cielo.at[i, "Total Parcelas ERP"] = melhor["Total Parcelas"]
-            df_cielo.at[i, "Pessoa do Título"] = melhor.get("Pessoa do Título", None)
-            df_cielo.at[i, "Status"] = "Conciliado"
-            df_cielo.at[i, "Pontuação"] = round(menor_pontuacao, 0)
-            logging.info(f"✅ Linha {i} conciliada com chave {melhor['Chave']} (Pontuação: {round(menor_pontuacao, 0)})")
-        else:
-            logging.info(f"❌ Linha {i} não conciliada (sem candidatos adequados)")
-
-    return df_cielo, df_erp 
-
-
-
-
-
-
-def main():
-
-    # === BARRA LATERAL ===
-    with st.sidebar:
-        st.markdown("# App Conciliação Bancária")
-        st.markdown("### Carregar planilhas")
-        caminho_erp = st.file_uploader("ERP (CSV)", type=["csv"], key="erp_uploader")
-        caminho_cielo = st.file_uploader("Cielo (XLSX)", type=["xlsx"], key="cielo_uploader")
-
-    # === TELA INICIAL ===
-    if caminho_erp is None or caminho_cielo is None:
-        st.subheader("Bem-vindo ao Sistema de Conciliação")
-        st.markdown("""
-        <div style='text-align: center; margin-bottom: 20px;'>
-            <p>Este sistema realiza a conciliação automática entre:</p>
-            <p>•  Cielo</p>
-            <p>• ERP</p>
-        </div>
-        """, unsafe_allow_html=True)
-        st.warning("⚠️ Por favor, faça upload de ambos os arquivos para iniciar a conciliação")
-        st.stop()
-
-    def carregar_planilha(caminho):
-        if caminho.name.lower().endswith(".csv"):
-            return pd.read_csv(caminho, sep=";", encoding="latin1")
-        elif caminho.name.lower().endswith(".xlsx") or caminho.name.lower().endswith(".xls"):
-            return pd.read_excel(caminho, engine="openpyxl")
-        else:
-            raise ValueError("❌ Formato de arquivo não suportado. Só aceitamos CSV e XLSX.")
-
-    try:
-        with st.spinner("📂 Carregando planilhas..."):
-            df_erp = carregar_planilha(caminho_erp)
-            df_cielo = carregar_planilha(caminho_cielo)
-
-        with st.spinner("🔧 Iniciando limpeza e conciliação dos dados..."):
-            df_erp = limpar_erp(df_erp)
-            df_cielo = limpar_cielo(df_cielo)
-            df_conciliado, df_erp = conciliar_cielo_erp(df_cielo, df_erp)
-            df_aba_conciliados = df_conciliado[df_conciliado["Status"] == "Conciliado"].copy()
-            df_aba_nao_conciliados = df_conciliado[df_conciliado["Status"] != "Conciliado"].copy()
-
-        totais_conc = {
-            "liquido": df_aba_conciliados["VALOR LÍQUIDO"].sum(),
-            "parcela": df_aba_conciliados["VALOR DA PARCELA"].sum(),
-            "qtd": len(df_aba_conciliados)
-        }
-        totais_nao = {
-            "liquido": df_aba_nao_conciliados["VALOR LÍQUIDO"].sum(),
-            "parcela": df_aba_nao_conciliados["VALOR DA PARCELA"].sum(),
-            "qtd": len(df_aba_nao_conciliados)
-        }
-
-        relatorio_linhas = [
-            ["RELATÓRIO DE CONCILIAÇÃO", "", ""],
-            ["CONCILIADO", "", ""],
-            ["- Valor Líquido Total", "", f"R$ {totais_conc['liquido']:,.2f}"],
-            ["- Valor da Parcela Total", "", f"R$ {totais_conc['parcela']:,.2f}"],
-            ["- Quantidade de Títulos", "", f"{totais_conc['qtd']}"],
-            ["", "", ""],
-            ["NÃO CONCILIADO", "", ""],
-            ["- Valor Líquido Total", "", f"R$ {totais_nao['liquido']:,.2f}"],
-            ["- Valor da Parcela Total", "", f"R$ {totais_nao['parcela']:,.2f}"],
-            ["- Quantidade de Títulos", "", f"{totais_nao['qtd']}"]
-        ]
-        relatorio_df = pd.DataFrame(relatorio_linhas, columns=["Categoria", "Descrição", "Valor"])
-
-        # =====================================================================
-        # EXCLUSÃO FINAL DAS COLUNAS (APÓS TODO O PROCESSAMENTO)
-        # =====================================================================
-        # Definir colunas a serem excluídas pelos nomes reais
-        colunas_para_excluir = [
-            "TIPO DE LANÇAMENTO",   # Coluna I
-            "Parcela ERP",          # Coluna O
-            "Total Parcelas ERP"    # Coluna P
-        ]
-
-        # Aplicar exclusão apenas se as colunas existirem
-        for col in colunas_para_excluir:
-            if col in df_aba_conciliados.columns:
-                df_aba_conciliados = df_aba_conciliados.drop(columns=[col])
-            if col in df_aba_nao_conciliados.columns:
-                df_aba_nao_conciliados = df_aba_nao_conciliados.drop(columns=[col])
-
-        # Agora gerar o Excel com as colunas já excluídas
-
-
-        
-        output_path = "Conciliação_final.xlsx"
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df_aba_conciliados.to_excel(writer, sheet_name="Conciliados", index=False)
-            df_aba_nao_conciliados.to_excel(writer, sheet_name="Não conciliados", index=False)
-            relatorio_df.to_excel(writer, sheet_name="Resumo", index=False)
-
-            # Tratar abas especiais (aluguel e estornos) - também remover coluna I
-            if "TIPO DE LANÇAMENTO" in df_cielo.columns:
-                # Criar cópias para não alterar o original
-                df_cielo_sem_coluna = df_cielo.drop(columns=["TIPO DE LANÇAMENTO"], errors="ignore")
-                
-                df_aluguel = df_cielo_sem_coluna[df_cielo["TIPO DE LANÇAMENTO"].str.lower().str.contains("aluguel", na=False)]
-                if not df_aluguel.empty:
-                    df_aluguel.to_excel(writer, sheet_name="Aluguel de máquina", index=False)
-                
-                df_estornos = df_cielo_sem_coluna[df_cielo["TIPO DE LANÇAMENTO"].str.lower().str.contains("estorno", na=False)]
-                if not df_estornos.empty:
-                    df_estornos.to_excel(writer, sheet_name="Estornos", index=False)
-
-        # === INSERIR CHAVES ERP EM BLOCOS NA ABA RESUMO ===
-        try:
-            wb = load_workbook(output_path)
-            ws_conciliados = wb["Conciliados"]
-            ws_resumo = wb["Resumo"]
-
-            # Detecta a coluna da Chave ERP
-            header = [cell.value for cell in ws_conciliados[1]]
-            if "Chave ERP" in header:
-                idx_chave = header.index("Chave ERP")
-                letra_coluna = chr(65 + idx_chave)
-
-                chaves = [str(cell.value) for cell in ws_conciliados[letra_coluna][1:] if cell.value is not None]
-
-                blocos = [chaves[i:i+2000] for i in range(0, len(chaves), 2000)]
-                blocos_concat = [", ".join(bloco) for bloco in blocos]
-
-                start_row = ws_resumo.max_row + 2
-                for i, texto in enumerate(blocos_concat, start=1):
-                    ws_resumo.cell(row=start_row + i - 1, column=1, value=f"Grupo {i}")
-                    ws_resumo.cell(row=start_row + i - 1, column=2, value=texto)
-
-                wb.save(output_path)
-            else:
-                st.warning("Coluna 'Chave ERP' não encontrada na aba Conciliados")
-
-        except Exception as e:
-            st.error(f"❌ Erro ao adicionar blocos de Chave ERP: {e}")
-
-        # === INTERFACE FINAL ===
-        with st.container():
-            st.header("Resultados da Conciliação")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("✅ Conciliados", 
-                        f"R$ {totais_conc['liquido']:,.2f}", 
-                        f"{totais_conc['qtd']} títulos")
-            with col2:
-                st.metric("⚠ Não Conciliados", 
-                        f"R$ {totais_nao['liquido']:,.2f}", 
-                        f"{totais_nao['qtd']} títulos")
-
-            with st.expander("📊 Ver relatório completo"):
-                st.dataframe(relatorio_df, hide_index=True)
-
-        if os.path.exists(output_path):
-            with open(output_path, "rb") as f:
-                st.download_button(
-                    label="📥 Baixar Planilha de Conciliação",
-                    data=f,
-                    file_name="Conciliação_final_cielo.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-
-    except Exception as e:
-        st.error(f"❌ Erro ao carregar arquivos: {e}")
-        st.stop()
\ No newline at end of file
+import os
+import pandas as pd
+import streamlit as st
+import logging
+from adaptadores import obter_adaptador
+from exportacao import salvar_planilha
+import painel
+from telemetria import Telemetria
+from inicializacao import configurar_logging
+import cache_parquet
+import etapas
+import amostra
+import explorador
+import mesa
+import analitico
+import jobs
+from ingestao import LeituraDoErp, ler_erp_csv, filtrar_janela, filtros_da_janela, expandir_arquivos, ler_adquirente, resumo_por_arquivo
+
+ADAPTADOR_CIELO = obter_adaptador("cielo")
+
+# Tolerância de dias da busca (também define a janela de leitura do ERP)
+TOLERANCIA_DIAS = 5
+# Módulos que leem e limpam as entradas (versão do cache em cache_parquet.py)
+LEITOR = ("cielo", "adaptadores", "adquirentes", "ingestao")
+
+
+
+# =========================
+# Função de limpeza ERP
+# =========================
+def limpar_erp(df):
+    try:
+        df["Emissão"] = pd.to_datetime(df["Emissão"], dayfirst=True, errors="coerce")
+        parcelas = df["Numero"].str.extract(r"-(\d+)/(\d+)")
+        df["Numero da Parcela"] = parcelas[0].astype(float).fillna(1).astype(int)
+        df["Total Parcelas"] = parcelas[1].astype(float).fillna(1).astype(int)
+
+        df["Valor"] = (
+            df["Valor"].astype(str).str.replace(",", ".", regex=False).astype(float)
+        )
+
+    except Exception as e:
+        logging.error(f"Erro ao limpar dados ERP: {e}", exc_info=True)
+        raise
+
+    return df
+
+# =========================
+# Função de limpeza Cielo
+# =========================
+def limpar_cielo(df):
+    """Limpa o relatório da Cielo pelo adaptador declarativo. Retorna (df, desvios)."""
+    try:
+        df, desvios = ADAPTADOR_CIELO.limpar(df)
+    except Exception as e:
+        logging.error(f"Erro ao limpar dados Cielo: {e}", exc_info=True)
+        raise
+    return df, desvios
+
+
+def carregar_planilha(caminho, janela=None, estatisticas=None):
+    """ERP em CSV ou XLSX; com `janela`, só os títulos emitidos no período (ingestao.py)."""
+    if caminho.name.lower().endswith(".csv"):
+        return ler_erp_csv(caminho, janela, estatisticas=estatisticas)
+    elif caminho.name.lower().endswith(".xlsx") or caminho.name.lower().endswith(".xls"):
+        return filtrar_janela(pd.read_excel(caminho, engine="openpyxl"), janela)
+    else:
+        raise ValueError("❌ Formato de arquivo não suportado. Só aceitamos CSV e XLSX.")
+
+
+def preparar_erp(arquivo_erp, telemetria, janela=None):
+    """Leitura e limpeza do ERP (roda na thread de leitura, em paralelo com a Cielo)."""
+    def ler_e_limpar(janela):
+        with telemetria.etapa("Leitura do ERP") as etapa:
+            df_erp = carregar_planilha(arquivo_erp, janela=janela, estatisticas=etapa)
+            etapa["linhas"] = etapa.get("lidas", len(df_erp))
+        with telemetria.etapa("Limpeza do ERP", linhas=len(df_erp)):
+            return limpar_erp(df_erp)
+
+    if not cache_parquet.ATIVO or not cache_parquet.cabe_erp(arquivo_erp):
+        return ler_e_limpar(janela)
+    # Com o cache, o ERP inteiro é guardado limpo; do cache só a janela é carregada
+    df_erp = cache_parquet.memorizar(arquivo_erp, "erp-cielo", cache_parquet.versao_do_leitor(*LEITOR),
+                                     lambda: ler_e_limpar(None), telemetria, "Leitura do ERP (cache)",
+                                     filtros=lambda: filtros_da_janela(janela))
+    return filtrar_janela(df_erp, janela)
+
+
+def preparar_cielo(arquivo_cielo, telemetria, sufixo=""):
+    """Lê e limpa um arquivo da Cielo; `sufixo` distingue as etapas com vários arquivos."""
+    def ler_e_limpar():
+        with telemetria.etapa(f"Leitura da Cielo{sufixo}") as etapa:
+            df_cielo = ADAPTADOR_CIELO.ler(arquivo_cielo)
+            etapa["linhas"] = len(df_cielo)
+        with telemetria.etapa(f"Limpeza da Cielo{sufixo}", linhas=len(df_cielo)):
+            return limpar_cielo(df_cielo)
+
+    return cache_parquet.memorizar(arquivo_cielo, "cielo", cache_parquet.versao_do_leitor(*LEITOR),
+                                   ler_e_limpar, telemetria, f"Leitura da Cielo{sufixo} (cache)")
+
+
+def _sem_progresso(feitos, total, texto=None):
+    pass
+
+
+def ler_arquivos(arquivo_erp, arquivos_cielo, telemetria, progresso, janela_erp=True):
+    """Etapa de leitura (etapas.py) com (df_cielo, desvios, df_erp); processar e previa a compartilham."""
+    # ERP e Cielo são lidos ao mesmo tempo; o período das vendas da Cielo define a janela
+    # de títulos do ERP mantidos
+    def ler():
+        with LeituraDoErp(preparar_erp, arquivo_erp, telemetria, usar_janela=janela_erp) as leitura:
+            df_cielo, desvios_cielo = ler_adquirente(
+                arquivos_cielo, lambda arquivo, sufixo: preparar_cielo(arquivo, telemetria, sufixo))
+            leitura.definir_janela(df_cielo["DATA DA VENDA"], etapas.janela_de_leitura(TOLERANCIA_DIAS))
+        return df_cielo, desvios_cielo, leitura.resultado()
+
+    progresso(0, 0, "📂 Carregando planilhas...")
+    return etapas.calcular("Leitura", etapas.assinatura("cielo", LEITOR, [arquivo_erp, *arquivos_cielo], janela_erp),
+                           ler, telemetria, medir=False)
+
+
+def previa(arquivo_erp, arquivo_cielo, progresso=None, janela_erp=True, parametros=None):
+    """
+    Estimativa da conciliação por amostra (amostra.py), para conferir os arquivos antes da
+    execução completa. A leitura fica em cache e é reaproveitada por `processar`.
+    """
+    progresso = progresso or _sem_progresso
+    arquivos_cielo = expandir_arquivos(arquivo_cielo, [".xlsx"])
+    telemetria = Telemetria("cielo", [arquivo_erp, *arquivos_cielo])
+    df_cielo, _, df_erp = ler_arquivos(arquivo_erp, arquivos_cielo, telemetria, progresso, janela_erp).valor
+    progresso(0, 0, "🔍 Conciliando a amostra...")
+    return amostra.estimar("cielo", df_cielo, df_erp, etapas.parametros(parametros))
+
+
+# =========================
+# Pipeline completo
+# =========================
+def processar(arquivo_erp, arquivo_cielo, pasta_saida=".", progresso=None, perfil=None, janela_erp=True,
+              parametros=None):
+    """
+    Executa a conciliação Cielo x ERP sem depender da interface e grava a planilha em
+    `pasta_saida`. `arquivo_cielo` pode ser um arquivo, uma lista ou .zip: os arquivos
+    são consolidados numa conciliação só. `parametros`: tolerâncias e penalidade
+    (etapas.PARAMETROS_PADRAO); as etapas já calculadas para os mesmos arquivos são
+    reaproveitadas. Retorna o dicionário exibido pelo painel.
+    """
+    progresso = progresso or _sem_progresso
+    parametros = etapas.parametros(parametros)
+
+    arquivos_cielo = expandir_arquivos(arquivo_cielo, [".xlsx"])
+    telemetria = Telemetria("cielo", [arquivo_erp, *arquivos_cielo], perfil=perfil)
+
+    leitura = ler_arquivos(arquivo_erp, arquivos_cielo, telemetria, progresso, janela_erp)
+    df_cielo, desvios_cielo, df_erp = leitura.valor
+
+    df_conciliado, df_erp = etapas.conciliar("cielo", leitura, df_cielo, df_erp, parametros, telemetria, progresso)
+    df_aba_conciliados = df_conciliado[df_conciliado["Status"] == "Conciliado"].copy()
+    df_aba_nao_conciliados = df_conciliado[df_conciliado["Status"] != "Conciliado"].copy()
+
+    totais_conc = {
+        "liquido": df_aba_conciliados["VALOR LÍQUIDO"].sum(),
+        "parcela": df_aba_conciliados["VALOR DA PARCELA"].sum(),
+        "qtd": len(df_aba_conciliados)
+    }
+    totais_nao = {
+        "liquido": df_aba_nao_conciliados["VALOR LÍQUIDO"].sum(),
+        "parcela": df_aba_nao_conciliados["VALOR DA PARCELA"].sum(),
+        "qtd": len(df_aba_nao_conciliados)
+    }
+
+    relatorio_linhas = [
+        ["RELATÓRIO DE CONCILIAÇÃO", "", ""],
+        ["CONCILIADO", "", ""],
+        ["- Valor Líquido Total", "", f"R$ {totais_conc['liquido']:,.2f}"],
+        ["- Valor da Parcela Total", "", f"R$ {totais_conc['parcela']:,.2f}"],
+        ["- Quantidade de Títulos", "", f"{totais_conc['qtd']}"],
+        ["", "", ""],
+        ["NÃO CONCILIADO", "", ""],
+        ["- Valor Líquido Total", "", f"R$ {totais_nao['liquido']:,.2f}"],
+        ["- Valor da Parcela Total", "", f"R$ {totais_nao['parcela']:,.2f}"],
+        ["- Quantidade de Títulos", "", f"{totais_nao['qtd']}"]
+    ]
+    relatorio_df = pd.DataFrame(relatorio_linhas, columns=["Categoria", "Descrição", "Valor"])
+
+    # =====================================================================
+    # EXCLUSÃO FINAL DAS COLUNAS (APÓS TODO O PROCESSAMENTO)
+    # =====================================================================
+    # Definir colunas a serem excluídas pelos nomes reais
+    colunas_para_excluir = [
+        "TIPO DE LANÇAMENTO",   # Coluna I
+        "Parcela ERP",          # Coluna O
+        "Total Parcelas ERP"    # Coluna P
+    ]
+
+    # Aplicar exclusão apenas se as colunas existirem
+    df_aba_conciliados = df_aba_conciliados.drop(columns=colunas_para_excluir, errors="ignore")
+    df_aba_nao_conciliados = df_aba_nao_conciliados.drop(columns=colunas_para_excluir, errors="ignore")
+
+    # Agora gerar o Excel com as colunas já excluídas
+    progresso(0, 0, "Gerando arquivo de conciliação...")
+    abas = {
+        "Conciliados": df_aba_conciliados,
+        "Não conciliados": df_aba_nao_conciliados,
+        "Resumo": relatorio_df,
+    }
+    por_arquivo = resumo_por_arquivo(df_aba_conciliados, df_aba_nao_conciliados)
+    if por_arquivo is not None:
+        abas["Por arquivo"] = por_arquivo
+    # Abas especiais (aluguel e estornos, desviadas pelo adaptador) - também remover coluna I
+    for aba, df_desvio in desvios_cielo.items():
+        if not df_desvio.empty:
+            abas[aba] = df_desvio.drop(columns=["TIPO DE LANÇAMENTO"], errors="ignore")
+
+    analitico.registrar_nao_conciliados("cielo", df_aba_nao_conciliados, leitura.chave, ADAPTADOR_CIELO.spec, telemetria)
+
+    resultado = {
+        "titulo": "Resultados da Conciliação",
+        "metricas": [
+            ("✅ Conciliados", f"R$ {totais_conc['liquido']:,.2f}", f"{totais_conc['qtd']} títulos"),
+            ("⚠ Não Conciliados", f"R$ {totais_nao['liquido']:,.2f}", f"{totais_nao['qtd']} títulos"),
+        ],
+        "relatorio": relatorio_df,
+        "por_arquivo": por_arquivo,
+        "caminho": None,
+        "nome_download": "Conciliação_final_cielo.xlsx",
+        "avisos": [],
+        # Pendências para a conciliação manual (mesa.py)
+        "mesa": mesa.Mesa(df_aba_nao_conciliados, df_erp, ADAPTADOR_CIELO.spec, totais_conc["qtd"], totais_conc["liquido"],
+                           parametros["penalidade_pessoa"]),
+    }
+    # Os números já aparecem na tela enquanto a planilha é gravada
+    jobs.publicar_previa(dict(resultado))
+
+    output_path = os.path.join(pasta_saida, "Conciliação_final.xlsx")
+    with telemetria.etapa("Exportação", linhas=sum(len(df) for df in abas.values())):
+        resultado["avisos"] = salvar_planilha(abas, output_path)
+        resultado["tabelas"] = explorador.guardar(abas, pasta_saida)
+    resultado["caminho"] = output_path
+    resultado["desempenho"] = telemetria.resumo()
+    resultado["relatorio_execucao"] = telemetria.salvar(pasta_saida)
+    return resultado
+
+
+def main():
+    configurar_logging()
+
+    # === BARRA LATERAL ===
+    with st.sidebar:
+        st.markdown("# App Conciliação Bancária")
+        st.markdown("### Carregar planilhas")
+        caminho_erp = st.file_uploader("ERP (CSV)", type=["csv"], key="erp_uploader")
+        caminho_cielo = st.file_uploader("Cielo (XLSX ou ZIP)", type=["xlsx", "zip"], key="cielo_uploader",
+                                         accept_multiple_files=True)
+        parametros = painel.parametros_de_conciliacao("cielo")
+        painel.listar_conciliacoes("cielo")
+
+    # === TELA INICIAL ===
+    if caminho_erp is None or not caminho_cielo:
+        # Conciliação já submetida (ex: navegador reconectou) continua disponível
+        if painel.retomar_conciliacao("cielo"):
+            return
+
+        st.subheader("Bem-vindo ao Sistema de Conciliação")
+        st.markdown("""
+        <div style='text-align: center; margin-bottom: 20px;'>
+            <p>Este sistema realiza a conciliação automática entre:</p>
+            <p>•  Cielo</p>
+            <p>• ERP</p>
+        </div>
+        """, unsafe_allow_html=True)
+        st.warning("⚠️ Por favor, faça upload de ambos os arquivos para iniciar a conciliação")
+        st.stop()
+
+    painel.conciliar_em_segundo_plano("cielo", processar, caminho_erp, caminho_cielo, parametros=parametros,
+                                      previa=previa)
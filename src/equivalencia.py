@@ -0,0 +1,385 @@
+"""
+Equivalência entre motores de conciliação
+Descrição: roda os motores de conciliação de cada banco sobre os mesmos dados limpos e
+compara o que cada um decidiu para cada linha da adquirente (Chave ERP, Status e
+Pontuação) com a linha de base aprovada. Um motor mais rápido só entra se não mudar
+nenhuma conciliação.
+
+Casos: os arquivos de exemplo das pastas "conciliação ..." (CASOS), os mesmos com hora na
+data da venda (<caso>-horario: nos arquivos de exemplo todas as datas são à meia-noite, e
+a diferença em dias precisa ser arredondada para baixo do mesmo jeito em todos os motores)
+e, com --copias N, versões ampliadas (N cópias deslocadas no tempo, com valores e
+identificadores levemente alterados), para exercitar bases maiores.
+
+Linhas de base aprovadas ficam em equivalencia/<caso>.csv, na raiz do projeto. A primeira
+de cada caso veio do motor "referencia": a cópia congelada das buscas anteriores às
+otimizações (referencia.py), que não muda junto com o código do app. Quando existe uma
+linha de base, os motores são comparados com ela (a referência só roda se pedida em
+--motores); senão, com o motor de SEM_LINHA_DE_BASE. Os motores também são comparados
+entre si com outras penalidades de "Pessoa do Título" (--penalidades, padrão
+PENALIDADES_ALTERNATIVAS), que não têm linha de base. Uma diferença intencional (ex: uma correção de
+regra) é aceita gravando a nova saída com --aprovar "motivo"; o motivo e as linhas que
+mudaram ficam em equivalencia/aprovacoes.json.
+
+Uso: python equivalencia.py [--casos cielo-teste ...] [--motores python kernel]
+     [--copias 3] [--repeticoes 1] [--mostrar 5] [--penalidades 0 250]
+     [--aprovar "motivo" [--motor kernel]]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from motor import PENALIDADE_PESSOA
+
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(PASTA)
+PASTA_BASES = os.path.join(RAIZ, "equivalencia")
+ARQUIVO_APROVACOES = os.path.join(PASTA_BASES, "aprovacoes.json")
+
+REFERENCIA = "referencia"
+COLUNAS_ATRIBUICAO = ["Chave ERP", "Status", "Pontuação"]
+# Colunas que identificam a linha da adquirente (além dos identificadores do cadastro)
+COLUNAS_DA_LINHA = ["DATA DA VENDA", "PARCELA", "TOTAL_PARCELAS", "VALOR DA PARCELA"]
+
+# Cópias ampliadas: distância entre cópias maior que qualquer tolerância de data
+DESLOCAMENTO_DIAS = 70
+FRACAO_VALOR_ALTERADO = 0.10
+FRACAO_ID_ALTERADO = 0.05
+FRACAO_ERP_REMOVIDO = 0.03
+# Penalidades de "Pessoa do Título" além da padrão em que os motores também são comparados
+PENALIDADES_ALTERNATIVAS = (0,)
+
+CASOS = {
+    "cielo-teste": ("cielo", "conciliação cielo/TESTEAnálise de Titulos de Cartão de Terceiros - SFR.csv",
+                    "conciliação cielo/TESTERecebiveis_cielo_detalhe-20250615-20250621-1-1-xlsx.xlsx"),
+    "cielo-dnv": ("cielo", "conciliação cielo/DNVAnálise de Titulos de Cartão de Terceiros - SFR (1).csv",
+                  "conciliação cielo/DNVRecebiveis_cielo_detalhe-20250622-20250630-1-1-xlsx.xlsx"),
+    "santander-teste": ("santander", "conciliação cielo/TESTEAnálise de Titulos de Cartão de Terceiros - SFR.csv",
+                        "conciliação santander/testeRecebivel_Completos_9784485_20250622_20250630_dc16d078609e4a3e84cc934fc86d6053.xlsx"),
+    "credshop-maio": ("credshop", "conciliação credshop/Análise de Titulos de Cartão de Terceiros - SFR (3).csv",
+                      "conciliação credshop/creditos-efetuar-20250501-20250507.csv"),
+    "credshop-dnv": ("credshop", "conciliação cielo/DNVAnálise de Titulos de Cartão de Terceiros - SFR (1).csv",
+                     "conciliação credshop/testecreditos-efetuar-20250622-20250630.csv"),
+}
+
+
+# =========================
+# Motores
+# =========================
+def _referencia(banco):
+    def conciliar(df_adq, df_erp, penalidade):
+        import referencia
+
+        if banco == "santander":
+            return pd.concat(referencia.conciliar_santander(df_adq, df_erp, penalidade)[:2], ignore_index=True)
+        funcao = referencia.conciliar_cielo if banco == "cielo" else referencia.conciliar_credshop
+        return funcao(df_adq, df_erp, penalidade=penalidade)[0]
+    return conciliar
+
+
+def _guloso(modulo, usar_kernel):
+    def conciliar(df_adq, df_erp, penalidade):
+        import motor
+        from adquirentes import ADQUIRENTES
+
+        banco = importlib.import_module(modulo)
+        df_conciliado, _ = motor.conciliar_guloso(df_adq, df_erp, ADQUIRENTES[modulo], tolerancia_dias=banco.TOLERANCIA_DIAS,
+                                                  usar_kernel=usar_kernel, penalidade_pessoa=penalidade)
+        return df_conciliado
+    return conciliar
+
+
+def _varredura(banco, usar_duckdb=False):
+    def conciliar(df_adq, df_erp, penalidade):
+        import varredura
+
+        # Pares, pontuação, atribuição e colunas do resultado: o caminho do app no Santander (etapas.py)
+        motor = varredura.preparar(banco, df_adq, df_erp, usar_duckdb=usar_duckdb)
+        cenario = motor.cenario(varredura.TOLERANCIA_DIAS, varredura.TOLERANCIA_VALOR, penalidade)
+        resultado = motor.conciliar(df_adq, df_erp, cenario)
+        return resultado[0] if banco != "santander" else pd.concat(resultado[:2], ignore_index=True)
+    return conciliar
+
+
+# banco -> {nome do motor: conciliar(df_adq, df_erp, penalidade) -> DataFrame da adquirente com o resultado}
+MOTORES = {
+    "cielo": {"referencia": _referencia("cielo"), "python": _guloso("cielo", False), "kernel": _guloso("cielo", True), "varredura": _varredura("cielo"),
+              "duckdb": _varredura("cielo", True)},
+    "credshop": {"referencia": _referencia("credshop"), "python": _guloso("credshop", False), "kernel": _guloso("credshop", True),
+                 "varredura": _varredura("credshop"), "duckdb": _varredura("credshop", True)},
+    "santander": {"referencia": _referencia("santander"), "varredura": _varredura("santander"), "duckdb": _varredura("santander", True)},
+}
+# Motor que dá o resultado esperado quando não há linha de base (casos ampliados, outras
+# penalidades). Na CredShop a referência congelada repete a busca (ver aprovacoes.json):
+# vale o caminho em Python, que já é o comportamento aprovado.
+SEM_LINHA_DE_BASE = {"cielo": REFERENCIA, "credshop": "python", "santander": REFERENCIA}
+
+
+def registrar(banco, nome, conciliar):
+    """
+    Acrescenta um motor novo à comparação (ex: registrar("cielo", "experimental", funcao));
+    `conciliar(df_adq, df_erp, penalidade)`.
+    """
+    MOTORES[banco][nome] = conciliar
+
+
+def motores_disponiveis(banco):
+    """Motores comparados por padrão: os instalados, sem a referência (lenta, já gravada nas linhas de base)."""
+    import kernel
+    import analitico
+
+    opcionais = {"kernel": kernel.DISPONIVEL, "duckdb": analitico.DISPONIVEL, REFERENCIA: False}
+    return [nome for nome in MOTORES[banco] if opcionais.get(nome, True)]
+
+
+# =========================
+# Casos
+# =========================
+def carregar_caso(banco, arquivo_erp, arquivo_adq):
+    """(df_adq, df_erp) limpos, pelo mesmo caminho de leitura do app."""
+    from telemetria import Telemetria
+
+    modulo = importlib.import_module(banco)
+    telemetria = Telemetria()
+    with open(os.path.join(RAIZ, arquivo_erp), "rb") as erp, open(os.path.join(RAIZ, arquivo_adq), "rb") as adq:
+        df_erp = modulo.preparar_erp(erp, telemetria)
+        df_adq, desvios = getattr(modulo, f"preparar_{banco}")(adq, telemetria)
+    if banco == "santander":
+        df_adq, _ = modulo.separar_cancelados(df_adq, desvios["Cancelamentos"])
+    return df_adq.reset_index(drop=True), df_erp.reset_index(drop=True)
+
+
+def com_horario(df_adq, semente=0):
+    """Cópia da adquirente com uma hora do dia sorteada (de 00:01 a 23:59) em cada DATA DA VENDA."""
+    rng = np.random.default_rng(semente)
+    adq = df_adq.copy()
+    adq["DATA DA VENDA"] = adq["DATA DA VENDA"] + pd.to_timedelta(rng.integers(1, 24 * 60, len(adq)), unit="min")
+    return adq
+
+
+def ampliar(df_adq, df_erp, copias, identificadores, semente=0):
+    """
+    `copias` cópias do caso, cada uma deslocada DESLOCAMENTO_DIAS no tempo, com chaves ERP
+    novas, parte dos valores e identificadores alterados e alguns títulos ERP removidos.
+    """
+    rng = np.random.default_rng(semente)
+    partes_adq, partes_erp = [df_adq], [df_erp]
+    salto_chave = int(df_erp["Chave"].max()) + 1
+    for k in range(1, copias):
+        adq, erp = df_adq.copy(), df_erp.copy()
+        for df in (adq, erp):
+            for coluna in df.select_dtypes("datetime").columns:
+                df[coluna] = df[coluna] + pd.Timedelta(days=k * DESLOCAMENTO_DIAS)
+        erp["Chave"] = erp["Chave"] + k * salto_chave
+        if "Ch Criação" in erp.columns:
+            erp["Ch Criação"] = erp["Ch Criação"] + k * salto_chave
+
+        alterar = rng.random(len(adq)) < FRACAO_VALOR_ALTERADO
+        adq.loc[alterar, "VALOR DA PARCELA"] += rng.choice([-0.15, -0.05, -0.01, 0.01, 0.05, 0.15], alterar.sum())
+        for coluna, _ in identificadores:
+            if pd.api.types.is_string_dtype(adq[coluna]):
+                alterar = (rng.random(len(adq)) < FRACAO_ID_ALTERADO) & adq[coluna].notna()
+                digitos = rng.integers(0, 10, alterar.sum()).astype(str)
+                adq.loc[alterar, coluna] = adq.loc[alterar, coluna].str[:-1] + digitos
+
+        partes_adq.append(adq)
+        partes_erp.append(erp[rng.random(len(erp)) >= FRACAO_ERP_REMOVIDO])
+    return pd.concat(partes_adq, ignore_index=True), pd.concat(partes_erp, ignore_index=True)
+
+
+# =========================
+# Atribuições e comparação
+# =========================
+def atribuicoes(df_resultado, identificadores):
+    """
+    (linha, n, Chave ERP, Status, Pontuação) de cada linha da adquirente. `linha` descreve a
+    linha pelo conteúdo; `n` numera linhas idênticas, já ordenadas pelo resultado, para que
+    a ordem entre elas não conte como diferença.
+    """
+    colunas = [col for col, _ in identificadores] + COLUNAS_DA_LINHA
+    linha = [" | ".join(map(_texto, valores)) for valores in df_resultado[colunas].itertuples(index=False)]
+    chave = pd.to_numeric(df_resultado["Chave ERP"], errors="coerce").astype("Int64")
+    tabela = pd.DataFrame({
+        "linha": linha,
+        "Chave ERP": [_texto(valor) for valor in chave],
+        "Status": df_resultado["Status"].astype(str).to_numpy(),
+        "Pontuação": pd.to_numeric(df_resultado["Pontuação"], errors="coerce").round(2).to_numpy(),
+    })
+    tabela = tabela.sort_values(["linha", *COLUNAS_ATRIBUICAO], kind="stable", ignore_index=True)
+    tabela.insert(1, "n", tabela.groupby("linha").cumcount())
+    return tabela
+
+
+def _texto(valor):
+    return "" if pd.isna(valor) else str(valor)
+
+
+def comparar(esperado, obtido):
+    """Linhas com atribuição diferente (ou presentes só de um lado)."""
+    juntos = esperado.merge(obtido, on=["linha", "n"], how="outer", suffixes=(" esperado", " obtido"), indicator=True)
+    diferente = juntos["_merge"] != "both"
+    for coluna in ("Chave ERP", "Status"):
+        diferente |= juntos[f"{coluna} esperado"] != juntos[f"{coluna} obtido"]
+    diferente |= ~np.isclose(juntos["Pontuação esperado"], juntos["Pontuação obtido"], equal_nan=True)
+    return juntos[diferente].drop(columns="_merge")
+
+
+def _arquivo_base(caso):
+    return os.path.join(PASTA_BASES, f"{caso}.csv")
+
+
+def ler_base(caso):
+    caminho = _arquivo_base(caso)
+    if not os.path.exists(caminho):
+        return None
+    base = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    base["n"] = base["n"].astype(int)
+    base["Pontuação"] = pd.to_numeric(base["Pontuação"])
+    return base
+
+
+def _resumir_diferencas(diferencas):
+    """Linhas que mudaram, no formato gravado em aprovacoes.json."""
+    return [{coluna: (None if pd.isna(valor) else valor) for coluna, valor in linha.items()}
+            for linha in diferencas.to_dict("records")]
+
+
+def aprovar(caso, motor, tabela, motivo):
+    """Grava `tabela` como linha de base do caso e registra o motivo e as linhas que mudaram."""
+    anterior = ler_base(caso)
+    diferencas = None if anterior is None else comparar(anterior, tabela)
+    os.makedirs(PASTA_BASES, exist_ok=True)
+    tabela.to_csv(_arquivo_base(caso), index=False)
+
+    aprovacoes = []
+    if os.path.exists(ARQUIVO_APROVACOES):
+        with open(ARQUIVO_APROVACOES, encoding="utf-8") as f:
+            aprovacoes = json.load(f)
+    aprovacoes.append({
+        "caso": caso,
+        "motor": motor,
+        "motivo": motivo,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "linhas": len(tabela),
+        "diferencas_da_anterior": None if diferencas is None else len(diferencas),
+        "linhas_alteradas": None if diferencas is None else _resumir_diferencas(diferencas),
+    })
+    with open(ARQUIVO_APROVACOES, "w", encoding="utf-8") as f:
+        json.dump(aprovacoes, f, ensure_ascii=False, indent=2)
+
+
+# =========================
+# Execução
+# =========================
+def executar_caso(df_adq, df_erp, banco, motores, repeticoes=1, penalidade=PENALIDADE_PESSOA):
+    """{motor: (tabela de atribuições, melhor tempo em s)}, com a penalidade de "Pessoa do Título" dada."""
+    from adquirentes import ADQUIRENTES
+
+    identificadores = ADQUIRENTES[banco]["identificadores"]
+    resultados = {}
+    for nome in motores:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            df_resultado = MOTORES[banco][nome](df_adq, df_erp, penalidade)
+            tempos.append(time.perf_counter() - inicio)
+        resultados[nome] = (atribuicoes(df_resultado, identificadores), min(tempos))
+    return resultados
+
+
+def _relatar(titulo, esperado, resultados, mostrar):
+    """Imprime a comparação de cada motor com `esperado`; devolve uma entrada do relatório por motor."""
+    # Velocidade relativa ao primeiro motor da lista
+    tempo_referencia = next(iter(resultados.values()))[1]
+    print(f"\n{titulo}")
+    entradas = []
+    for nome, (tabela, tempo) in resultados.items():
+        diferencas = comparar(esperado, tabela)
+        entradas.append({"motor": nome, "tempo_s": round(tempo, 3), "diferencas": len(diferencas)})
+        marca = "✅" if diferencas.empty else "❌"
+        print(f"  {marca} {nome:<12} {tempo:8.2f} s  {tempo_referencia / tempo:6.1f}x  "
+              f"{len(diferencas)} diferença(s)")
+        if not diferencas.empty and mostrar:
+            print(diferencas.head(mostrar).to_string(index=False, max_colwidth=60))
+    return entradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--casos", nargs="+", default=list(CASOS), choices=list(CASOS))
+    parser.add_argument("--motores", nargs="+", help="padrão: todos os disponíveis do banco")
+    parser.add_argument("--copias", type=int, default=0, help="acrescenta casos ampliados com N cópias")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--mostrar", type=int, default=5, help="diferenças exibidas por motor")
+    parser.add_argument("--penalidades", nargs="*", type=float, default=list(PENALIDADES_ALTERNATIVAS),
+                        help="outras penalidades de \"Pessoa do Título\" comparadas (sem linha de base)")
+    parser.add_argument("--aprovar", metavar="MOTIVO", help="grava a saída de --motor como linha de base")
+    parser.add_argument("--motor", default=REFERENCIA, help="motor aprovado com --aprovar")
+    parser.add_argument("--json", help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    from adquirentes import ADQUIRENTES
+
+    relatorio = []
+    for nome_caso in args.casos:
+        banco, arquivo_erp, arquivo_adq = CASOS[nome_caso]
+        df_adq, df_erp = carregar_caso(banco, arquivo_erp, arquivo_adq)
+        variantes = [(nome_caso, df_adq, df_erp), (f"{nome_caso}-horario", com_horario(df_adq, args.semente), df_erp)]
+        if args.copias > 1:
+            variantes.append((f"{nome_caso}-x{args.copias}", *ampliar(
+                df_adq, df_erp, args.copias, ADQUIRENTES[banco]["identificadores"], args.semente)))
+
+        for caso, adq, erp in variantes:
+            escolhidos = [m for m in (args.motores or motores_disponiveis(banco)) if m in MOTORES[banco]]
+            sem_base = SEM_LINHA_DE_BASE[banco]
+            base = ler_base(caso)
+            motores = list(escolhidos)
+            if base is None and sem_base not in motores:
+                motores.insert(0, sem_base)
+            if args.aprovar and args.motor not in motores:
+                motores.append(args.motor)
+            resultados = executar_caso(adq, erp, banco, motores, args.repeticoes)
+            if args.aprovar:
+                aprovar(caso, args.motor, resultados[args.motor][0], args.aprovar)
+                base = ler_base(caso)
+
+            esperado = base if base is not None else resultados[sem_base][0]
+            origem = "linha de base" if base is not None else f"motor {sem_base}"
+            entradas = _relatar(f"{caso} ({len(adq)} linhas x {len(erp)} títulos ERP) — comparado com {origem}",
+                                esperado, resultados, args.mostrar)
+            relatorio += [dict(e, caso=caso, penalidade=PENALIDADE_PESSOA, comparado_com=origem) for e in entradas]
+
+            # Outras penalidades: sem linha de base, todos contra o mesmo motor
+            for penalidade in args.penalidades:
+                motores = [sem_base] + [m for m in escolhidos if m != sem_base]
+                resultados = executar_caso(adq, erp, banco, motores, args.repeticoes, penalidade)
+                entradas = _relatar(f"{caso} com penalidade {penalidade:g} — comparado com motor {sem_base}",
+                                    resultados[sem_base][0], resultados, args.mostrar)
+                relatorio += [dict(e, caso=caso, penalidade=penalidade, comparado_com=f"motor {sem_base}")
+                              for e in entradas]
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    divergentes = sum(bool(entrada["diferencas"]) for entrada in relatorio)
+    if divergentes:
+        print(f"\n❌ {divergentes} motor(es) com conciliações diferentes")
+        sys.exit(1)
+    print("\n✅ Todos os motores deram as mesmas conciliações")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Conciliação por estabelecimento (loja)
+Descrição: cada linha da adquirente traz o estabelecimento que vendeu (ex: EC CENTRALIZADOR
+no Santander) e cada título do ERP traz a loja no "1o. Agrupamento". Com o mapeamento
+estabelecimento -> agrupamento cadastrado, a conciliação é dividida por loja: as vendas de
+cada loja são comparadas só com os títulos da mesma loja, em paralelo, e a planilha ganha
+uma aba por loja e os totais por loja.
+
+O mapeamento vem da especificação da adquirente (adquirentes.py, chave "estabelecimentos")
+e pode ser completado sem mexer no código por um JSON (CONCILIA_ESTABELECIMENTOS, padrão
+estabelecimentos.json na pasta de execução):
+
+    {"santander": {"9784485": "LE Piauí Mat Construções", "12150842": "LE Piauí The Filial 02"}}
+
+Estabelecimentos sem mapeamento formam a loja "Outros estabelecimentos", comparada com os
+títulos dos agrupamentos que nenhum estabelecimento mapeado usa. As partições do ERP nunca
+se sobrepõem, então um título não pode ser usado por duas lojas.
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+ARQUIVO_MAPA = os.environ.get("CONCILIA_ESTABELECIMENTOS", "estabelecimentos.json")
+# Lojas conciliadas ao mesmo tempo
+LOJAS_PARALELAS = int(os.environ.get("CONCILIA_LOJAS", "4"))
+SEM_MAPEAMENTO = "Outros estabelecimentos"
+# Coluna com a loja de cada linha no resultado
+COLUNA_LOJA = "LOJA"
+
+
+def _chave(valor):
+    """EC como texto: 9784485, 9784485.0 e "9784485 " viram "9784485"."""
+    if pd.isna(valor):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def mapa_de_estabelecimentos(spec, arquivo=None):
+    """Mapeamento estabelecimento -> agrupamento do ERP da adquirente (vazio = sem divisão)."""
+    config = spec.get("estabelecimentos")
+    if not config:
+        return {}
+    mapa = {_chave(ec): agrupamento for ec, agrupamento in config.get("mapa", {}).items()}
+
+    arquivo = arquivo or ARQUIVO_MAPA
+    if os.path.exists(arquivo):
+        try:
+            with open(arquivo, encoding="utf-8") as f:
+                extras = json.load(f).get(spec["nome"], {})
+            mapa.update({_chave(ec): agrupamento for ec, agrupamento in extras.items()})
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Mapeamento de estabelecimentos ignorado ({arquivo}): {e}")
+    return mapa
+
+
+def particionar(df_adq, df_erp, config, mapa):
+    """
+    Divide adquirente e ERP por loja. Retorna [(loja, df_adq_loja, df_erp_loja), ...] na
+    ordem em que as lojas aparecem no arquivo da adquirente.
+    """
+    lojas_adq = df_adq[config["coluna"]].map(_chave).map(mapa)
+    agrupamentos_erp = df_erp[config["coluna_erp"]]
+
+    partes = []
+    for loja in lojas_adq.dropna().unique():
+        partes.append((loja, df_adq[lojas_adq == loja], df_erp[agrupamentos_erp == loja]))
+
+    sem_loja = lojas_adq.isna()
+    if sem_loja.any():
+        resto_erp = df_erp[~agrupamentos_erp.isin(set(mapa.values()))]
+        partes.append((SEM_MAPEAMENTO, df_adq[sem_loja], resto_erp))
+
+    for loja, adq, erp in partes:
+        logging.info(f"🏬 {loja}: {len(adq)} linhas da adquirente x {len(erp)} títulos do ERP")
+    return partes
+
+
+class _ProgressoSomado:
+    """Junta o progresso das lojas numa barra só (feitos e total somados)."""
+
+    def __init__(self, progresso):
+        self.progresso = progresso
+        self.feitos = {}
+        self.totais = {}
+        self._trava = threading.Lock()
+
+    def da_loja(self, loja):
+        def progresso(feitos, total, texto=None):
+            with self._trava:
+                self.feitos[loja] = feitos
+                self.totais[loja] = total
+                soma_feitos, soma_total = sum(self.feitos.values()), sum(self.totais.values())
+            self.progresso(soma_feitos, soma_total, texto)
+        return progresso
+
+
+def conciliar_por_loja(partes, conciliar, progresso):
+    """
+    Chama `conciliar(loja, df_adq, df_erp, progresso_da_loja)` para cada parte, em
+    paralelo, e devolve [(loja, resultado), ...] na ordem de `partes`.
+    """
+    somado = _ProgressoSomado(progresso)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(partes), LOJAS_PARALELAS)),
+                            thread_name_prefix="loja") as pool:
+        futuros = [pool.submit(conciliar, loja, adq, erp, somado.da_loja(loja)) for loja, adq, erp in partes]
+        return [(loja, futuro.result()) for (loja, _, _), futuro in zip(partes, futuros)]
+
+
+def abas_por_loja(conciliados, nao_conciliados, ordem=None, prefixo="Loja "):
+    """
+    Uma aba por loja com as linhas conciliadas e não conciliadas dela (coluna LOJA), na
+    `ordem` informada (ex: a do resumo por loja).
+    """
+    todos = pd.concat([conciliados, nao_conciliados], ignore_index=True)
+    grupos = dict(list(todos.groupby(COLUNA_LOJA, sort=False)))
+    abas = {}
+    for loja in (list(ordem) if ordem is not None else list(grupos)):
+        if loja in grupos:
+            abas[_nome_de_aba(prefixo + str(loja), abas)] = grupos[loja].drop(columns=COLUNA_LOJA)
+    return abas
+
+
+def _nome_de_aba(nome, usados):
+    """Excel: até 31 caracteres, sem []:*?/\\ e sem repetir nome."""
+    nome = "".join(" " if c in '[]:*?/\\' else c for c in nome).strip()[:31]
+    base, n = nome, 2
+    while nome in usados:
+        sufixo = f" ({n})"
+        nome, n = base[:31 - len(sufixo)] + sufixo, n + 1
+    return nome
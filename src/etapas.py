@@ -0,0 +1,186 @@
+"""
+Conciliação em etapas com cache
+Descrição: ajustar uma tolerância ou a penalidade de "Pessoa do Título" no app rodava a
+conciliação inteira, da leitura dos arquivos em diante. A conciliação é dividida em etapas
+encadeadas, cada uma guardada em memória pela chave das suas entradas. A chave de uma
+etapa inclui a chave da etapa anterior, então mudar um parâmetro só refaz as etapas que
+dependem dele. O relatório (planilha do job) é sempre refeito.
+
+Cielo / CredShop (motor.py):
+
+    leitura e limpeza  ->  busca gulosa                 ->  relatório
+    (arquivos)             (dias, valor, penalidade)
+
+A busca roda no kernel compilado quando o Numba está instalado, com os arrays do ERP
+reaproveitados entre execuções (indice_erp.py); outro parâmetro refaz só a busca. No modo
+analítico (CONCILIA_DUCKDB=1, analitico.py) a Cielo e a CredShop seguem as etapas do
+Santander abaixo, com os pares gerados no DuckDB.
+
+Santander (varredura.py):
+
+    leitura e limpeza  ->  pares candidatos  ->  pontuação  ->  atribuição  ->  relatório
+    (arquivos)             (teto de dias/valor)  (penalidade)   (dias, valor)
+
+Outra tolerância refaz a atribuição; outra penalidade, a pontuação e a atribuição. Os
+pares candidatos são gerados até TETO_DIAS / TETO_VALOR (os limites dos controles da barra
+lateral), então qualquer tolerância escolhida cabe neles.
+
+O cache é do processo, compartilhado pelas sessões, com as LIMITE_ETAPAS entradas usadas
+mais recentemente (CONCILIA_ETAPAS, padrão 24). "Limpar cache" na barra lateral o esvazia.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import cache_parquet
+from motor import PENALIDADE_PESSOA
+
+
+LIMITE_ETAPAS = int(os.environ.get("CONCILIA_ETAPAS", "24"))
+
+# Parâmetros ajustáveis na barra lateral e os valores usados quando não informados
+PARAMETROS_PADRAO = {
+    "tolerancia_dias": 5,
+    "tolerancia_valor": 0.20,
+    "penalidade_pessoa": PENALIDADE_PESSOA,
+}
+# Limites dos controles: os pares candidatos são gerados uma vez até eles
+TETO_DIAS = 15
+TETO_VALOR = 2.00
+
+_cache = OrderedDict()
+_trava = threading.Lock()
+
+
+class Etapa:
+    """Resultado de uma etapa e a chave que as etapas seguintes usam como dependência."""
+
+    def __init__(self, chave, valor, reaproveitada):
+        self.chave = chave
+        self.valor = valor
+        self.reaproveitada = reaproveitada
+
+
+def chave(nome, entradas):
+    return hashlib.sha1(f"{nome}|{entradas!r}".encode()).hexdigest()
+
+
+def calcular(nome, entradas, calcular_valor, telemetria=None, linhas=0, medir=True):
+    """
+    Valor da etapa `nome` para `entradas` (parâmetros e chaves das etapas anteriores),
+    guardado da última vez ou calculado agora. O valor guardado é compartilhado: quem o usa
+    não deve alterá-lo. `medir=False` quando o cálculo já registra as suas etapas.
+    """
+    k = chave(nome, entradas)
+    with _trava:
+        if k in _cache:
+            _cache.move_to_end(k)
+            valor = _cache[k]
+            encontrado = True
+        else:
+            encontrado = False
+
+    if encontrado:
+        logging.info(f"♻️ {nome}: reaproveitada")
+        if telemetria is not None:
+            with telemetria.etapa(f"{nome} (reaproveitada)", linhas=linhas):
+                pass
+        return Etapa(k, valor, True)
+
+    if telemetria is not None and medir:
+        with telemetria.etapa(nome, linhas=linhas):
+            valor = calcular_valor()
+    else:
+        valor = calcular_valor()
+    with _trava:
+        _cache[k] = valor
+        while len(_cache) > LIMITE_ETAPAS:
+            _cache.popitem(last=False)
+    return Etapa(k, valor, False)
+
+
+def limpar():
+    with _trava:
+        _cache.clear()
+
+
+# =========================
+# Parâmetros e entradas
+# =========================
+def parametros(informados=None):
+    """Parâmetros padrão completados com os `informados` (None = todos padrão)."""
+    completos = dict(PARAMETROS_PADRAO)
+    completos.update({nome: valor for nome, valor in (informados or {}).items() if valor is not None})
+    if completos["tolerancia_dias"] < 0 or completos["tolerancia_valor"] < 0:
+        raise ValueError("❌ As tolerâncias não podem ser negativas.")
+    return completos
+
+
+def janela_de_leitura(tolerancia_dias):
+    """Dias de folga da janela do ERP: cobre qualquer tolerância dos controles."""
+    return max(tolerancia_dias, TETO_DIAS)
+
+
+def assinatura(banco, leitor, arquivos, *opcoes):
+    """Entradas da etapa de leitura: conteúdo dos arquivos, versão do leitor e opções."""
+    versao = cache_parquet.versao_do_leitor(*leitor)
+    return (banco, versao, tuple(cache_parquet.chave(a, banco, versao) for a in arquivos), opcoes)
+
+
+# =========================
+# Conciliação
+# =========================
+def conciliar(banco, leitura, df_adq, df_erp, parametros, telemetria=None, progresso=None, loja=None):
+    """
+    Conciliação de df_adq x df_erp, vindos da Etapa `leitura`, com os `parametros`, pelas
+    etapas em cache. Devolve o mesmo que o conciliador do banco: (df_adq, df_erp) na Cielo e
+    na CredShop, (df_conciliado, df_nao_conciliado, df_erp) no Santander. `loja` separa as
+    etapas de cada loja do Santander.
+    """
+    import analitico
+
+    metricas = telemetria.metricas if telemetria is not None else None
+    if banco == "santander" or analitico.ATIVO:
+        varredura, cenario = _atribuir(banco, leitura, df_adq, df_erp, parametros, telemetria, progresso, loja)
+        return varredura.conciliar(df_adq, df_erp, cenario, metricas=metricas)
+
+    import motor
+    from adquirentes import ADQUIRENTES
+
+    spec = ADQUIRENTES[banco]
+    dias, valor, penalidade = parametros["tolerancia_dias"], parametros["tolerancia_valor"], parametros["penalidade_pessoa"]
+    if progresso is not None:
+        progresso(0, 0, "🔄 Conciliando...")
+    busca = calcular("Busca gulosa", (leitura.chave, banco, dias, valor, penalidade),
+                     lambda: motor.buscar_guloso(df_adq, df_erp, spec, dias, valor, penalidade, progresso=progresso),
+                     telemetria, linhas=len(df_adq))
+    df_adq, df_erp = motor.preparar_resultado(df_adq, df_erp, spec["identificadores"])
+    return motor.registrar_resultados(df_adq, df_erp, spec["identificadores"], *busca.valor, metricas=metricas)
+
+
+def _atribuir(banco, leitura, df_adq, df_erp, parametros, telemetria, progresso, loja):
+    """Varredura do banco (varredura.py) e cenário dos `parametros`: pares -> pontuação -> atribuição."""
+    import varredura
+
+    sufixo = f" - {loja}" if loja else ""
+    dias, valor = parametros["tolerancia_dias"], parametros["tolerancia_valor"]
+    teto = (max(dias, TETO_DIAS), max(valor, TETO_VALOR))
+
+    def avisar(texto):
+        if progresso is not None:
+            progresso(0, 0, texto)
+
+    avisar("🔗 Gerando pares candidatos...")
+    pares = calcular(f"Pares candidatos{sufixo}", (leitura.chave, banco, loja, teto),
+                     lambda: varredura.preparar(banco, df_adq, df_erp, *teto), telemetria, linhas=len(df_adq))
+    avisar("🧮 Pontuando pares...")
+    pontuacao = calcular(f"Pontuação{sufixo}", (pares.chave, parametros["penalidade_pessoa"]),
+                         lambda: pares.valor.pontuar(parametros["penalidade_pessoa"]), telemetria,
+                         linhas=pares.valor.n_pares)
+    avisar("🔄 Conciliando...")
+    atribuicao = calcular(f"Atribuição{sufixo}", (pontuacao.chave, dias, valor),
+                          lambda: pares.valor.atribuir(pontuacao.valor, dias, valor), telemetria, linhas=len(df_adq))
+    return pares.valor, atribuicao.valor
@@ -0,0 +1,108 @@
+"""
+Explorador de resultados
+Descrição: o app mostrava só os totais; para ver as linhas era preciso baixar a planilha.
+Mandar o resultado inteiro para o st.dataframe trava o navegador com 100 mil linhas.
+Aqui as abas "Conciliados" e "Não conciliados" ficam gravadas na pasta do job (pickle,
+sem dependência extra) e o filtro, a ordenação e a paginação rodam no servidor: a
+interface (painel.explorar_resultado) só recebe a página visível.
+
+Tabelas e recortes (filtro + ordem) ficam num cache LRU do processo: trocar de página não
+refaz o filtro, e reabrir um job antigo lê a tabela do disco uma vez.
+"""
+
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+
+# Abas do resultado disponíveis no explorador
+ABAS = ("Conciliados", "Não conciliados")
+COLUNA_STATUS = "Status"
+COLUNA_PONTUACAO = "Pontuação"
+COLUNA_DATA = "DATA DA VENDA"
+COLUNA_VALOR = "VALOR LÍQUIDO"
+PASTA_TABELAS = "tabelas"
+LIMITE_TABELAS = int(os.environ.get("CONCILIA_EXPLORADOR_TABELAS", "8"))
+LIMITE_RECORTES = 32
+
+
+def guardar(abas, pasta_saida):
+    """Grava as ABAS presentes em `abas` e devolve {aba: caminho} para o resultado do job."""
+    pasta = os.path.join(pasta_saida, PASTA_TABELAS)
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = {}
+    for numero, aba in enumerate(a for a in ABAS if a in abas):
+        caminho = os.path.join(pasta, f"{numero}.pkl")
+        abas[aba].reset_index(drop=True).to_pickle(caminho)
+        caminhos[aba] = caminho
+    return caminhos
+
+
+@lru_cache(maxsize=LIMITE_TABELAS)
+def carregar(caminho):
+    """Tabela gravada por `guardar`. O valor é compartilhado: não altere."""
+    return pd.read_pickle(caminho)
+
+
+def _numerica(df, coluna):
+    return pd.to_numeric(df[coluna], errors="coerce") if coluna in df.columns else None
+
+
+@lru_cache(maxsize=LIMITE_TABELAS)
+def limites(caminho):
+    """Valores possíveis dos filtros: status, faixa de pontuação, datas e valores."""
+    df = carregar(caminho)
+
+    def faixa(serie):
+        if serie is None or serie.dropna().empty:
+            return None
+        return serie.min(), serie.max()
+
+    return {
+        "linhas": len(df),
+        "status": sorted(df[COLUNA_STATUS].dropna().astype(str).unique()) if COLUNA_STATUS in df.columns else [],
+        "pontuacao": faixa(_numerica(df, COLUNA_PONTUACAO)),
+        "data": faixa(pd.to_datetime(df[COLUNA_DATA], errors="coerce")) if COLUNA_DATA in df.columns else None,
+        "valor": faixa(_numerica(df, COLUNA_VALOR)),
+        "colunas": list(df.columns),
+    }
+
+
+@lru_cache(maxsize=LIMITE_RECORTES)
+def recortar(caminho, status=None, pontuacao=None, data=None, valor=None, ordenar_por=None, crescente=True):
+    """
+    Posições das linhas que passam nos filtros, já na ordem pedida. `status`: tupla dos
+    status aceitos; `pontuacao`, `data`, `valor`: (mínimo, máximo) inclusivos. Os argumentos
+    são hasheáveis para o recorte ficar em cache entre as páginas.
+    """
+    df = carregar(caminho)
+    mascara = pd.Series(True, index=df.index)
+    if status is not None and COLUNA_STATUS in df.columns:
+        mascara &= df[COLUNA_STATUS].astype(str).isin(status)
+    if pontuacao is not None and COLUNA_PONTUACAO in df.columns:
+        mascara &= _numerica(df, COLUNA_PONTUACAO).between(*pontuacao)
+    if data is not None and COLUNA_DATA in df.columns:
+        datas = pd.to_datetime(df[COLUNA_DATA], errors="coerce").dt.normalize()
+        mascara &= datas.between(pd.Timestamp(data[0]), pd.Timestamp(data[1]))
+    if valor is not None and COLUNA_VALOR in df.columns:
+        mascara &= _numerica(df, COLUNA_VALOR).between(*valor)
+
+    filtradas = df.index[mascara.to_numpy()]
+    if ordenar_por is not None and ordenar_por in df.columns:
+        # Ordem estável: linhas empatadas ficam na ordem da planilha
+        filtradas = df.loc[filtradas, ordenar_por].sort_values(ascending=crescente, kind="stable",
+                                                               na_position="last").index
+    return filtradas.to_numpy()
+
+
+def pagina(caminho, posicoes, numero, tamanho):
+    """Linhas da página `numero` (a partir de 1) do recorte `posicoes`."""
+    inicio = (numero - 1) * tamanho
+    return carregar(caminho).iloc[posicoes[inicio:inicio + tamanho]]
+
+
+def limpar():
+    carregar.cache_clear()
+    limites.cache_clear()
+    recortar.cache_clear()
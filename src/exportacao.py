@@ -0,0 +1,58 @@
+"""
+Exportação da planilha de conciliação
+Descrição: grava as abas do resultado em XLSX e insere, na aba Resumo, as Chaves ERP
+conciliadas em blocos de 2000 (usadas para baixar os títulos no ERP).
+"""
+
+import logging
+import pandas as pd
+from openpyxl import load_workbook
+
+
+TAMANHO_BLOCO_CHAVES = 2000
+
+
+def salvar_planilha(abas, output_path):
+    """
+    Grava `abas` (dicionário nome da aba -> DataFrame, na ordem desejada) em `output_path`
+    e insere os blocos de Chave ERP na aba Resumo. Retorna uma lista de avisos.
+    """
+    avisos = []
+    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        for nome, df in abas.items():
+            df.to_excel(writer, sheet_name=nome, index=False)
+
+        if "Sheet1" in writer.book.sheetnames:
+            writer.book.remove(writer.book["Sheet1"])
+
+    # === INSERIR CHAVES ERP EM BLOCOS NA ABA RESUMO ===
+    try:
+        wb = load_workbook(output_path)
+        ws_conciliados = wb["Conciliados"]
+        ws_resumo = wb["Resumo"]
+
+        # Detecta a coluna da Chave ERP
+        header = [cell.value for cell in ws_conciliados[1]]
+        if "Chave ERP" in header:
+            idx_chave = header.index("Chave ERP")
+            letra_coluna = chr(65 + idx_chave)
+
+            chaves = [str(cell.value) for cell in ws_conciliados[letra_coluna][1:] if cell.value is not None]
+
+            blocos = [chaves[i:i + TAMANHO_BLOCO_CHAVES] for i in range(0, len(chaves), TAMANHO_BLOCO_CHAVES)]
+            blocos_concat = [", ".join(bloco) for bloco in blocos]
+
+            start_row = ws_resumo.max_row + 2
+            for i, texto in enumerate(blocos_concat, start=1):
+                ws_resumo.cell(row=start_row + i - 1, column=1, value=f"Grupo {i}")
+                ws_resumo.cell(row=start_row + i - 1, column=2, value=texto)
+
+            wb.save(output_path)
+        else:
+            avisos.append("Coluna 'Chave ERP' não encontrada na aba Conciliados")
+
+    except Exception as e:
+        logging.error(f"Erro ao adicionar blocos de Chave ERP: {e}", exc_info=True)
+        avisos.append(f"❌ Erro ao adicionar blocos de Chave ERP: {e}")
+
+    return avisos
@@ -0,0 +1,215 @@
+"""
+Índice do ERP em disco, compartilhado entre sessões e processos
+Descrição: os arrays que o kernel guloso usa do ERP (datas, valores, parcela/total,
+famílias e identificadores codificados) são gravados uma vez em .npy, numa pasta com o
+hash do conteúdo, e depois abertos com mmap. Várias sessões (ou processos) conciliando o
+mesmo ERP leem as mesmas páginas do cache do sistema operacional em vez de cada uma montar
+e guardar a sua cópia; o que é de cada execução (o vetor de títulos usados) continua
+sendo alocado por execução em kernel.executar.
+
+Só os arrays do kernel são compartilhados assim. O DataFrame do ERP lido continua em
+memória: num mesmo processo as sessões usam o mesmo, guardado pela etapa de leitura
+(etapas.py), mas cada processo tem o seu.
+
+O mmap é aberto em modo cópia-na-escrita ("c"): os arrays continuam graváveis (mesma
+assinatura do kernel compilado) e uma escrita acidental só afeta a execução que a fez.
+
+Pasta: CONCILIA_CACHE (padrão "cache") / indice_erp / <hash>. Só os LIMITE_INDICES índices
+usados mais recentemente são mantidos. Enquanto uma execução usa um índice (bloco with de
+obter), a pasta dele tem um arquivo de uso e a poda não a apaga; um uso sem fim há mais de
+VALIDADE_USO segundos é de um processo que caiu e não conta.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import kernel
+
+
+PASTA = os.path.join(os.environ.get("CONCILIA_CACHE", "cache"), "indice_erp")
+LIMITE_INDICES = 16
+VALIDADE_USO = 3600
+# Mude quando o formato dos arrays de kernel.preparar_erp mudar
+VERSAO = 1
+
+_ESCALARES = "escalares.json"
+_USO = ".uso-"
+
+
+def impressao_digital(df_erp, spec, familia):
+    """Hash do que entra em kernel.preparar_erp: colunas usadas, famílias e a adquirente."""
+    colunas = ["Emissão", "Valor", "Numero da Parcela", "Total Parcelas"]
+    colunas += [col_erp for _, col_erp in spec["identificadores"] if col_erp not in colunas]
+    if "Pessoa do Título" in df_erp.columns:
+        colunas.append("Pessoa do Título")
+
+    resumo = hashlib.sha1(f"v{VERSAO}|{spec['nome']}|{spec['pessoa_titulo']}|{colunas}|{len(df_erp)}".encode())
+    dados = df_erp[colunas].assign(_familia=np.asarray(familia, dtype=object))
+    resumo.update(pd.util.hash_pandas_object(dados, index=False).to_numpy().tobytes())
+    return resumo.hexdigest()
+
+
+@contextmanager
+def obter(df_erp, spec, familia, pasta=PASTA):
+    """
+    Arrays do ERP para o kernel (mesmo dicionário de kernel.preparar_erp), abertos do
+    disco quando o mesmo ERP já foi preparado antes. Válidos dentro do bloco with: até o
+    fim dele o índice não é podado. Se o disco falhar, prepara em memória.
+    """
+    arrays, uso = _reservar(df_erp, spec, familia, pasta)
+    try:
+        yield arrays
+    finally:
+        if uso is not None:
+            _liberar(uso)
+
+
+def _reservar(df_erp, spec, familia, pasta):
+    """Arrays do ERP e o arquivo de uso do índice aberto (None se preparados em memória)."""
+    try:
+        chave = impressao_digital(df_erp, spec, familia)
+        destino = os.path.join(pasta, chave)
+        uso = _marcar_uso(destino)
+    except FileNotFoundError:
+        uso = None  # índice ainda não gravado
+    except (OSError, ValueError) as e:
+        logging.warning(f"Índice do ERP em disco indisponível: {e}")
+        return kernel.preparar_erp(df_erp, spec, familia), None
+
+    if uso is not None:
+        try:
+            arrays = _abrir(destino)
+            logging.info(f"🗂️ Índice do ERP reaproveitado ({chave[:12]})")
+            return arrays, uso
+        except (OSError, ValueError) as e:
+            _liberar(uso)
+            logging.warning(f"Índice do ERP em disco indisponível: {e}")
+            return kernel.preparar_erp(df_erp, spec, familia), None
+
+    arrays = kernel.preparar_erp(df_erp, spec, familia)
+    try:
+        _gravar(arrays, destino, pasta)
+        uso = _marcar_uso(destino)
+        _podar(pasta)
+        return _abrir(destino), uso
+    except (OSError, ValueError) as e:
+        if uso is not None:
+            _liberar(uso)
+        logging.warning(f"Índice do ERP não gravado em {pasta}: {e}")
+        return arrays, None
+
+
+def _marcar_uso(destino):
+    """Cria o arquivo de uso na pasta do índice (FileNotFoundError se ela não existe)."""
+    uso = os.path.join(destino, f"{_USO}{os.getpid()}-{uuid.uuid4().hex}")
+    with open(uso, "x"):
+        pass
+    os.utime(destino)  # marca como usado recentemente
+    return uso
+
+
+def _liberar(uso):
+    try:
+        os.remove(uso)
+    except OSError:
+        pass
+
+
+def _em_uso(destino):
+    """Se alguma execução usa o índice agora (arquivo de uso mais novo que VALIDADE_USO)."""
+    limite = time.time() - VALIDADE_USO
+    try:
+        with os.scandir(destino) as entradas:
+            return any(e.name.startswith(_USO) and e.stat().st_mtime > limite for e in entradas)
+    except FileNotFoundError:
+        return False
+
+
+def _gravar(arrays, destino, pasta):
+    """Grava numa pasta temporária e renomeia: outra sessão nunca vê um índice pela metade."""
+    os.makedirs(pasta, exist_ok=True)
+    temporaria = tempfile.mkdtemp(prefix=".gravando-", dir=pasta)
+    try:
+        escalares = {}
+        for nome, valor in arrays.items():
+            if isinstance(valor, np.ndarray):
+                np.save(os.path.join(temporaria, f"{nome}.npy"), valor)
+            else:
+                escalares[nome] = valor
+        with open(os.path.join(temporaria, _ESCALARES), "w", encoding="utf-8") as f:
+            json.dump(escalares, f)
+        os.rename(temporaria, destino)
+    except OSError:
+        shutil.rmtree(temporaria, ignore_errors=True)
+        if not os.path.isdir(destino):  # outra sessão pode ter gravado o mesmo índice antes
+            raise
+
+
+def _abrir(destino):
+    arrays = {}
+    for arquivo in os.listdir(destino):
+        nome, extensao = os.path.splitext(arquivo)
+        if extensao == ".npy":
+            arrays[nome] = np.load(os.path.join(destino, arquivo), mmap_mode="c")
+    with open(os.path.join(destino, _ESCALARES), encoding="utf-8") as f:
+        arrays.update(json.load(f))
+    return arrays
+
+
+def limpar(pasta=PASTA):
+    """Apaga os índices gravados que nenhuma execução está usando."""
+    if not os.path.isdir(pasta):
+        return
+    for nome in os.listdir(pasta):
+        if not nome.startswith("."):
+            _apagar(os.path.join(pasta, nome), pasta)
+    _esvaziar_lixeira(pasta)
+
+
+def _podar(pasta):
+    """Apaga os índices menos usados além de LIMITE_INDICES (os em uso ficam)."""
+    indices = [os.path.join(pasta, nome) for nome in os.listdir(pasta) if not nome.startswith(".")]
+    indices.sort(key=os.path.getmtime, reverse=True)
+    for antigo in indices[LIMITE_INDICES:]:
+        _apagar(antigo, pasta)
+    _esvaziar_lixeira(pasta)
+
+
+def _apagar(destino, pasta):
+    """
+    Apaga o índice se não estiver em uso. A pasta é renomeada antes: um uso que comece
+    depois não a encontra mais e prepara os arrays em memória. Se um uso começou entre a
+    verificação e a renomeação, a pasta volta para o lugar.
+    """
+    if _em_uso(destino):
+        return
+    lixeira = os.path.join(pasta, f".apagando-{uuid.uuid4().hex}")
+    try:
+        os.rename(destino, lixeira)
+    except OSError:
+        return  # já apagado por outro processo, ou com arquivos abertos (Windows)
+    if _em_uso(lixeira):
+        try:
+            os.rename(lixeira, destino)
+        except OSError:
+            pass  # outro processo gravou o índice de novo; a lixeira fica para a próxima poda
+        return
+    shutil.rmtree(lixeira, ignore_errors=True)
+
+
+def _esvaziar_lixeira(pasta):
+    """Apaga as pastas renomeadas por _apagar que ficaram para trás e não estão em uso."""
+    for nome in os.listdir(pasta):
+        lixeira = os.path.join(pasta, nome)
+        if nome.startswith(".apagando-") and not _em_uso(lixeira):
+            shutil.rmtree(lixeira, ignore_errors=True)
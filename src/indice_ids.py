@@ -0,0 +1,110 @@
+"""
+Índice de identificadores (autorização / NSU) para busca por similaridade
+Descrição: em vez de comparar um código com a coluna inteira do ERP a cada linha
+(process.extract sobre df[coluna].astype(str)), os códigos do ERP são indexados uma vez
+por bigramas e a busca devolve todos os códigos com fuzz.ratio >= limiar, comparando só
+os poucos que podem atingir o limiar. Usado pela mesa de conciliação (mesa.py), que
+procura títulos de identificador parecido em qualquer data.
+
+Filtro (exato, sem perder correspondências): fuzz.ratio >= t exige uma subsequência comum
+de pelo menos c = t * (len(a) + len(b)) / 200 caracteres. Fora dela, a consulta perde
+len(a) - c caracteres e ganha len(b) - c; cada caractere perdido destrói no máximo 2
+bigramas da consulta e cada inserção no máximo 1, então um candidato precisa ter pelo
+menos (len(a) - 1) - 2 * (len(a) - c) - (len(b) - c) bigramas em comum com ela. Bigramas
+repetidos são contados como multiconjunto (a k-ésima ocorrência é um token próprio).
+
+Os códigos são normalizados antes: sem espaços e separadores, em maiúsculas, e números
+como 12345.0 (NSU Concentrador lido como float) viram "12345". Zeros à esquerda ficam.
+"""
+
+import re
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import process, fuzz
+
+
+LIMIAR_PADRAO = 80
+
+_SEPARADORES = re.compile(r"[^0-9A-Za-z]")
+
+
+def normalizar(valor):
+    """Código como texto comparável; None quando vazio."""
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        if valor != valor:  # NaN
+            return None
+        if valor.is_integer():
+            valor = int(valor)
+    texto = _SEPARADORES.sub("", str(valor)).upper()
+    return texto or None
+
+
+def _tokens(texto):
+    """Bigramas com o número da ocorrência: ("00", 0), ("00", 1), ..."""
+    vistos = defaultdict(int)
+    tokens = []
+    for i in range(len(texto) - 1):
+        grama = texto[i:i + 2]
+        tokens.append((grama, vistos[grama]))
+        vistos[grama] += 1
+    return tokens
+
+
+class IndiceIdentificadores:
+    """
+    Índice de uma coluna de códigos. `buscar` devolve os códigos parecidos com as posições
+    (iloc) das linhas que os têm; `exatos` só as do código idêntico.
+    """
+
+    def __init__(self, valores):
+        posicoes = defaultdict(list)
+        for posicao, valor in enumerate(valores):
+            texto = normalizar(valor)
+            if texto is not None:
+                posicoes[texto].append(posicao)
+
+        self.textos = list(posicoes)
+        self.posicoes = [np.asarray(p) for p in posicoes.values()]
+        self._por_texto = dict(zip(self.textos, self.posicoes))
+        self.comprimentos = np.fromiter((len(t) for t in self.textos), dtype=np.int64, count=len(self.textos))
+
+        listas = defaultdict(list)
+        for i, texto in enumerate(self.textos):
+            for token in _tokens(texto):
+                listas[token].append(i)
+        self._listas = {token: np.asarray(ids, dtype=np.int64) for token, ids in listas.items()}
+
+    def __len__(self):
+        return len(self.textos)
+
+    def exatos(self, valor):
+        texto = normalizar(valor)
+        return self._por_texto.get(texto, np.empty(0, dtype=np.int64))
+
+    def candidatos(self, texto, limiar):
+        """Ids (em self.textos) que podem ter fuzz.ratio >= limiar com `texto`."""
+        if not self.textos:
+            return np.empty(0, dtype=np.int64)
+        tamanho = len(texto)
+        postagens = [self._listas[t] for t in _tokens(texto) if t in self._listas]
+        comuns = np.bincount(np.concatenate(postagens), minlength=len(self.textos)) if postagens else 0
+
+        outro = self.comprimentos
+        compativel = 2 * np.minimum(tamanho, outro) * 100 >= limiar * (tamanho + outro)
+        subsequencia = np.ceil(limiar * (tamanho + outro) / 200 - 1e-9)
+        necessarios = (tamanho - 1) - 2 * (tamanho - subsequencia) - (outro - subsequencia)
+        return np.flatnonzero(compativel & (comuns >= necessarios))
+
+    def buscar(self, valor, limiar=LIMIAR_PADRAO):
+        """[(código, fuzz.ratio, posições), ...] com ratio >= limiar, do mais parecido ao menos."""
+        texto = normalizar(valor)
+        if texto is None:
+            return []
+        ids = self.candidatos(texto, limiar)
+        encontrados = process.extract(texto, [self.textos[i] for i in ids], scorer=fuzz.ratio,
+                                      score_cutoff=limiar, limit=None)
+        return [(self.textos[ids[j]], pontuacao, self.posicoes[ids[j]]) for _, pontuacao, j in encontrados]
+
@@ -0,0 +1,323 @@
+"""
+Leitura do ERP restrita ao período da adquirente
+Descrição: o relatório "Análise de Titulos" do ERP traz todos os títulos de cartão em
+aberto, mas um arquivo semanal da adquirente cobre só alguns dias de vendas. A janela de
+datas (menor e maior DATA DA VENDA, mais a tolerância do conciliador) é calculada a partir
+da adquirente já limpa e o CSV do ERP é lido em blocos, mantendo apenas os títulos com
+Emissão dentro dela. Memória e custo da conciliação passam a acompanhar o período, não o
+histórico do ERP.
+
+Os títulos descartados não poderiam ser conciliados de qualquer forma: o filtro de
+tolerância de dias dos conciliadores já os recusaria. A janela tem um dia de folga de
+cada lado porque a diferença em dias é truncada.
+
+Os tipos das colunas ficam iguais aos de um pd.read_csv do arquivo inteiro: os blocos são
+lidos como texto e uma coluna só vira número se for numérica em todos os blocos (ex: um
+NSU alfanumérico em qualquer parte do arquivo mantém os zeros à esquerda em todos) e vira
+float se tiver fração ou vazio em algum bloco, mesmo que essas linhas fiquem fora da janela.
+
+Leitura simultânea (LeituraDoErp): o ERP é lido e limpo numa thread de leitura enquanto a
+thread do job lê e limpa a adquirente; boa parte do parse do pandas/openpyxl libera o
+GIL. A janela chega à leitura do ERP por um Future: os blocos lidos antes de ela ficar
+pronta são guardados e recortados assim que a adquirente termina. Só a leitura do ERP vai
+para o pool, que nunca espera por outra tarefa do pool (sem risco de travar com vários
+jobs ao mesmo tempo).
+
+Vários arquivos da adquirente (ler_adquirente): um por semana ou por estabelecimento,
+soltos ou dentro de um .zip. Cada arquivo é lido e limpo em paralelo; o resultado é
+concatenado em ordem de data, com a coluna ARQUIVO indicando a origem, e conciliado de
+uma vez contra o mesmo ERP (títulos usados por um arquivo não voltam para o seguinte).
+"""
+
+import io
+import os
+import zipfile
+import logging
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+import pandas as pd
+
+
+# Linhas por bloco na leitura do CSV do ERP
+TAMANHO_BLOCO = int(os.environ.get("CONCILIA_BLOCO_ERP", "100000"))
+# Dias extras de cada lado da janela (a diferença em dias é truncada pelo .dt.days)
+FOLGA_DIAS = 1
+# Threads de leitura compartilhadas entre os jobs
+LEITORES = int(os.environ.get("CONCILIA_LEITORES", "4"))
+
+_leitores = ThreadPoolExecutor(max_workers=LEITORES, thread_name_prefix="leitura")
+
+# Coluna com o nome do arquivo de origem de cada linha (só quando há mais de um arquivo)
+COLUNA_ARQUIVO = "ARQUIVO"
+
+
+def janela_de_datas(datas, tolerancia_dias):
+    """(início, fim) cobrindo todas as `datas` ± tolerância, ou None se não houver data válida."""
+    datas = pd.to_datetime(datas, errors="coerce").dropna()
+    if datas.empty:
+        return None
+    margem = pd.Timedelta(days=tolerancia_dias + FOLGA_DIAS)
+    return datas.min().normalize() - margem, datas.max().normalize() + margem + pd.Timedelta(days=1)
+
+
+def resolver_janela(janela):
+    """Aceita a janela pronta ou um Future (LeituraDoErp); espera se ainda não estiver pronta."""
+    return janela.result() if isinstance(janela, Future) else janela
+
+
+def _datas_do_erp(serie, formato_data):
+    if formato_data:
+        return pd.to_datetime(serie, format=formato_data, errors="coerce")
+    return pd.to_datetime(serie, dayfirst=True, errors="coerce")
+
+
+def _dentro(datas, janela):
+    inicio, fim = janela
+    return (datas >= inicio) & (datas < fim)
+
+
+def _tipo_numerico(serie):
+    """Tipo que o read_csv daria à coluna (lida como texto): "i", "f" ou None se não for numérica."""
+    numeros = pd.to_numeric(serie, errors="coerce")
+    if numeros.notna().sum() != serie.notna().sum():
+        return None
+    return numeros.dtype.kind
+
+
+def ler_erp_csv(arquivo, janela=None, coluna_data="Emissão", formato_data=None, dtype=None,
+                tamanho_bloco=TAMANHO_BLOCO, estatisticas=None, **opcoes):
+    """
+    Lê o CSV do ERP (";" e latin1 por padrão) em blocos, mantendo só os títulos com
+    `coluna_data` dentro de `janela` (de janela_de_datas, ou um Future dela). Sem janela,
+    lê tudo.
+    `dtype` fixa o tipo de colunas específicas (as demais seguem a inferência do pandas).
+    `estatisticas`, se informado, recebe {"lidas": ..., "mantidas": ...}.
+    """
+    opcoes = {"sep": ";", "encoding": "latin1", **opcoes}
+    fixas = dict(dtype or {})
+
+    if isinstance(janela, Future) and janela.done():
+        janela = janela.result()
+    if janela is None:
+        df = pd.read_csv(arquivo, dtype=fixas or None, **opcoes)
+        if estatisticas is not None:
+            estatisticas.update(lidas=len(df), mantidas=len(df))
+        return df
+
+    blocos = []
+    pendentes = []  # blocos lidos antes de a janela (Future) ficar pronta
+    numericas = None
+    flutuantes = set()  # numéricas com fração ou vazio em algum bloco: float no arquivo inteiro
+    lidas = 0
+    for bloco in pd.read_csv(arquivo, dtype=str, chunksize=tamanho_bloco, **opcoes):
+        lidas += len(bloco)
+        # Inferência do arquivo inteiro: numérica só se for numérica em todos os blocos
+        livres = [c for c in bloco.columns if c not in fixas]
+        tipos = {c: _tipo_numerico(bloco[c]) for c in livres}
+        numericas_bloco = {c for c, tipo in tipos.items() if tipo is not None}
+        numericas = numericas_bloco if numericas is None else numericas & numericas_bloco
+        flutuantes |= {c for c, tipo in tipos.items() if tipo == "f"}
+
+        pendentes.append(bloco)
+        if isinstance(janela, Future):
+            if not janela.done():
+                continue
+            janela = janela.result()
+        blocos += [_recortar(b, janela, coluna_data, formato_data) for b in pendentes]
+        pendentes = []
+
+    janela = resolver_janela(janela)
+    blocos += [_recortar(b, janela, coluna_data, formato_data) for b in pendentes]
+
+    if not blocos:  # só cabeçalho
+        if hasattr(arquivo, "seek"):
+            arquivo.seek(0)
+        return pd.read_csv(arquivo, dtype=fixas or None, **opcoes)
+
+    df = pd.concat(blocos, ignore_index=True)
+    for coluna in numericas or ():
+        df[coluna] = pd.to_numeric(df[coluna])
+        if coluna in flutuantes:
+            df[coluna] = df[coluna].astype("float64")
+    for coluna, tipo in fixas.items():
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(tipo)
+
+    if janela is not None:
+        logging.info(f"📅 ERP: {len(df)} de {lidas} títulos dentro da janela {janela[0]:%d/%m/%Y} - {janela[1]:%d/%m/%Y}")
+    if estatisticas is not None:
+        estatisticas.update(lidas=lidas, mantidas=len(df))
+    return df
+
+
+def _recortar(bloco, janela, coluna_data, formato_data):
+    if janela is None:
+        return bloco
+    return bloco[_dentro(_datas_do_erp(bloco[coluna_data], formato_data), janela)]
+
+
+def filtrar_janela(df_erp, janela, coluna_data="Emissão", formato_data=None):
+    """Mesmo recorte para um ERP já carregado (ex: planilha XLSX, que não é lida em blocos)."""
+    janela = resolver_janela(janela)
+    if janela is None:
+        return df_erp
+    return _recortar(df_erp, janela, coluna_data, formato_data).reset_index(drop=True)
+
+
+def filtros_da_janela(janela, coluna_data="Emissão"):
+    """Mesmo recorte como `filters` do pyarrow, para um ERP limpo (datas já convertidas) em Parquet."""
+    janela = resolver_janela(janela)
+    if janela is None:
+        return None
+    inicio, fim = janela
+    return [(coluna_data, ">=", inicio), (coluna_data, "<", fim)]
+
+
+# =====================================================================
+# Leitura do ERP em paralelo com a adquirente
+# =====================================================================
+class LeituraDoErp:
+    """
+    Dispara `funcao(*args, janela=<Future>, **kwargs)` numa thread de leitura. Uso:
+
+        with LeituraDoErp(preparar_erp, arquivo_erp, telemetria) as leitura:
+            df_adq = ...  # leitura e limpeza da adquirente
+            leitura.definir_janela(df_adq["DATA DA VENDA"], TOLERANCIA_DIAS)
+        df_erp = leitura.resultado()
+
+    Com `usar_janela=False` o ERP é lido inteiro. Se o bloco `with` falhar, a leitura do
+    ERP é abandonada e o erro da adquirente sobe como antes; um erro do ERP sobe em
+    `resultado()` com o mesmo tipo e mensagem da leitura sequencial.
+    """
+
+    def __init__(self, funcao, *args, usar_janela=True, **kwargs):
+        self._janela = Future()
+        if not usar_janela:
+            self._janela.set_result(None)
+        self._futuro = _leitores.submit(funcao, *args, janela=self._janela, **kwargs)
+
+    def definir_janela(self, datas, tolerancia_dias):
+        if not self._janela.done():
+            self._janela.set_result(janela_de_datas(datas, tolerancia_dias))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        if erro is not None:
+            self._futuro.cancel()
+            if not self._janela.done():
+                self._janela.set_exception(CancelledError("adquirente não carregada"))
+        elif not self._janela.done():
+            self._janela.set_result(None)
+        return False
+
+    def resultado(self):
+        return self._futuro.result()
+
+
+# =====================================================================
+# Vários arquivos da adquirente
+# =====================================================================
+def expandir_arquivos(arquivos, extensoes):
+    """
+    Normaliza o upload da adquirente para uma lista de arquivos: aceita um arquivo, uma
+    lista ou .zip (abertos em memória, só os membros com uma das `extensoes`).
+    """
+    if not isinstance(arquivos, (list, tuple)):
+        arquivos = [arquivos]
+    extensoes = tuple(e.lower() for e in extensoes)
+
+    expandidos = []
+    for arquivo in arquivos:
+        if not arquivo.name.lower().endswith(".zip"):
+            expandidos.append(arquivo)
+            continue
+        with zipfile.ZipFile(arquivo) as pacote:
+            membros = sorted(
+                m for m in pacote.namelist()
+                if m.lower().endswith(extensoes) and not m.endswith("/") and not m.startswith("__MACOSX")
+            )
+            if not membros:
+                raise ValueError(f"❌ {arquivo.name} não contém arquivos {', '.join(extensoes)}.")
+            for membro in membros:
+                copia = io.BytesIO(pacote.read(membro))
+                copia.name = os.path.basename(membro)
+                expandidos.append(copia)
+    return expandidos
+
+
+def ler_adquirente(arquivos, preparar, coluna_data="DATA DA VENDA"):
+    """
+    Chama `preparar(arquivo, sufixo)` -> (df, desvios) para cada arquivo, em paralelo, e
+    consolida: linhas e desvios concatenados na ordem da menor `coluna_data` de cada
+    arquivo. `sufixo` identifica o arquivo nos nomes das etapas (vazio com um arquivo só).
+    Com um único arquivo o resultado é o de `preparar`, sem a coluna ARQUIVO.
+    """
+    if len(arquivos) == 1:
+        return preparar(arquivos[0], "")
+
+    # Pool próprio do job: as tarefas não esperam por nada, mas também não disputam as
+    # threads do ERP (que esperam pela janela)
+    with ThreadPoolExecutor(max_workers=min(len(arquivos), LEITORES), thread_name_prefix="adquirente") as pool:
+        nomes = _nomes_unicos([os.path.basename(a.name) for a in arquivos])
+        futuros = [pool.submit(preparar, a, f" ({nome})") for a, nome in zip(arquivos, nomes)]
+        partes = [(nome, *f.result()) for nome, f in zip(nomes, futuros)]
+
+    partes.sort(key=lambda p: _menor_data(p[1], coluna_data))
+    df = pd.concat([_com_origem(d, nome) for nome, d, _ in partes], ignore_index=True)
+    desvios = {}
+    for nome, _, desvios_arquivo in partes:
+        for aba, d in desvios_arquivo.items():
+            desvios.setdefault(aba, []).append(_com_origem(d, nome))
+    desvios = {aba: pd.concat(lista, ignore_index=True) for aba, lista in desvios.items()}
+    logging.info(f"📚 {len(partes)} arquivos consolidados: {', '.join(p[0] for p in partes)} ({len(df)} linhas)")
+    return df, desvios
+
+
+def _nomes_unicos(nomes):
+    """Repete o mesmo nome com (2), (3)... para o resumo por arquivo não juntar os dois."""
+    vistos = {}
+    unicos = []
+    for nome in nomes:
+        vistos[nome] = vistos.get(nome, 0) + 1
+        unicos.append(nome if vistos[nome] == 1 else f"{nome} ({vistos[nome]})")
+    return unicos
+
+
+def _menor_data(df, coluna_data):
+    datas = pd.to_datetime(df[coluna_data], errors="coerce") if coluna_data in df else pd.Series(dtype="datetime64[ns]")
+    menor = datas.min()
+    return (pd.isna(menor), menor if not pd.isna(menor) else pd.Timestamp.max)
+
+
+def _com_origem(df, nome):
+    df = df.copy()
+    df[COLUNA_ARQUIVO] = nome
+    return df
+
+
+def resumo_por_arquivo(conciliados, nao_conciliados, coluna_valor="VALOR LÍQUIDO", coluna_data="DATA DA VENDA",
+                       coluna=COLUNA_ARQUIVO, rotulo="Arquivo"):
+    """
+    Quantidade e valor conciliado/não conciliado por arquivo, na ordem de data dos
+    arquivos; None com um arquivo só. `coluna`/`rotulo` servem para outros agrupamentos
+    (ex: por loja, em estabelecimentos.py).
+    """
+    if coluna not in conciliados.columns and coluna not in nao_conciliados.columns:
+        return None
+
+    def totais(df, status):
+        if coluna not in df.columns:
+            return pd.DataFrame(columns=[f"{status} (qtd)", f"{status} (R$)"])
+        grupos = df.groupby(coluna, sort=False)[coluna_valor]
+        return pd.DataFrame({f"{status} (qtd)": grupos.size(), f"{status} (R$)": grupos.sum()})
+
+    resumo = totais(conciliados, "Conciliados").join(totais(nao_conciliados, "Não conciliados"), how="outer")
+    todos = pd.concat([conciliados, nao_conciliados])
+    ordem = sorted(resumo.index, key=lambda nome: _menor_data(todos[todos[coluna] == nome], coluna_data))
+    resumo = resumo.reindex(ordem).fillna(0)
+    for nome in resumo.columns:
+        if nome.endswith("(qtd)"):
+            resumo[nome] = resumo[nome].astype(int)
+    return resumo.rename_axis(rotulo).reset_index()
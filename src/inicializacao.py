@@ -0,0 +1,100 @@
+"""
+Inicialização do aplicativo
+Descrição: configuração única do logging e pré-aquecimento em segundo plano. A tela
+inicial (app.py) só importa módulos leves; assim que o servidor sobe, uma thread importa
+pandas, numpy, rapidfuzz, openpyxl, o motor (carregando o kernel compilado do cache do
+Numba) e os módulos dos bancos, para que o primeiro clique em um banco não pague esse
+custo dentro da requisição.
+
+Para medir o tempo de importação: python bench_importacao.py
+"""
+
+import logging
+import importlib
+import threading
+import time
+
+
+# Bibliotecas pesadas e módulos do motor, na ordem de importação
+MODULOS_PESADOS = ("numpy", "pandas", "rapidfuzz.fuzz", "openpyxl", "adaptadores", "motor", "exportacao", "telemetria")
+
+_trava = threading.Lock()
+_logging_configurado = False
+_preaquecimento = None
+
+
+def configurar_logging():
+    """Configura o log do app uma única vez por processo (antes ficava no import dos bancos)."""
+    global _logging_configurado
+    with _trava:
+        if _logging_configurado:
+            return
+        logging.basicConfig(
+            level=logging.DEBUG,  # ou INFO para menos verbosidade
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            handlers=[
+                logging.FileHandler("conciliacao.log", encoding="utf-8"),  # grava em arquivo
+                logging.StreamHandler()  # mostra no console
+            ]
+        )
+        # O DEBUG do compilador do Numba despeja o bytecode inteiro no log
+        logging.getLogger("numba").setLevel(logging.WARNING)
+        _logging_configurado = True
+
+
+def preaquecer(bancos=()):
+    """
+    Dispara (uma vez por processo) a thread que importa os módulos pesados e, em seguida,
+    os módulos dos `bancos` informados. Retorna a thread.
+    """
+    global _preaquecimento
+    with _trava:
+        if _preaquecimento is None:
+            _preaquecimento = threading.Thread(
+                target=_preaquecer, args=(tuple(bancos),), daemon=True, name="preaquecimento"
+            )
+            _preaquecimento.start()
+    return _preaquecimento
+
+
+def _preaquecer(bancos):
+    inicio = time.perf_counter()
+    for nome in MODULOS_PESADOS + bancos:
+        try:
+            importlib.import_module(nome)
+        except Exception as e:  # o pré-aquecimento nunca derruba o app
+            logging.warning(f"Pré-aquecimento: falha ao importar {nome}: {e}")
+    try:
+        _aquecer_kernel()
+    except Exception as e:
+        logging.warning(f"Pré-aquecimento: kernel não carregado: {e}")
+    logging.info(f"🔥 Pré-aquecimento concluído em {time.perf_counter() - inicio:.2f}s")
+
+
+def _aquecer_kernel():
+    """Roda o kernel guloso em arrays vazios para carregar/compilar o código do Numba."""
+    import numpy as np
+    import kernel
+
+    if not kernel.DISPONIVEL:
+        return
+    vazio_i = np.zeros(0, dtype=np.int64)
+    vazio_f = np.zeros(0, dtype=np.float64)
+    vazio_b = np.zeros(0, dtype=np.bool_)
+    desl = np.zeros((1, 1), dtype=np.int64)
+    codigos = np.zeros(0, dtype=np.int32)
+    adq = {"data": vazio_i, "data_ok": vazio_b, "valor": vazio_f, "parcela": vazio_i, "total": vazio_i,
+           "valida": vazio_b, "venda": vazio_i, "n_vendas": 0, "cod": codigos, "desl": desl}
+    erp = {"emissao": vazio_i, "emissao_ok": vazio_b, "valor": vazio_f, "parcela": vazio_i, "total": vazio_i,
+           "pessoa_errada": vazio_b, "familia": vazio_i, "cod": codigos, "desl": desl,
+           "familia_ptr": np.zeros(1, dtype=np.int64), "familia_pos": vazio_i}
+    # Sem linhas o laço de blocos não chama o kernel; chama direto com um intervalo vazio
+    kernel._kernel_guloso(
+        0, 0,
+        adq["data"], adq["data_ok"], adq["valor"], adq["parcela"], adq["total"], adq["valida"], adq["venda"],
+        adq["cod"], adq["desl"],
+        erp["emissao"], erp["emissao_ok"], erp["valor"], erp["parcela"], erp["total"],
+        erp["pessoa_errada"], erp["familia"], erp["cod"], erp["desl"], erp["familia_ptr"], erp["familia_pos"],
+        5.0, 0.2, 101.0, 20.0,
+        vazio_b, vazio_i, vazio_i, vazio_f, vazio_b, vazio_i, np.zeros(1, dtype=np.int64),
+    )
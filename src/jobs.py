@@ -0,0 +1,162 @@
+"""
+Execução de conciliações em segundo plano
+Descrição: as conciliações rodam em um pool de threads compartilhado por todas as sessões
+do servidor Streamlit. A interface só acompanha o progresso, pode cancelar e, se o
+navegador reconectar, recupera o resultado pelo identificador do job.
+"""
+
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Quantidade de conciliações simultâneas no servidor
+MAX_JOBS_SIMULTANEOS = int(os.environ.get("CONCILIA_MAX_JOBS", "2"))
+# Pasta onde cada job grava a sua planilha
+DIR_EXECUCOES = os.environ.get("CONCILIA_DIR_EXECUCOES", "execucoes")
+# Quantos jobs finalizados manter em memória
+MAX_JOBS_GUARDADOS = 50
+
+NA_FILA = "Na fila"
+EXECUTANDO = "Executando"
+CONCLUIDO = "Concluído"
+ERRO = "Erro"
+CANCELADO = "Cancelado"
+FINALIZADOS = (CONCLUIDO, ERRO, CANCELADO)
+
+
+class ConciliacaoCancelada(Exception):
+    """Levantada dentro do worker quando o usuário cancela o job."""
+
+
+class Job:
+    def __init__(self, banco, descricao):
+        self.id = uuid.uuid4().hex[:12]
+        self.banco = banco
+        self.descricao = descricao
+        self.estado = NA_FILA
+        self.criado_em = datetime.now()
+        self.finalizado_em = None
+        self.feitos = 0
+        self.total = 0
+        self.texto = "⏳ Aguardando na fila..."
+        self.resultado = None
+        # Números do resultado publicados antes de a planilha ficar pronta (publicar_previa)
+        self.previa = None
+        self.erro = None
+        self.pasta = os.path.join(DIR_EXECUCOES, self.id)
+        self._cancelar = threading.Event()
+        self._novidade = threading.Event()
+
+    @property
+    def fracao(self):
+        return self.feitos / self.total if self.total else 0.0
+
+    @property
+    def finalizado(self):
+        return self.estado in FINALIZADOS
+
+    def progresso(self, feitos, total, texto=None):
+        """Callback entregue ao pipeline; também é o ponto de cancelamento."""
+        if self._cancelar.is_set():
+            raise ConciliacaoCancelada()
+        self.feitos, self.total = feitos, total
+        if texto is not None:
+            self.texto = texto
+        elif total:
+            self.texto = f"🔄 Conciliando ({feitos}/{total}) registros..."
+
+    def cancelar(self):
+        self._cancelar.set()
+        if self.estado == NA_FILA:
+            self.estado = CANCELADO
+            self._novidade.set()
+
+    def aguardar(self, timeout):
+        """Espera até `timeout` s pelo fim do job ou pela prévia. Retorna True se chegou algo."""
+        return self._novidade.wait(timeout)
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_JOBS_SIMULTANEOS, thread_name_prefix="conciliacao")
+_jobs = {}
+_trava = threading.Lock()
+# Job executado pela thread atual (publicar_previa)
+_atual = threading.local()
+
+
+def publicar_previa(resultado):
+    """
+    Chamado pela conciliação quando os números já estão prontos e só falta gravar a
+    planilha: a interface mostra `resultado` enquanto isso. Fora de um job, não faz nada.
+    """
+    job = getattr(_atual, "job", None)
+    if job is not None:
+        job.previa = resultado
+        job._novidade.set()
+
+
+def _executar(job, funcao, args, kwargs):
+    if job._cancelar.is_set():
+        job.estado = CANCELADO
+        job._novidade.set()
+        return
+    job.estado = EXECUTANDO
+    job.texto = "📂 Carregando planilhas..."
+    _atual.job = job
+    try:
+        os.makedirs(job.pasta, exist_ok=True)
+        job.resultado = funcao(*args, pasta_saida=job.pasta, progresso=job.progresso, **kwargs)
+        job.estado = CONCLUIDO
+        job.texto = "✅ Conciliação concluída"
+    except ConciliacaoCancelada:
+        job.estado = CANCELADO
+        job.texto = "🛑 Conciliação cancelada"
+        logging.info(f"Job {job.id} cancelado pelo usuário")
+    except Exception as e:
+        job.estado = ERRO
+        job.erro = str(e)
+        job.texto = f"❌ {e}"
+        logging.error(f"Erro no job {job.id}: {e}", exc_info=True)
+    finally:
+        _atual.job = None
+        job.finalizado_em = datetime.now()
+        job._novidade.set()
+
+
+def submeter(banco, descricao, funcao, *args, **kwargs):
+    """
+    Agenda `funcao(*args, pasta_saida=..., progresso=..., **kwargs)` no pool e devolve o job.
+    A função deve ser independente do Streamlit (sem st.* dentro).
+    """
+    job = Job(banco, descricao)
+    with _trava:
+        _jobs[job.id] = job
+        _descartar_antigos()
+    _executor.submit(_executar, job, funcao, args, kwargs)
+    logging.info(f"Job {job.id} ({banco}) submetido: {descricao}")
+    return job
+
+
+def obter(job_id):
+    return _jobs.get(job_id)
+
+
+def cancelar(job_id):
+    job = _jobs.get(job_id)
+    if job is not None:
+        job.cancelar()
+
+
+def listar(banco=None):
+    """Jobs conhecidos, do mais recente para o mais antigo."""
+    jobs = [j for j in _jobs.values() if banco is None or j.banco == banco]
+    return sorted(jobs, key=lambda j: j.criado_em, reverse=True)
+
+
+def _descartar_antigos():
+    finalizados = sorted((j for j in _jobs.values() if j.finalizado), key=lambda j: j.criado_em)
+    for job in finalizados[:max(0, len(finalizados) - MAX_JOBS_GUARDADOS)]:
+        del _jobs[job.id]
@@ -0,0 +1,280 @@
+"""
+Kernel compilado da busca gulosa
+Descrição: versão em arrays NumPy do laço de motor.conciliar_guloso. Cada conciliação
+marca o título ERP como usado antes da próxima linha, o que impede vetorizar; por isso o
+laço sequencial é compilado com Numba (opcional). Mesma ordem, mesmos filtros de
+tolerância e mesma pontuação do caminho em Python, inclusive a similaridade do
+rapidfuzz (fuzz.ratio), reimplementada aqui pela distância Indel.
+
+Sem o Numba instalado, DISPONIVEL fica False e o motor usa o caminho em Python.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    DISPONIVEL = True
+except ImportError:  # Numba é opcional
+    DISPONIVEL = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda funcao: funcao
+
+
+NS_POR_DIA = 86_400_000_000_000
+# Quantidade de linhas por chamada do kernel (entre chamadas o progresso é atualizado)
+TAMANHO_BLOCO = 256
+
+
+# =========================
+# Kernel
+# =========================
+@njit(cache=True)
+def _ratio(codigos_a, ini_a, fim_a, codigos_b, ini_b, fim_b, linha_lcs):
+    """Equivalente a rapidfuzz.fuzz.ratio: 100 * (1 - indel / (len_a + len_b))."""
+    len_a = fim_a - ini_a
+    len_b = fim_b - ini_b
+    soma = len_a + len_b
+    if soma == 0:
+        return 100.0
+    # LCS por programação dinâmica em uma linha (identificadores são curtos)
+    for j in range(len_b + 1):
+        linha_lcs[j] = 0
+    for i in range(len_a):
+        diagonal = 0
+        ca = codigos_a[ini_a + i]
+        for j in range(len_b):
+            acima = linha_lcs[j + 1]
+            if ca == codigos_b[ini_b + j]:
+                linha_lcs[j + 1] = diagonal + 1
+            elif linha_lcs[j] > acima:
+                linha_lcs[j + 1] = linha_lcs[j]
+            diagonal = acima
+    distancia = soma - 2 * linha_lcs[len_b]
+    return (1.0 - distancia / soma) * 100.0
+
+
+@njit(cache=True)
+def _passa_filtro(p, data, valor, parcela, total, usada, emissao, emissao_ok, valor_erp,
+                  parcela_erp, total_erp, tolerancia_dias, tolerancia_valor):
+    if usada[p] or not emissao_ok[p]:
+        return False
+    dias = (emissao[p] - data) // NS_POR_DIA
+    if abs(dias) > tolerancia_dias:
+        return False
+    if not abs(valor_erp[p] - valor) <= tolerancia_valor:
+        return False
+    return parcela_erp[p] == parcela and total_erp[p] == total
+
+
+@njit(cache=True)
+def _pontuar(r, p, data, valor, emissao, valor_erp, pessoa_errada, penalidade_pessoa,
+             cod_adq, desl_adq, cod_erp, desl_erp, linha_lcs):
+    dias = abs((emissao[p] - data) // NS_POR_DIA)
+    pontuacao = dias * 10 + abs(valor_erp[p] - valor) * 100
+    for k in range(desl_adq.shape[0]):
+        similaridade = _ratio(cod_erp, desl_erp[k, p], desl_erp[k, p + 1],
+                              cod_adq, desl_adq[k, r], desl_adq[k, r + 1], linha_lcs)
+        pontuacao += 100 - similaridade
+    if pessoa_errada[p]:
+        pontuacao += penalidade_pessoa
+    return pontuacao
+
+
+@njit(cache=True)
+def _kernel_guloso(inicio, fim,
+                   data_adq, data_ok, valor_adq, parcela_adq, total_adq, valida_adq, venda_adq,
+                   cod_adq, desl_adq,
+                   emissao, emissao_ok, valor_erp, parcela_erp, total_erp, pessoa_errada, familia_erp,
+                   cod_erp, desl_erp, familia_ptr, familia_pos,
+                   tolerancia_dias, tolerancia_valor, penalidade_pessoa, limiar_familia,
+                   usada, familia_confirmada, melhor_out, pontuacao_out, via_familia_out, candidatos_out,
+                   linha_lcs):
+    n_erp = emissao.shape[0]
+    for r in range(inicio, fim):
+        if not valida_adq[r]:
+            continue
+        if not data_ok[r]:
+            candidatos_out[r] = 0
+            continue
+        data = data_adq[r]
+        valor = valor_adq[r]
+        parcela = parcela_adq[r]
+        total = total_adq[r]
+        venda = venda_adq[r]
+
+        melhor = -1
+        menor = np.inf
+        candidatos = 0
+
+        # 1️ Família já confirmada para esta venda
+        if venda >= 0 and familia_confirmada[venda] >= 0:
+            f = familia_confirmada[venda]
+            for q in range(familia_ptr[f], familia_ptr[f + 1]):
+                p = familia_pos[q]
+                if _passa_filtro(p, data, valor, parcela, total, usada, emissao, emissao_ok, valor_erp,
+                                 parcela_erp, total_erp, tolerancia_dias, tolerancia_valor):
+                    candidatos += 1
+                    pontuacao = _pontuar(r, p, data, valor, emissao, valor_erp, pessoa_errada, penalidade_pessoa,
+                                         cod_adq, desl_adq, cod_erp, desl_erp, linha_lcs)
+                    if pontuacao < menor:
+                        menor = pontuacao
+                        melhor = p
+            if melhor >= 0:
+                via_familia_out[r] = True
+
+        # 2️ Busca normal em todo o ERP
+        if melhor < 0:
+            for p in range(n_erp):
+                if _passa_filtro(p, data, valor, parcela, total, usada, emissao, emissao_ok, valor_erp,
+                                 parcela_erp, total_erp, tolerancia_dias, tolerancia_valor):
+                    candidatos += 1
+                    pontuacao = _pontuar(r, p, data, valor, emissao, valor_erp, pessoa_errada, penalidade_pessoa,
+                                         cod_adq, desl_adq, cod_erp, desl_erp, linha_lcs)
+                    if pontuacao < menor:
+                        menor = pontuacao
+                        melhor = p
+
+        candidatos_out[r] = candidatos
+        if melhor >= 0:
+            usada[melhor] = True
+            melhor_out[r] = melhor
+            pontuacao_out[r] = menor
+            if venda >= 0 and menor <= limiar_familia and familia_confirmada[venda] < 0:
+                familia_confirmada[venda] = familia_erp[melhor]
+
+
+# =========================
+# Preparação dos arrays
+# =========================
+def _codificar_textos(colunas):
+    """
+    Converte colunas de identificadores (já em str) em um único array de code points e
+    uma matriz de deslocamentos (identificador x linha+1).
+    """
+    n = len(colunas[0]) if colunas else 0
+    deslocamentos = np.zeros((len(colunas), n + 1), dtype=np.int64)
+    partes = []
+    posicao = 0
+    for k, textos in enumerate(colunas):
+        for i, texto in enumerate(textos):
+            codigos = np.frombuffer(texto.encode("utf-32-le"), dtype=np.int32)
+            partes.append(codigos)
+            posicao += len(codigos)
+            deslocamentos[k, i + 1] = posicao
+        if k + 1 < len(colunas):
+            deslocamentos[k + 1, 0] = posicao
+    codigos = np.concatenate(partes) if partes else np.zeros(0, dtype=np.int32)
+    return codigos, deslocamentos
+
+
+def _array(valores, dtype=None):
+    """
+    Array contíguo e gravável: o pandas 3 devolve visões somente leitura e o Numba
+    compilaria uma segunda versão do kernel só por causa disso.
+    """
+    return np.require(valores, dtype=dtype, requirements=["C", "W"])
+
+
+def _datas_ns(serie):
+    valores = pd.to_datetime(serie).to_numpy(dtype="datetime64[ns]")
+    return _array(valores.view(np.int64)), ~np.isnat(valores)
+
+
+def preparar_erp(df_erp, spec, familia):
+    """Arrays compactos do ERP usados pelo kernel."""
+    emissao, emissao_ok = _datas_ns(df_erp["Emissão"])
+    if "Pessoa do Título" in df_erp.columns:
+        pessoa_errada = _array((df_erp["Pessoa do Título"] != spec["pessoa_titulo"]).to_numpy(dtype=bool))
+    else:
+        pessoa_errada = np.zeros(len(df_erp), dtype=bool)
+
+    codigos_familia, _ = pd.factorize(familia, sort=False)
+    codigos_familia = codigos_familia.astype(np.int64)
+    ordem = np.argsort(codigos_familia, kind="stable").astype(np.int64)
+    contagem = np.bincount(codigos_familia, minlength=codigos_familia.max() + 1 if len(codigos_familia) else 0)
+    familia_ptr = np.zeros(len(contagem) + 1, dtype=np.int64)
+    np.cumsum(contagem, out=familia_ptr[1:])
+
+    cod_erp, desl_erp = _codificar_textos(
+        [[str(v) for v in df_erp[col_erp].astype(object)] for _, col_erp in spec["identificadores"]]
+    )
+    return {
+        "emissao": emissao,
+        "emissao_ok": emissao_ok,
+        "valor": _array(df_erp["Valor"].to_numpy(dtype=np.float64)),
+        "parcela": _array(df_erp["Numero da Parcela"].to_numpy(dtype=np.int64)),
+        "total": _array(df_erp["Total Parcelas"].to_numpy(dtype=np.int64)),
+        "pessoa_errada": pessoa_errada,
+        "familia": codigos_familia,
+        "familia_ptr": familia_ptr,
+        "familia_pos": ordem,
+        "cod": cod_erp,
+        "desl": desl_erp,
+    }
+
+
+def preparar_adquirente(df_adq, spec, vendas):
+    """Arrays compactos da adquirente; `vendas` é a chave da venda por linha (ou None)."""
+    colunas_id = [col_adq for col_adq, _ in spec["identificadores"]]
+    data, data_ok = _datas_ns(df_adq["DATA DA VENDA"])
+    valida = _array(~df_adq[colunas_id].isna().any(axis=1).to_numpy(dtype=bool))
+
+    ids_venda = {}
+    venda_adq = np.full(len(df_adq), -1, dtype=np.int64)
+    for i, venda in enumerate(vendas):
+        if venda is not None:
+            venda_adq[i] = ids_venda.setdefault(venda, len(ids_venda))
+
+    cod_adq, desl_adq = _codificar_textos(
+        [[str(v) for v in df_adq[col].astype(object)] for col in colunas_id]
+    )
+    return {
+        "data": data,
+        "data_ok": data_ok,
+        "valor": _array(df_adq["VALOR DA PARCELA"].to_numpy(dtype=np.float64)),
+        "parcela": _array(df_adq["PARCELA"].to_numpy(dtype=np.int64)),
+        "total": _array(df_adq["TOTAL_PARCELAS"].to_numpy(dtype=np.int64)),
+        "valida": valida,
+        "venda": venda_adq,
+        "n_vendas": len(ids_venda),
+        "cod": cod_adq,
+        "desl": desl_adq,
+    }
+
+
+def executar(adq, erp, tolerancia_dias, tolerancia_valor, penalidade_pessoa, limiar_familia, propagar_familias,
+             progresso=None):
+    """
+    Roda o kernel em blocos de linhas e devolve (melhor, pontuacao, via_familia, candidatos):
+    posição do título ERP escolhido por linha (-1 se nenhum), pontuação, se veio da família
+    e quantos candidatos foram pontuados (-1 nas linhas ignoradas).
+    """
+    n = len(adq["valor"])
+    usada = np.zeros(len(erp["valor"]), dtype=np.bool_)
+    familia_confirmada = np.full(max(adq["n_vendas"], 1), -1, dtype=np.int64)
+    melhor = np.full(n, -1, dtype=np.int64)
+    pontuacao = np.full(n, np.inf, dtype=np.float64)
+    via_familia = np.zeros(n, dtype=np.bool_)
+    candidatos = np.full(n, -1, dtype=np.int64)
+    venda = adq["venda"] if propagar_familias else np.full(n, -1, dtype=np.int64)
+    tamanho_max = max(int(np.diff(adq["desl"], axis=1).max(initial=0)), int(np.diff(erp["desl"], axis=1).max(initial=0)))
+    linha_lcs = np.zeros(tamanho_max + 1, dtype=np.int64)
+
+    for inicio in range(0, n, TAMANHO_BLOCO):
+        fim = min(inicio + TAMANHO_BLOCO, n)
+        _kernel_guloso(
+            inicio, fim,
+            adq["data"], adq["data_ok"], adq["valor"], adq["parcela"], adq["total"], adq["valida"], venda,
+            adq["cod"], adq["desl"],
+            erp["emissao"], erp["emissao_ok"], erp["valor"], erp["parcela"], erp["total"],
+            erp["pessoa_errada"], erp["familia"], erp["cod"], erp["desl"], erp["familia_ptr"], erp["familia_pos"],
+            float(tolerancia_dias), float(tolerancia_valor), float(penalidade_pessoa), float(limiar_familia),
+            usada, familia_confirmada, melhor, pontuacao, via_familia, candidatos, linha_lcs,
+        )
+        if progresso is not None:
+            progresso(fim, n)
+    return melhor, pontuacao, via_familia, candidatos
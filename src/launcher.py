@@ -1,16 +1,26 @@
-
-"""
-Script de inicialização para o aplicativo de Conciliação
-Autor: Yan Fernandes
-Descrição: codigo que da o comando "streamlit run" para o app.py, permitindo que o aplicativo seja executado em um ambiente de produção.
-"""
-
-#launcher.py
-import subprocess
-import os
-
-# Garante que o caminho funcione mesmo depois de empacotar
-script_path = os.path.join(os.path.dirname(__file__), 'app.py')
-
-# Executa o comando streamlit
-subprocess.run(["streamlit", "run", script_path])
+"""
+Script de inicialização para o aplicativo de Conciliação
+Autor: Yan Fernandes
+Descrição: codigo que da o comando "streamlit run" para o app.py, permitindo que o aplicativo seja executado em um ambiente de produção.
+Uso: python launcher.py [--perfil cprofile|amostragem|ambos]
+"""
+
+#launcher.py
+import argparse
+import subprocess
+import os
+
+# Garante que o caminho funcione mesmo depois de empacotar
+script_path = os.path.join(os.path.dirname(__file__), 'app.py')
+
+parser = argparse.ArgumentParser(description="Inicia o Concilia Fácil")
+parser.add_argument("--perfil", choices=["cprofile", "amostragem", "ambos"],
+                    help="perfila as etapas de cada conciliação (ver perfil.py)")
+args, extras = parser.parse_known_args()
+
+ambiente = dict(os.environ)
+if args.perfil:
+    ambiente["CONCILIA_PROFILE"] = args.perfil
+
+# Executa o comando streamlit
+subprocess.run(["streamlit", "run", script_path, *extras], env=ambiente)
@@ -0,0 +1,221 @@
+"""
+Mesa de conciliação manual
+Descrição: as linhas de "Não conciliados" eram resolvidas à mão no Excel, procurando no
+ERP um título de valor, data ou NSU parecidos. A mesa guarda, no resultado do job, as
+linhas pendentes e o ERP da execução (com os títulos já usados); ao escolher uma linha,
+lista os títulos livres mais prováveis com a pontuação aberta por componente. Aceitar
+um par marca o título como usado e atualiza os totais na hora, sem refazer a conciliação.
+
+Candidatos de uma linha, sem percorrer o ERP inteiro:
+- mesma janela de datas (JANELA_DIAS) e valor próximo (FOLGA_VALOR): busca binária nas
+  emissões ordenadas e filtro vetorizado só nessa fatia;
+- identificadores parecidos (autorização / NSU, qualquer data): índice de bigramas de
+  indice_ids.py, montado uma vez por execução.
+
+Pontuação igual à do motor (dias * 10 + diferença de valor * 100 + 100 - similaridade de
+cada identificador + penalidade de pessoa), mais PENALIDADE_PARCELA quando parcela ou
+total não conferem (a busca automática nem considera esses títulos).
+"""
+
+import io
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+import similaridade
+from indice_ids import IndiceIdentificadores
+from motor import PENALIDADE_PESSOA
+
+
+JANELA_DIAS = 30
+# Diferença de valor aceita na busca por data: 5% da parcela, no mínimo R$ 1,00
+FOLGA_VALOR = 0.05
+FOLGA_VALOR_MINIMA = 1.00
+PENALIDADE_PARCELA = 100
+# Títulos pontuados por consulta (os de menor diferença de data e valor primeiro)
+LIMITE_AVALIADOS = 500
+LIMITE_CANDIDATOS = 10
+STATUS_MANUAL = "Conciliado manualmente"
+
+# Parcela e total no ERP de cada banco (Cielo / CredShop, Santander)
+_COLUNAS_PARCELA_ERP = (("Numero da Parcela", "Total Parcelas"), ("Parcela", "Total_Parcelas"))
+_SEM_DATA = np.iinfo(np.int64).min
+
+
+def _dias(serie):
+    """Datas como número de dias (NaT vira _SEM_DATA, fora de qualquer janela)."""
+    datas = pd.to_datetime(serie, errors="coerce").to_numpy(dtype="datetime64[D]")
+    return np.where(np.isnat(datas), _SEM_DATA, datas.astype(np.int64))
+
+
+class Mesa:
+    """
+    Pendências de uma execução. `nao_conciliados`: linhas da adquirente sem título;
+    `df_erp`: ERP devolvido pelo conciliador (coluna "Usada"); `conciliados` e
+    `liquido_conciliado`: totais da aba Conciliados, atualizados a cada par aceito;
+    `penalidade_pessoa`: a mesma da execução (parametros["penalidade_pessoa"]).
+    """
+
+    def __init__(self, nao_conciliados, df_erp, spec, conciliados, liquido_conciliado,
+                 penalidade_pessoa=PENALIDADE_PESSOA):
+        self.spec = spec
+        self.linhas = nao_conciliados.reset_index(drop=True)
+        self.erp = df_erp  # acessado só por posição (iloc), sem copiar
+        self.usada = self.erp["Usada"].to_numpy(dtype=bool).copy()
+        self.aceitas = {}  # linha -> registro do par aceito
+        self.conciliados = int(conciliados)
+        self.liquido_conciliado = float(liquido_conciliado)
+        self.penalidade_pessoa = penalidade_pessoa
+        self._trava = threading.Lock()
+        self._preparada = False
+
+    def __len__(self):
+        return len(self.linhas)
+
+    # --- Índice (montado na primeira consulta)
+    def _preparar(self):
+        with self._trava:
+            if self._preparada:
+                return
+            erp, linhas = self.erp, self.linhas
+            col_parcela, col_total = next((p, t) for p, t in _COLUNAS_PARCELA_ERP if p in erp.columns)
+            self._col_parcela, self._col_total = col_parcela, col_total
+
+            dias = _dias(erp["Emissão"])
+            self._ordem = np.argsort(dias, kind="stable")
+            self._emissao_ordenada = dias[self._ordem]
+            self._emissao = dias
+            self._valor = pd.to_numeric(erp["Valor"], errors="coerce").to_numpy(dtype=np.float64)
+            self._parcela = pd.to_numeric(erp[col_parcela], errors="coerce").to_numpy(dtype=np.float64)
+            self._total = pd.to_numeric(erp[col_total], errors="coerce").to_numpy(dtype=np.float64)
+            self._pessoa_errada = (erp["Pessoa do Título"] != self.spec["pessoa_titulo"]).to_numpy() \
+                if "Pessoa do Título" in erp.columns else np.zeros(len(erp), dtype=bool)
+
+            # Mesmo texto que o motor compara: str() de cada valor
+            self._identificadores = [(col_adq, col_erp) for col_adq, col_erp in self.spec["identificadores"]
+                                     if col_adq in linhas.columns and col_erp in erp.columns]
+            self._textos_erp = {col_erp: erp[col_erp].astype(object).map(str).to_numpy()
+                                for _, col_erp in self._identificadores}
+            self._indices = {col_erp: IndiceIdentificadores(erp[col_erp]) for _, col_erp in self._identificadores}
+
+            self._data_linha = _dias(linhas["DATA DA VENDA"])
+            self._valor_linha = pd.to_numeric(linhas["VALOR DA PARCELA"], errors="coerce").to_numpy(dtype=np.float64)
+            self._parcela_linha = pd.to_numeric(linhas["PARCELA"], errors="coerce").to_numpy(dtype=np.float64)
+            self._total_linha = pd.to_numeric(linhas["TOTAL_PARCELAS"], errors="coerce").to_numpy(dtype=np.float64)
+            self._preparada = True
+            logging.info(f"🧩 Mesa de conciliação: {len(linhas)} pendências, {int((~self.usada).sum())} títulos livres")
+
+    # --- Consulta
+    def _posicoes(self, linha):
+        """Títulos livres na janela de data e valor da linha ou com identificador parecido."""
+        partes = []
+        data, valor = self._data_linha[linha], self._valor_linha[linha]
+        if data != _SEM_DATA and not np.isnan(valor):
+            inicio, fim = np.searchsorted(self._emissao_ordenada, [data - JANELA_DIAS, data + JANELA_DIAS + 1])
+            janela = self._ordem[inicio:fim]
+            folga = max(abs(valor) * FOLGA_VALOR, FOLGA_VALOR_MINIMA)
+            partes.append(janela[np.abs(self._valor[janela] - valor) <= folga])
+        for col_adq, col_erp in self._identificadores:
+            partes.extend(posicoes for _, _, posicoes in self._indices[col_erp].buscar(self.linhas.at[linha, col_adq]))
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        posicoes = np.unique(np.concatenate(partes).astype(np.int64))
+        return posicoes[~self.usada[posicoes]]
+
+    def candidatos(self, linha, limite=LIMITE_CANDIDATOS):
+        """Títulos livres mais prováveis para a `linha` (posição em self.linhas), com a pontuação aberta."""
+        self._preparar()
+        posicoes = self._posicoes(linha)
+        data, valor = self._data_linha[linha], self._valor_linha[linha]
+        emissao = self._emissao[posicoes]
+        sem_data = (emissao == _SEM_DATA) | (data == _SEM_DATA)
+        diferenca = np.where(sem_data, 0, emissao) - (0 if data == _SEM_DATA else data)
+        dias = np.where(sem_data, np.nan, np.abs(diferenca))
+        dif_valor = np.abs(self._valor[posicoes] - valor)
+        pontos = {"Pontos data": np.nan_to_num(dias * 10, nan=0.0), "Pontos valor": np.nan_to_num(dif_valor * 100, nan=0.0)}
+        if len(posicoes) > LIMITE_AVALIADOS:
+            # Similaridade custa mais: só para os mais próximos em data e valor
+            manter = np.argsort(pontos["Pontos data"] + pontos["Pontos valor"], kind="stable")[:LIMITE_AVALIADOS]
+            manter.sort()
+            posicoes, dias, dif_valor = posicoes[manter], dias[manter], dif_valor[manter]
+            pontos = {rotulo: p[manter] for rotulo, p in pontos.items()}
+
+        for col_adq, col_erp in self._identificadores:
+            texto = str(self.linhas.at[linha, col_adq])
+            textos = self._textos_erp[col_erp][posicoes]
+            pontos[f"Pontos {col_erp}"] = np.fromiter((100 - similaridade.ratio(texto, t) for t in textos),
+                                                      dtype=np.float64, count=len(textos))
+        pontos["Pontos pessoa"] = np.where(self._pessoa_errada[posicoes], self.penalidade_pessoa, 0)
+        confere = (self._parcela[posicoes] == self._parcela_linha[linha]) & \
+                  (self._total[posicoes] == self._total_linha[linha])
+        pontos["Pontos parcela"] = np.where(confere, 0, PENALIDADE_PARCELA)
+
+        colunas = ["Chave", "Emissão", "Valor", self._col_parcela, self._col_total]
+        colunas += [c for c in ("Pessoa do Título", *self._textos_erp) if c in self.erp.columns and c not in colunas]
+        tabela = self.erp.iloc[posicoes][colunas].copy()
+        tabela.insert(0, "Pontuação", np.round(sum(pontos.values()), 2))
+        tabela["Dias"] = dias
+        tabela["Dif. valor"] = np.round(dif_valor, 2)
+        for rotulo, valores in pontos.items():
+            tabela[rotulo] = np.round(valores, 2)
+        tabela.index = pd.Index(posicoes, name="pos")
+        return tabela.sort_values("Pontuação", kind="stable").head(limite)
+
+    # --- Decisões
+    def pendentes(self):
+        """Linhas ainda sem par, com a posição (usada em candidatos/aceitar) no índice."""
+        return self.linhas.drop(index=list(self.aceitas))
+
+    def aceitar(self, linha, pos, pontuacao=None):
+        """Concilia a `linha` com o título na posição `pos` do ERP."""
+        with self._trava:
+            if linha in self.aceitas:
+                raise ValueError(f"Linha {linha} já foi conciliada manualmente.")
+            if self.usada[pos]:
+                raise ValueError(f"Título {self.erp['Chave'].iat[pos]} já está conciliado.")
+            self.usada[pos] = True
+            self.aceitas[linha] = {"pos": pos, "pontuacao": pontuacao}
+            liquido = float(self.linhas.at[linha, "VALOR LÍQUIDO"])
+            self.conciliados += 1
+            self.liquido_conciliado += liquido
+        logging.info(f"🧩 Linha {linha} conciliada manualmente com a chave {self.erp['Chave'].iat[pos]}")
+
+    def desfazer(self, linha):
+        with self._trava:
+            registro = self.aceitas.pop(linha)
+            self.usada[registro["pos"]] = False
+            self.conciliados -= 1
+            self.liquido_conciliado -= float(self.linhas.at[linha, "VALOR LÍQUIDO"])
+
+    # --- Totais e saída
+    def metricas(self):
+        """Conciliados e não conciliados no formato de resultado["metricas"], com os pares aceitos."""
+        pendentes = self.pendentes()
+        return [
+            ("✅ Conciliados", f"R$ {self.liquido_conciliado:,.2f}", f"{self.conciliados} títulos"),
+            ("⚠ Não Conciliados", f"R$ {pendentes['VALOR LÍQUIDO'].sum():,.2f}", f"{len(pendentes)} títulos"),
+        ]
+
+    def manuais(self):
+        """Pares aceitos: a linha da adquirente com o título escolhido."""
+        if not self.aceitas:
+            return self.linhas.iloc[:0]
+        linhas = list(self.aceitas)
+        posicoes = [self.aceitas[linha]["pos"] for linha in linhas]
+        df = self.linhas.loc[linhas].copy()
+        titulos = self.erp.iloc[posicoes]
+        df["Chave ERP"] = titulos["Chave"].to_numpy()
+        df["Valor ERP"] = titulos["Valor"].to_numpy()
+        df["Emissão ERP"] = titulos["Emissão"].to_numpy()
+        df["Status"] = STATUS_MANUAL
+        df["Pontuação"] = [self.aceitas[linha]["pontuacao"] for linha in linhas]
+        return df
+
+    def exportar(self):
+        """Planilha (.xlsx, em bytes) com os pares aceitos, para baixar os títulos no ERP."""
+        saida = io.BytesIO()
+        with pd.ExcelWriter(saida, engine="openpyxl") as writer:
+            self.manuais().to_excel(writer, sheet_name="Conciliações manuais", index=False)
+        return saida.getvalue()
@@ -0,0 +1,139 @@
+"""
+Contadores do motor de conciliação
+Descrição: contadores baratos alimentados pelos conciliadores durante a execução:
+histograma do tamanho do conjunto de candidatos por linha, chamadas de fuzz.ratio,
+acertos do cache de similaridade (similaridade.py) e linhas resolvidas por etapa (família,
+busca completa, exata, similaridade, duplicados desfeitos, tolerância maior). Gravados em formato texto do Prometheus ao lado da planilha
+e exibidos no painel de resultado.
+"""
+
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+import similaridade
+
+
+# Limites superiores (inclusivos) do histograma de candidatos por linha
+LIMITES_CANDIDATOS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+NOME_ARQUIVO = "metricas.prom"
+PREFIXO = "concilia"
+
+
+class Metricas:
+    def __init__(self):
+        self.candidatos = defaultdict(lambda: np.zeros(len(LIMITES_CANDIDATOS) + 1, dtype=np.int64))
+        self.soma_candidatos = defaultdict(int)
+        self.fuzz = defaultdict(int)
+        self.resolvidas = defaultdict(int)
+        # Consultas ao cache de similaridade (do processo) feitas por esta execução
+        self.similaridade = similaridade.Contagem()
+        # Lojas conciliadas em paralelo (estabelecimentos.py) somam nos mesmos contadores
+        self._trava = threading.Lock()
+
+    # --- Coleta
+    def observar_candidatos(self, etapa, n):
+        """Registra o tamanho do conjunto de candidatos de uma linha."""
+        posicao = np.searchsorted(LIMITES_CANDIDATOS, n)
+        with self._trava:
+            self.candidatos[etapa][posicao] += 1
+            self.soma_candidatos[etapa] += int(n)
+
+    def observar_candidatos_lote(self, etapa, contagens):
+        """Mesma coisa que observar_candidatos para um array inteiro (kernel compilado)."""
+        contagens = np.asarray(contagens, dtype=np.int64)
+        posicoes = np.searchsorted(LIMITES_CANDIDATOS, contagens)
+        histograma = np.bincount(posicoes, minlength=len(LIMITES_CANDIDATOS) + 1)
+        with self._trava:
+            self.candidatos[etapa] += histograma
+            self.soma_candidatos[etapa] += int(contagens.sum())
+
+    def contar_fuzz(self, etapa, n=1):
+        with self._trava:
+            self.fuzz[etapa] += int(n)
+
+    def resolver(self, etapa, n=1):
+        with self._trava:
+            self.resolvidas[etapa] += int(n)
+
+    # --- Saída
+    def cache_similaridade(self):
+        consultas, faltas = self.similaridade.consultas, self.similaridade.faltas
+        acertos = consultas - faltas
+        return {"acertos": acertos, "faltas": faltas,
+                "taxa_acerto": round(acertos / consultas, 4) if consultas else 0.0}
+
+    def resumo(self):
+        return {
+            "candidatos": {
+                etapa: {
+                    "linhas": int(contagem.sum()),
+                    "media": round(float(self.soma_candidatos[etapa] / contagem.sum()), 2) if contagem.sum() else 0.0,
+                    "buckets": {_rotulo(i): int(n) for i, n in enumerate(contagem)},
+                }
+                for etapa, contagem in self.candidatos.items()
+            },
+            "fuzz_ratio": dict(self.fuzz),
+            "resolvidas": dict(self.resolvidas),
+            "cache_similaridade": self.cache_similaridade(),
+        }
+
+    def para_prometheus(self, banco, etapas=()):
+        """Texto no formato de exposição do Prometheus; `etapas` vem da telemetria."""
+        linhas = []
+
+        def rotulos(**kw):
+            return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in (("banco", banco), *kw.items())) + "}"
+
+        nome = f"{PREFIXO}_candidatos_por_linha"
+        linhas += [f"# HELP {nome} Tamanho do conjunto de candidatos ERP avaliado por linha da adquirente.",
+                   f"# TYPE {nome} histogram"]
+        for etapa, contagem in self.candidatos.items():
+            acumulado = np.cumsum(contagem)
+            for limite, n in zip(LIMITES_CANDIDATOS, acumulado):
+                linhas.append(f"{nome}_bucket{rotulos(etapa=etapa, le=limite)} {n}")
+            linhas.append(f'{nome}_bucket{rotulos(etapa=etapa, le="+Inf")} {acumulado[-1]}')
+            linhas.append(f"{nome}_sum{rotulos(etapa=etapa)} {self.soma_candidatos[etapa]}")
+            linhas.append(f"{nome}_count{rotulos(etapa=etapa)} {acumulado[-1]}")
+
+        nome = f"{PREFIXO}_fuzz_ratio_total"
+        linhas += [f"# HELP {nome} Chamadas de similaridade (fuzz.ratio) entre identificadores.",
+                   f"# TYPE {nome} counter"]
+        linhas += [f"{nome}{rotulos(etapa=etapa)} {n}" for etapa, n in self.fuzz.items()]
+
+        nome = f"{PREFIXO}_linhas_resolvidas_total"
+        linhas += [f"# HELP {nome} Linhas resolvidas (ou desfeitas, no caso de duplicados) por etapa.",
+                   f"# TYPE {nome} counter"]
+        linhas += [f"{nome}{rotulos(etapa=etapa)} {n}" for etapa, n in self.resolvidas.items()]
+
+        nome = f"{PREFIXO}_cache_similaridade_total"
+        cache = self.cache_similaridade()
+        linhas += [f"# HELP {nome} Consultas ao cache de similaridade entre identificadores.",
+                   f"# TYPE {nome} counter",
+                   f"{nome}{rotulos(resultado='acerto')} {cache['acertos']}",
+                   f"{nome}{rotulos(resultado='falta')} {cache['faltas']}"]
+
+        if etapas:
+            for chave, nome, ajuda in (("parede_s", f"{PREFIXO}_etapa_segundos", "Tempo de parede da etapa."),
+                                       ("cpu_s", f"{PREFIXO}_etapa_cpu_segundos", "Tempo de CPU da etapa."),
+                                       ("linhas", f"{PREFIXO}_etapa_linhas", "Linhas processadas na etapa.")):
+                linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+                linhas += [f"{nome}{rotulos(etapa=e['etapa'])} {e[chave]}" for e in etapas]
+
+        return "\n".join(linhas) + "\n"
+
+    def salvar(self, pasta_saida, banco, etapas=()):
+        caminho = os.path.join(pasta_saida, NOME_ARQUIVO)
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write(self.para_prometheus(banco, etapas))
+        return caminho
+
+
+def _rotulo(i):
+    return f"<={LIMITES_CANDIDATOS[i]}" if i < len(LIMITES_CANDIDATOS) else f">{LIMITES_CANDIDATOS[-1]}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,289 @@
+"""
+Motor de conciliação compartilhado
+Descrição: busca gulosa usada pela Cielo e pela CredShop (cada título ERP só pode ser usado
+uma vez) e a propagação por família de parcelas: quando uma parcela de uma venda é
+conciliada com segurança, as parcelas irmãs são resolvidas direto pela Ch Criação do ERP.
+
+A CredShop passou a ter uma passada só, como a Cielo. O credshop.py original repetia a
+busca de todas as linhas dentro do laço da barra de progresso, e a linha ficava com o
+título da última volta que ainda achava candidato. Em linhas que disputam títulos, o
+título e a pontuação mudam; as quantidades conciliadas não. A diferença está aprovada em
+equivalencia/aprovacoes.json.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import kernel
+import indice_erp
+import similaridade
+
+
+# Pontuação máxima para considerar uma conciliação "segura" o bastante para propagar
+# a família (mesma data, valor dentro da tolerância e identificadores idênticos).
+LIMIAR_CONFIANCA_FAMILIA = 20
+
+# Acréscimo padrão na pontuação de um título de outra "Pessoa do Título" (ajustável na barra
+# lateral, ver etapas.py)
+PENALIDADE_PESSOA = 101
+# Rótulo da busca gulosa nos contadores do motor (metricas.py)
+ETAPA_METRICAS = "busca"
+
+
+# =========================
+# Famílias de parcelas
+# =========================
+def chave_familia_erp(df_erp):
+    """
+    Identificador da venda no ERP: coluna chcriacao/Ch Criação quando existir, senão o
+    prefixo do Numero (313522077-4/5 -> 313522077). Título sem a chave fica sozinho na
+    própria família, em vez de todos os vazios formarem uma família "nan".
+    """
+    if "chcriacao" in df_erp.columns:
+        origem = df_erp["chcriacao"]
+        chave = origem.astype(str)
+    elif "Ch Criação" in df_erp.columns:
+        origem = df_erp["Ch Criação"]
+        chave = origem.astype(str)
+    else:
+        origem = df_erp["Numero"]
+        chave = origem.astype(str).str.split("-").str[0]
+    vazia = origem.isna().to_numpy()
+    if vazia.any():
+        chave = chave.copy()
+        chave.iloc[vazia] = [f"sem família {n}" for n in np.flatnonzero(vazia)]
+    return chave
+
+
+class IndiceFamilias:
+    """Índice (família, parcela, total de parcelas) -> rótulos dos títulos no ERP."""
+
+    def __init__(self, df_erp):
+        self.familia = chave_familia_erp(df_erp)
+        chaves = pd.DataFrame({
+            "familia": self.familia,
+            "parcela": df_erp["Numero da Parcela"],
+            "total": df_erp["Total Parcelas"],
+        })
+        self.grupos = {
+            chave: list(rotulos)
+            for chave, rotulos in chaves.groupby(["familia", "parcela", "total"], sort=False).groups.items()
+        }
+
+    def buscar(self, familia, parcela, total):
+        return self.grupos.get((familia, parcela, total), [])
+
+
+def chave_venda(row, colunas_id, col_total="TOTAL_PARCELAS", col_data="DATA DA VENDA"):
+    """Parcelas irmãs da adquirente compartilham identificadores, data da venda e total."""
+    if row[col_total] <= 1:
+        return None
+    return tuple(str(row[col]) for col in colunas_id) + (row[col_data], row[col_total])
+
+
+# =========================
+# Busca gulosa (Cielo / CredShop)
+# =========================
+def _filtrar_candidatos(df_erp, row, tolerancia_dias, tolerancia_valor):
+    return df_erp[
+        (~df_erp["Usada"]) &
+        (abs((df_erp["Emissão"] - row["DATA DA VENDA"]).dt.days) <= tolerancia_dias) &
+        (abs(df_erp["Valor"] - row["VALOR DA PARCELA"]) <= tolerancia_valor) &
+        (df_erp["Numero da Parcela"] == row["PARCELA"]) &
+        (df_erp["Total Parcelas"] == row["TOTAL_PARCELAS"])
+    ]
+
+
+def _adicionar_colunas_resultado(df_adq, identificadores):
+    """Adiciona as colunas de resultado na adquirente."""
+    for _, col_erp in identificadores:
+        df_adq[f"{col_erp} ERP"] = None
+    df_adq["Chave ERP"] = None
+    df_adq["Valor ERP"] = None
+    df_adq["Emissão ERP"] = None
+    df_adq["Parcela ERP"] = None
+    df_adq["Total Parcelas ERP"] = None
+    df_adq["Pessoa do Título"] = None
+    df_adq["Status"] = "Não conciliado"
+    df_adq["Pontuação"] = 999
+
+
+def _registrar_conciliacao(df_adq, i, melhor, menor_pontuacao, identificadores):
+    for _, col_erp in identificadores:
+        df_adq.at[i, f"{col_erp} ERP"] = melhor[col_erp]
+    df_adq.at[i, "Chave ERP"] = melhor["Chave"]
+    df_adq.at[i, "Valor ERP"] = melhor["Valor"]
+    df_adq.at[i, "Emissão ERP"] = melhor["Emissão"]
+    df_adq.at[i, "Parcela ERP"] = melhor["Numero da Parcela"]
+    df_adq.at[i, "Total Parcelas ERP"] = melhor["Total Parcelas"]
+    df_adq.at[i, "Pessoa do Título"] = melhor.get("Pessoa do Título", None)
+    df_adq.at[i, "Status"] = "Conciliado"
+    df_adq.at[i, "Pontuação"] = round(menor_pontuacao, 0)
+    logging.info(f"✅ Linha {i} conciliada com chave {melhor['Chave']} (Pontuação: {round(menor_pontuacao, 0)})")
+
+
+def conciliar_guloso(df_adq, df_erp, spec, tolerancia_dias=5, tolerancia_valor=0.20,
+                     propagar_familias=True, progresso=None, usar_kernel=None, metricas=None,
+                     penalidade_pessoa=PENALIDADE_PESSOA):
+    """
+    Concilia linha a linha, na ordem do arquivo da adquirente, escolhendo o título ERP de
+    menor pontuação ainda não usado. `spec` é a especificação da adquirente (adquirentes.py),
+    de onde vêm os identificadores comparados e a "Pessoa do Título" esperada; um título de
+    outra pessoa soma `penalidade_pessoa` à pontuação.
+    `progresso`, se informado, é chamado com (linhas_processadas, total).
+    `usar_kernel`: None usa o kernel compilado (kernel.py) quando o Numba estiver instalado.
+    `metricas`: contadores da execução (metricas.Metricas), opcional.
+    """
+    identificadores = spec["identificadores"]
+    df_adq, df_erp = preparar_resultado(df_adq, df_erp, identificadores)
+    busca = buscar_guloso(df_adq, df_erp, spec, tolerancia_dias, tolerancia_valor, penalidade_pessoa,
+                          propagar_familias, progresso, usar_kernel)
+    return registrar_resultados(df_adq, df_erp, identificadores, *busca, propagar_familias, metricas)
+
+
+def buscar_guloso(df_adq, df_erp, spec, tolerancia_dias=5, tolerancia_valor=0.20, penalidade_pessoa=PENALIDADE_PESSOA,
+                  propagar_familias=True, progresso=None, usar_kernel=None):
+    """
+    A busca de conciliar_guloso, sem gravar o resultado: (melhor, pontuacao, via_familia,
+    candidatos) por linha, como kernel.executar. `melhor` é a posição do título no ERP
+    (-1 = não conciliada); `candidatos`, os títulos pontuados (-1 = linha ignorada).
+    """
+    if usar_kernel is None:
+        usar_kernel = kernel.DISPONIVEL
+    if usar_kernel:
+        return _buscar_guloso_kernel(df_adq, df_erp, spec, tolerancia_dias, tolerancia_valor, penalidade_pessoa,
+                                     propagar_familias, progresso)
+
+    identificadores = spec["identificadores"]
+    colunas_id = [col_adq for col_adq, _ in identificadores]
+    pessoa_esperada = spec["pessoa_titulo"]
+
+    # Rótulos do ERP = posições, o que a busca devolve
+    df_erp = df_erp.reset_index(drop=True)
+    df_erp["Usada"] = False
+
+    indice_familias = IndiceFamilias(df_erp) if propagar_familias else None
+    familias_confirmadas = {}  # chave da venda -> família ERP
+
+    total = len(df_adq)
+    melhores = np.full(total, -1, dtype=np.int64)
+    pontuacoes = np.full(total, np.inf)
+    vias_familia = np.zeros(total, dtype=bool)
+    contagem = np.full(total, -1, dtype=np.int64)
+    for n, (i, row) in enumerate(df_adq.iterrows()):
+        if progresso is not None:
+            progresso(n + 1, total)
+
+        if any(pd.isna(row[col]) for col in colunas_id):
+            continue
+
+        logging.debug(f"🔍 Linha {i} - {', '.join(f'{col}: {row[col]}' for col in colunas_id)}, Parcela: {row['PARCELA']}")
+
+        # 1️ Parcela irmã de uma venda já conciliada: busca direta pela família
+        venda = chave_venda(row, colunas_id) if indice_familias is not None else None
+        candidatos = None
+        via_familia = False
+        if venda in familias_confirmadas:
+            rotulos = indice_familias.buscar(familias_confirmadas[venda], row["PARCELA"], row["TOTAL_PARCELAS"])
+            if rotulos:
+                candidatos = _filtrar_candidatos(df_erp.loc[rotulos], row, tolerancia_dias, tolerancia_valor)
+                if candidatos.empty:
+                    candidatos = None
+                else:
+                    via_familia = True
+
+        # 2️ Busca normal em todo o ERP
+        if candidatos is None:
+            candidatos = _filtrar_candidatos(df_erp, row, tolerancia_dias, tolerancia_valor)
+
+        logging.debug(f"🔎 {len(candidatos)} candidatos encontrados para a linha {i} da {spec['rotulo']}.")
+        contagem[n] = len(candidatos)
+
+        melhor = None
+        menor_pontuacao = float("inf")
+
+        for _, linha in candidatos.iterrows():
+            dias_dif = abs((linha["Emissão"] - row["DATA DA VENDA"]).days)
+            valor_dif = abs(linha["Valor"] - row["VALOR DA PARCELA"])
+
+            pontuacao = dias_dif * 10 + valor_dif * 100
+            for col_adq, col_erp in identificadores:
+                pontuacao += 100 - similaridade.ratio(str(row[col_adq]), str(linha[col_erp]))
+            if "Pessoa do Título" in linha and linha["Pessoa do Título"] != pessoa_esperada:
+                pontuacao += penalidade_pessoa
+
+            logging.debug(f"➡️ Testando Chave {linha['Chave']} | Dias: {dias_dif}, Valor: {valor_dif}, Pontuação: {pontuacao:.2f}")
+
+            if pontuacao < menor_pontuacao:
+                menor_pontuacao = pontuacao
+                melhor = linha
+
+        if melhor is not None:
+            df_erp.at[melhor.name, "Usada"] = True
+            melhores[n] = melhor.name
+            pontuacoes[n] = menor_pontuacao
+            vias_familia[n] = via_familia
+
+            if venda is not None and menor_pontuacao <= LIMIAR_CONFIANCA_FAMILIA:
+                familias_confirmadas.setdefault(venda, indice_familias.familia.loc[melhor.name])
+        else:
+            logging.info(f"❌ Linha {i} não conciliada (sem candidatos adequados)")
+
+    return melhores, pontuacoes, vias_familia, contagem
+
+
+def _buscar_guloso_kernel(df_adq, df_erp, spec, tolerancia_dias, tolerancia_valor, penalidade_pessoa,
+                          propagar_familias, progresso):
+    """Mesmo resultado de buscar_guloso, com o laço sequencial no kernel compilado."""
+    colunas_id = [col_adq for col_adq, _ in spec["identificadores"]]
+    vendas = [
+        chave_venda(row, colunas_id) if propagar_familias else None
+        for _, row in df_adq[colunas_id + ["DATA DA VENDA", "TOTAL_PARCELAS"]].iterrows()
+    ]
+    # Arrays do ERP compartilhados em disco entre sessões/processos (indice_erp.py)
+    arrays_adq = kernel.preparar_adquirente(df_adq, spec, vendas)
+    with indice_erp.obter(df_erp, spec, chave_familia_erp(df_erp)) as arrays_erp:
+        return kernel.executar(
+            arrays_adq, arrays_erp, tolerancia_dias, tolerancia_valor, penalidade_pessoa,
+            LIMIAR_CONFIANCA_FAMILIA, propagar_familias, progresso,
+        )
+
+
+def preparar_resultado(df_adq, df_erp, identificadores):
+    """Cópias da adquirente (com as colunas de resultado) e do ERP (Chave normalizada, Usada)."""
+    df_adq = df_adq.copy()
+    # Cópia rasa: só colunas novas (Chave normalizada, Usada) são gravadas no ERP
+    df_erp = df_erp.copy(deep=False)
+    df_erp["Chave"] = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64")
+    df_erp["Usada"] = False
+    _adicionar_colunas_resultado(df_adq, identificadores)
+
+    colunas_id = [col_adq for col_adq, _ in identificadores]
+    for i in df_adq.index[df_adq[colunas_id].isna().any(axis=1)]:
+        logging.warning(f"⚠️ Linha {i} ignorada por dados ausentes.")
+    return df_adq, df_erp
+
+
+def registrar_resultados(df_adq, df_erp, identificadores, melhor, pontuacao, via_familia, candidatos,
+                         propagar_familias=True, metricas=None):
+    """
+    Grava na adquirente (vinda de preparar_resultado) os títulos escolhidos: `melhor` é a
+    posição do título no ERP por linha (-1 = não conciliada), como devolve buscar_guloso.
+    Também usado pela varredura.
+    """
+    conciliadas = np.flatnonzero(melhor >= 0)
+    df_erp.iloc[melhor[conciliadas], df_erp.columns.get_loc("Usada")] = True
+    titulos = df_erp.take(melhor[conciliadas])
+    for r, (_, linha) in zip(conciliadas, titulos.iterrows()):
+        _registrar_conciliacao(df_adq, df_adq.index[r], linha, pontuacao[r], identificadores)
+
+    if metricas is not None:
+        avaliadas = candidatos[candidatos >= 0]
+        metricas.observar_candidatos_lote(ETAPA_METRICAS, avaliadas)
+        metricas.contar_fuzz(ETAPA_METRICAS, int(avaliadas.sum()) * len(identificadores))
+        metricas.resolver("familia", int(via_familia.sum()))
+        metricas.resolver("busca_completa", len(conciliadas) - int(via_familia.sum()))
+
+    if propagar_familias:
+        logging.info(f"👪 {int(via_familia.sum())} parcelas resolvidas pela família (Ch Criação)")
+    return df_adq, df_erp
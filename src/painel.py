@@ -0,0 +1,456 @@
+"""
+Painel de acompanhamento das conciliações
+Descrição: ponte entre a interface Streamlit de cada banco e o executor em segundo plano
+(jobs.py). Submete a conciliação, mostra o progresso ao vivo com opção de cancelar e
+exibe o resultado quando o job termina, mesmo depois de o navegador reconectar.
+"""
+
+import io
+import os
+import logging
+import streamlit as st
+
+import jobs
+import perfil
+
+
+INTERVALO_ATUALIZACAO = 1.0  # segundos entre atualizações do progresso
+TAMANHOS_PAGINA = (50, 100, 500)  # linhas por página no explorador de resultados
+# Colunas da adquirente mostradas na lista de pendências da conciliação manual
+COLUNAS_PENDENCIAS = ["DATA DA VENDA", "VALOR DA PARCELA", "VALOR LÍQUIDO", "PARCELA", "TOTAL_PARCELAS"]
+ESPERA_RESULTADO = 0.9  # ao mudar só os parâmetros, o resultado costuma sair antes disso
+
+
+def _copiar_upload(arquivo):
+    """Copia o upload para memória: o job continua mesmo se a sessão for encerrada."""
+    if isinstance(arquivo, list):  # accept_multiple_files
+        return [_copiar_upload(a) for a in arquivo]
+    copia = io.BytesIO(arquivo.getvalue())
+    copia.name = arquivo.name
+    return copia
+
+
+def _listar(arquivos):
+    for arquivo in arquivos:
+        yield from (arquivo if isinstance(arquivo, list) else [arquivo])
+
+
+def _assinatura(arquivos):
+    return tuple(getattr(a, "file_id", None) or (a.name, a.size) for a in _listar(arquivos))
+
+
+def _registrar_na_sessao(banco, job):
+    st.session_state[f"job_{banco}"] = job.id
+    st.session_state.setdefault("meus_jobs", [])
+    if job.id not in st.session_state["meus_jobs"]:
+        st.session_state["meus_jobs"].append(job.id)
+    st.query_params["job"] = job.id
+
+
+def _job_atual(banco):
+    """Job aberto nesta sessão ou, após reconexão, o informado na URL."""
+    job = jobs.obter(st.session_state.get(f"job_{banco}"))
+    if job is None:
+        job = jobs.obter(st.query_params.get("job"))
+        if job is not None and job.banco == banco:
+            _registrar_na_sessao(banco, job)
+        else:
+            job = None
+    return job
+
+
+def conciliar_em_segundo_plano(banco, processar, *arquivos, parametros=None, previa=None):
+    """
+    Submete a conciliação dos arquivos enviados (se ainda não foi) e acompanha o job. Mudar
+    os `parametros` com os mesmos arquivos submete de novo; as etapas em cache (etapas.py)
+    fazem o resultado sair em instantes, então espera um pouco antes de mostrar o progresso.
+    `previa`: estimativa por amostra do banco; com a prévia ligada na barra lateral, arquivos
+    novos só são conciliados depois de o usuário confirmar a estimativa.
+    """
+    arquivos_assinatura = _assinatura(arquivos)
+    assinatura = (arquivos_assinatura, tuple(sorted((parametros or {}).items())))
+    anterior = st.session_state.get(f"assinatura_{banco}")
+    job = _job_atual(banco)
+    if job is None or anterior != assinatura:
+        novos = anterior is None or anterior[0] != arquivos_assinatura
+        if previa is not None and novos and st.session_state.get(f"usar_previa_{banco}") \
+                and not exibir_previa(banco, previa, arquivos, arquivos_assinatura, parametros):
+            return
+        descricao = " + ".join(a.name for a in _listar(arquivos))
+        opcoes = {"perfil": st.session_state["perfil"]} if st.session_state.get("perfil") else {}
+        if parametros:
+            opcoes["parametros"] = parametros
+            descricao += (f" · {parametros['tolerancia_dias']} dias, R$ {parametros['tolerancia_valor']:.2f},"
+                          f" penalidade {parametros['penalidade_pessoa']}")
+        job = jobs.submeter(banco, descricao, processar, *[_copiar_upload(a) for a in arquivos], **opcoes)
+        st.session_state[f"assinatura_{banco}"] = assinatura
+        _registrar_na_sessao(banco, job)
+        if anterior is not None and anterior[0] == arquivos_assinatura:
+            job.aguardar(ESPERA_RESULTADO)
+    acompanhar(job)
+
+
+def exibir_previa(banco, previa, arquivos, arquivos_assinatura, parametros):
+    """Estimativa por amostra (amostra.py) e o botão que libera a conciliação. True depois de confirmada."""
+    if st.session_state.get(f"previa_confirmada_{banco}") == arquivos_assinatura:
+        return True
+    chave = (arquivos_assinatura, tuple(sorted((parametros or {}).items())))
+    guardada = st.session_state.get(f"previa_{banco}")
+    if guardada is None or guardada[0] != chave:
+        try:
+            with st.spinner("🔍 Conciliando uma amostra das vendas..."):
+                estimativa = previa(*[_copiar_upload(a) for a in arquivos], parametros=parametros)
+        except Exception as e:
+            logging.error(f"Erro na prévia ({banco}): {e}", exc_info=True)
+            st.error(f"❌ Erro ao carregar arquivos: {e}")
+            return False
+        st.session_state[f"previa_{banco}"] = (chave, estimativa)
+    else:
+        estimativa = guardada[1]
+
+    st.header("Prévia da conciliação")
+    st.caption(f"Estimativa com {estimativa['amostra']} de {estimativa['linhas']} vendas sorteadas em "
+               f"{estimativa['estratos']} estratos (semana x à vista/parcelado), calculada em "
+               f"{estimativa['segundos']} s. Faixas com 95% de confiança.")
+    for coluna, (rotulo, valor, faixa) in zip(st.columns(len(estimativa["metricas"])), estimativa["metricas"]):
+        coluna.metric(rotulo, valor)
+        coluna.caption(faixa)
+    for aviso in estimativa["avisos"]:
+        if aviso.startswith("❌"):
+            st.error(aviso)
+        else:
+            st.warning(aviso)
+    if st.button("▶️ Confirmar e conciliar", key=f"confirmar_previa_{banco}", type="primary"):
+        st.session_state[f"previa_confirmada_{banco}"] = arquivos_assinatura
+        st.rerun()
+    return False
+
+
+def parametros_de_conciliacao(banco):
+    """Tolerâncias e penalidade de "Pessoa do Título" ajustáveis na barra lateral."""
+    import etapas
+
+    padrao = etapas.PARAMETROS_PADRAO
+    with st.expander("⚙️ Parâmetros da conciliação"):
+        dias = st.slider("Tolerância de dias", 0, etapas.TETO_DIAS, padrao["tolerancia_dias"],
+                         key=f"tolerancia_dias_{banco}")
+        valor = st.slider("Tolerância de valor (R$)", 0.0, etapas.TETO_VALOR, padrao["tolerancia_valor"],
+                          step=0.05, format="%.2f", key=f"tolerancia_valor_{banco}")
+        penalidade = st.number_input("Penalidade por pessoa diferente", min_value=0,
+                                     value=padrao["penalidade_pessoa"], step=1, key=f"penalidade_{banco}",
+                                     help="Somada à pontuação quando a pessoa do título não é a adquirente")
+        st.toggle("🔍 Prévia por amostra antes de conciliar", key=f"usar_previa_{banco}",
+                  help="Estima a conciliação com uma amostra das vendas em segundos; a conciliação "
+                       "completa só começa depois de confirmar")
+    return {"tolerancia_dias": int(dias), "tolerancia_valor": round(float(valor), 2),
+            "penalidade_pessoa": int(penalidade)}
+
+
+def retomar_conciliacao(banco):
+    """Mostra o job já existente do banco, se houver. Retorna True quando exibiu algo."""
+    job = _job_atual(banco)
+    if job is None:
+        return False
+    acompanhar(job)
+    return True
+
+
+def _reprocessar(banco):
+    st.session_state.pop(f"job_{banco}", None)
+    st.session_state.pop(f"assinatura_{banco}", None)
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+
+def _abrir(banco, job_id):
+    st.session_state[f"job_{banco}"] = job_id
+    st.query_params["job"] = job_id
+
+
+def opcoes_de_diagnostico():
+    """Chave de perfilamento (perfil.py), visível só com ?debug na URL."""
+    if "debug" not in st.query_params:
+        return
+    with st.sidebar:
+        st.markdown("### Diagnóstico")
+        ligado = st.toggle("Perfilar conciliação", key="perfil_ligado",
+                           help="Grava cProfile e pilhas amostradas de cada etapa na pasta do job")
+        st.session_state["perfil"] = perfil.MODOS if ligado else None
+
+
+def controle_de_cache():
+    """Tamanho do cache de entradas (cache_parquet.py) e botão para apagá-lo."""
+    import cache_parquet  # leve: o pyarrow só é importado ao ler/gravar
+
+    if not cache_parquet.ATIVO:
+        return
+    quantidade, tamanho = cache_parquet.tamanho()
+    with st.sidebar.expander("🗄️ Cache de arquivos"):
+        st.caption(f"{quantidade} arquivo(s) · {tamanho / 1024 / 1024:,.1f} MB")
+        if st.button("🧹 Limpar cache", key="limpar_cache", use_container_width=True):
+            import etapas
+            import explorador
+            import indice_erp
+
+            cache_parquet.limpar()
+            indice_erp.limpar()
+            etapas.limpar()
+            explorador.limpar()
+            st.toast("Cache apagado")
+            st.rerun()
+
+
+def listar_conciliacoes(banco):
+    """Lista, na barra lateral, as conciliações desta sessão para reabrir o resultado."""
+    meus = set(st.session_state.get("meus_jobs", []))
+    recentes = [j for j in jobs.listar(banco) if j.id in meus]
+    if not recentes:
+        return
+    st.markdown("### Conciliações recentes")
+    for job in recentes[:5]:
+        rotulo = f"{job.criado_em:%d/%m %H:%M} · {job.estado}"
+        st.button(rotulo, key=f"abrir_{job.id}", help=job.descricao,
+                  on_click=_abrir, args=(banco, job.id), use_container_width=True)
+
+
+def acompanhar(job):
+    if not job.finalizado:
+        _progresso(job.id)
+        return
+    exibir_resultado(job)
+
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def _progresso(job_id):
+    job = jobs.obter(job_id)
+    if job is None or job.finalizado:
+        st.rerun()
+    st.progress(job.fracao, text=job.texto)
+    st.caption(f"{job.estado} · {job.descricao}")
+    st.button("🛑 Cancelar conciliação", key=f"cancelar_{job.id}", on_click=jobs.cancelar, args=(job.id,))
+    if job.previa is not None:
+        _exibir_numeros(job.previa)
+
+
+def exibir_resultado(job):
+    if job.estado == jobs.ERRO:
+        st.error(f"❌ Erro ao carregar arquivos: {job.erro}")
+    elif job.estado == jobs.CANCELADO:
+        st.warning("🛑 Conciliação cancelada.")
+    else:
+        resultado = job.resultado
+
+        # === INTERFACE FINAL ===
+        _exibir_numeros(resultado)
+        explorar_resultado(job)
+        conciliacao_manual(job)
+
+        if resultado.get("desempenho"):
+            exibir_desempenho(resultado["desempenho"])
+
+        for aviso in resultado["avisos"]:
+            if aviso.startswith("❌"):
+                st.error(aviso)
+            else:
+                st.warning(aviso)
+
+        caminho = resultado.get("caminho")
+        if caminho and os.path.exists(caminho):
+            with open(caminho, "rb") as f:
+                st.download_button(
+                    label="📥 Baixar Planilha de Conciliação",
+                    data=f,
+                    file_name=resultado["nome_download"],
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
+    st.button("🔁 Conciliar novamente", key=f"reprocessar_{job.id}", on_click=_reprocessar, args=(job.banco,))
+
+
+def _exibir_numeros(resultado):
+    """Métricas e resumos do resultado (ou da prévia publicada antes da planilha)."""
+    with st.container():
+        st.header(resultado["titulo"])
+        if resultado.get("subtitulo"):
+            st.subheader(resultado["subtitulo"])
+
+        colunas = st.columns(len(resultado["metricas"]))
+        for coluna, (rotulo, valor, delta) in zip(colunas, resultado["metricas"]):
+            with coluna:
+                st.metric(rotulo, valor, delta)
+
+        with st.expander("📊 Ver relatório completo"):
+            st.dataframe(resultado["relatorio"], hide_index=True)
+
+        if resultado.get("por_arquivo") is not None:
+            with st.expander(f"📚 Resumo por arquivo ({len(resultado['por_arquivo'])} arquivos)"):
+                st.dataframe(resultado["por_arquivo"], hide_index=True)
+
+        if resultado.get("por_loja") is not None:
+            with st.expander(f"🏬 Resumo por loja ({len(resultado['por_loja'])} lojas)"):
+                st.dataframe(resultado["por_loja"], hide_index=True)
+
+
+def explorar_resultado(job):
+    """Linhas do resultado com filtro, ordem e paginação no servidor (explorador.py)."""
+    tabelas = {aba: caminho for aba, caminho in (job.resultado.get("tabelas") or {}).items()
+               if os.path.exists(caminho)}
+    if tabelas:
+        with st.expander("🔎 Explorar linhas"):
+            _explorar(job.id, tabelas)
+
+
+@st.fragment
+def _explorar(job_id, tabelas):
+    # Fragmento: mexer nos filtros refaz só o explorador, não a tela inteira
+    import explorador
+
+    aba = st.radio("Aba", list(tabelas), horizontal=True, key=f"explorar_aba_{job_id}")
+    caminho = tabelas[aba]
+    limites = explorador.limites(caminho)
+    chave = f"explorar_{job_id}_{aba}"
+    filtros = {}
+
+    col1, col2 = st.columns(2)
+    if limites["status"]:
+        status = col1.multiselect("Status", limites["status"], default=limites["status"], key=f"{chave}_status")
+        if set(status) != set(limites["status"]):
+            filtros["status"] = tuple(sorted(status))
+    if limites["pontuacao"] and limites["pontuacao"][0] < limites["pontuacao"][1]:
+        faixa = tuple(float(v) for v in limites["pontuacao"])
+        pontuacao = col2.slider("Pontuação", *faixa, faixa, key=f"{chave}_pontuacao")
+        if pontuacao != faixa:
+            filtros["pontuacao"] = pontuacao
+    if limites["data"]:
+        faixa = tuple(v.date() for v in limites["data"])
+        data = col1.date_input("Data da venda", faixa, min_value=faixa[0], max_value=faixa[1], key=f"{chave}_data",
+                               format="DD/MM/YYYY")
+        if len(data) == 2 and tuple(data) != faixa:
+            filtros["data"] = tuple(data)
+    if limites["valor"]:
+        faixa = tuple(round(float(v), 2) for v in limites["valor"])
+        minimo, maximo = col2.columns(2)
+        valor = (minimo.number_input("Valor líquido de", value=faixa[0], key=f"{chave}_valor_min"),
+                 maximo.number_input("até", value=faixa[1], key=f"{chave}_valor_max"))
+        if valor != faixa:
+            filtros["valor"] = valor
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    ordem = col1.selectbox("Ordenar por", ["(ordem da planilha)", *limites["colunas"]], key=f"{chave}_ordem")
+    decrescente = col2.toggle("Decrescente", key=f"{chave}_decrescente")
+    tamanho = col3.selectbox("Linhas por página", TAMANHOS_PAGINA, key=f"{chave}_tamanho")
+    if ordem != "(ordem da planilha)":
+        filtros.update(ordenar_por=ordem, crescente=not decrescente)
+
+    posicoes = explorador.recortar(caminho, **filtros)
+    paginas = max(1, -(-len(posicoes) // tamanho))
+    numero = min(st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1,
+                                 key=f"{chave}_pagina"), paginas)
+    st.dataframe(explorador.pagina(caminho, posicoes, numero, tamanho), hide_index=True)
+    inicio = (numero - 1) * tamanho
+    st.caption(f"Linhas {min(inicio + 1, len(posicoes))}–{min(inicio + tamanho, len(posicoes))} "
+               f"de {len(posicoes)}" + (f" (filtradas de {limites['linhas']})" if filtros else ""))
+
+
+def conciliacao_manual(job):
+    """Mesa para resolver à mão as linhas não conciliadas, sem refazer a conciliação (mesa.py)."""
+    mesa = job.resultado.get("mesa")
+    if mesa is not None and len(mesa):
+        with st.expander(f"🧩 Conciliação manual ({len(mesa)} pendências)"):
+            _mesa(job.id, mesa)
+
+
+@st.fragment
+def _mesa(job_id, mesa):
+    for coluna, (rotulo, valor, delta) in zip(st.columns(2), mesa.metricas()):
+        coluna.metric(rotulo, valor, delta)
+
+    pendentes = mesa.pendentes()
+    colunas = COLUNAS_PENDENCIAS + [col for col, _ in mesa.spec["identificadores"]]
+    if pendentes.empty:
+        st.success("✅ Todas as pendências foram conciliadas.")
+    else:
+        st.caption("Escolha uma linha para ver os títulos livres mais prováveis.")
+        # A chave muda a cada par aceito: a seleção antiga não aponta para outra linha
+        escolha = st.dataframe(pendentes[[c for c in colunas if c in pendentes.columns]], hide_index=True,
+                               on_select="rerun", selection_mode="single-row",
+                               key=f"mesa_pendentes_{job_id}_{len(mesa.aceitas)}")
+        if escolha.selection.rows:
+            linha = int(pendentes.index[escolha.selection.rows[0]])
+            candidatos = mesa.candidatos(linha)
+            if candidatos.empty:
+                st.info("Nenhum título livre com data, valor ou identificador parecidos.")
+            else:
+                titulo = st.dataframe(candidatos, hide_index=True, on_select="rerun", selection_mode="single-row",
+                                      key=f"mesa_candidatos_{job_id}_{linha}")
+                if titulo.selection.rows and st.button("✅ Aceitar par", key=f"mesa_aceitar_{job_id}_{linha}"):
+                    j = titulo.selection.rows[0]
+                    mesa.aceitar(linha, int(candidatos.index[j]), float(candidatos["Pontuação"].iloc[j]))
+                    st.rerun(scope="fragment")
+
+    if mesa.aceitas:
+        st.subheader(f"Conciliações manuais ({len(mesa.aceitas)})")
+        manuais = mesa.manuais()
+        st.dataframe(manuais, hide_index=True)
+        col1, col2 = st.columns(2)
+        desfazer = col1.selectbox("Desfazer a linha", list(mesa.aceitas), key=f"mesa_desfazer_{job_id}",
+                                  format_func=lambda linha: f"{linha} · chave {manuais.at[linha, 'Chave ERP']}")
+        if col1.button("↩️ Desfazer", key=f"mesa_desfazer_botao_{job_id}"):
+            mesa.desfazer(desfazer)
+            st.rerun(scope="fragment")
+        col2.download_button("📥 Baixar conciliações manuais", data=mesa.exportar(),
+                             file_name="Conciliações_manuais.xlsx", key=f"mesa_baixar_{job_id}",
+                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+COLUNAS_DESEMPENHO = {
+    "etapa": "Etapa",
+    "linhas": "Linhas",
+    "parede_s": "Tempo (s)",
+    "cpu_s": "CPU (s)",
+    "rss_pico_mb": "Pico RSS (MB)",
+    "linhas_por_s": "Linhas/s",
+}
+
+
+def exibir_desempenho(desempenho):
+    """Painel recolhível com a telemetria da execução (telemetria.py)."""
+    import pandas as pd  # só quando há resultado: a tela inicial não carrega o pandas
+
+    with st.expander("⏱️ Desempenho"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Tempo total", f"{desempenho['parede_total_s']:.1f} s")
+        col2.metric("CPU", f"{desempenho['cpu_total_s']:.1f} s")
+        col3.metric("Pico de memória", f"{desempenho['rss_pico_mb']:.0f} MB")
+
+        etapas = pd.DataFrame(desempenho["etapas"])
+        st.dataframe(etapas[list(COLUNAS_DESEMPENHO)].rename(columns=COLUNAS_DESEMPENHO), hide_index=True)
+        st.caption(" · ".join(f"{a['nome']} ({(a['bytes'] or 0) / 1024:,.0f} KB)" for a in desempenho["arquivos"]))
+
+        motor = desempenho.get("motor")
+        if motor and (motor["candidatos"] or motor["resolvidas"]):
+            exibir_metricas_motor(motor)
+
+
+def exibir_metricas_motor(motor):
+    """Contadores do motor (metricas.py): candidatos por linha, fuzz.ratio, cache e resolvidas."""
+    import pandas as pd
+
+    st.markdown("**Motor de conciliação**")
+    if motor["resolvidas"]:
+        st.dataframe(
+            pd.DataFrame(motor["resolvidas"].items(), columns=["Etapa", "Linhas resolvidas"]),
+            hide_index=True,
+        )
+    if motor["candidatos"]:
+        tabela = pd.DataFrame([
+            {"Etapa": etapa, "Linhas": dados["linhas"], "Média de candidatos": dados["media"],
+             "fuzz.ratio": motor["fuzz_ratio"].get(etapa, 0), **dados["buckets"]}
+            for etapa, dados in motor["candidatos"].items()
+        ])
+        st.caption("Candidatos ERP avaliados por linha (quantidade de linhas em cada faixa)")
+        st.dataframe(tabela, hide_index=True)
+    cache = motor.get("cache_similaridade")
+    if cache and cache["acertos"] + cache["faltas"]:
+        st.caption(f"Cache de similaridade: {cache['taxa_acerto']:.0%} de acertos "
+                   f"({cache['acertos'] + cache['faltas']:,} consultas)")
@@ -0,0 +1,151 @@
+"""
+Perfilamento opcional das etapas da conciliação
+Descrição: quando ligado, cada etapa medida pela telemetria também é perfilada com
+cProfile e/ou com um amostrador de pilhas. Ao final da execução são gravados, na pasta
+do job, um .prof e um resumo .txt por etapa e um arquivo de pilhas "colapsadas"
+(formato do flamegraph.pl / speedscope) com todas as etapas.
+
+Como ligar:
+- variável de ambiente CONCILIA_PROFILE=cprofile | amostragem | ambos
+- launcher: python launcher.py --perfil ambos
+- interface: abrir o app com ?debug na URL e ligar "Perfilar conciliação" na barra lateral
+"""
+
+import io
+import os
+import sys
+import logging
+import pstats
+import cProfile
+import threading
+import unicodedata
+from collections import Counter
+
+
+CPROFILE = "cprofile"
+AMOSTRAGEM = "amostragem"
+MODOS = (CPROFILE, AMOSTRAGEM)
+
+# Intervalo entre amostras de pilha (segundos)
+INTERVALO_AMOSTRAS = 0.005
+# Linhas do resumo de cada etapa (ordenado por tempo acumulado)
+LINHAS_RESUMO = 40
+
+PASTA_PERFIL = "perfil"
+ARQUIVO_PILHAS = "pilhas.collapsed"
+
+
+def modos_do_ambiente(valor=None):
+    """
+    Interpreta CONCILIA_PROFILE (ou `valor`): lista separada por vírgulas de MODOS,
+    "ambos", ou qualquer valor verdadeiro ("1", "sim") para só o cProfile.
+    """
+    if valor is None:
+        valor = os.environ.get("CONCILIA_PROFILE", "")
+    valor = valor.strip().lower()
+    if valor in ("", "0", "nao", "não", "false"):
+        return ()
+    if valor == "ambos":
+        return MODOS
+    modos = tuple(m for m in (p.strip() for p in valor.split(",")) if m in MODOS)
+    return modos or (CPROFILE,)
+
+
+class _AmostradorPilhas(threading.Thread):
+    """Amostra a pilha da thread do job e conta as pilhas colapsadas."""
+
+    def __init__(self, id_thread, intervalo):
+        super().__init__(daemon=True, name="perfil-amostras")
+        self.id_thread = id_thread
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.id_thread)
+            if frame is not None:
+                self.pilhas[_colapsar(frame)] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        return self.pilhas
+
+
+def _colapsar(frame):
+    quadros = []
+    while frame is not None:
+        codigo = frame.f_code
+        nome = f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}"
+        quadros.append(nome.replace(";", ","))
+        frame = frame.f_back
+    return ";".join(reversed(quadros))
+
+
+class Perfilador:
+    """Guarda os perfis das etapas de uma execução até o relatório ser salvo."""
+
+    def __init__(self, modos):
+        self.modos = tuple(modos)
+        self.perfis = {}       # etapa -> cProfile.Profile
+        self.pilhas = Counter()
+        # As etapas do ERP terminam na thread de leitura (ingestao.LeituraDoErp)
+        self._trava = threading.Lock()
+
+    def iniciar(self, etapa):
+        """Liga os perfiladores na thread atual; devolve o objeto passado a `parar`."""
+        sessao = {"etapa": etapa}
+        if AMOSTRAGEM in self.modos:
+            sessao["amostrador"] = _AmostradorPilhas(threading.get_ident(), INTERVALO_AMOSTRAS)
+            sessao["amostrador"].start()
+        if CPROFILE in self.modos:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+                sessao["perfil"] = perfil
+            except ValueError as e:
+                # Python 3.12+: só um cProfile ativo por vez (ex: dois jobs perfilados juntos)
+                logging.warning(f"cProfile indisponível na etapa {etapa}: {e}")
+        return sessao
+
+    def parar(self, sessao):
+        etapa = sessao["etapa"]
+        if "perfil" in sessao:
+            sessao["perfil"].disable()
+            self.perfis[etapa] = sessao["perfil"]
+        if "amostrador" in sessao:
+            pilhas = sessao["amostrador"].parar()
+            with self._trava:
+                # A etapa vira a raiz das pilhas para separar as etapas no flame graph
+                for pilha, n in pilhas.items():
+                    self.pilhas[f"{etapa};{pilha}"] += n
+
+    def salvar(self, pasta_saida):
+        """Grava os arquivos de perfil e devolve a lista de caminhos."""
+        pasta = os.path.join(pasta_saida, PASTA_PERFIL)
+        os.makedirs(pasta, exist_ok=True)
+        caminhos = []
+
+        for i, (etapa, perfil) in enumerate(self.perfis.items(), start=1):
+            base = os.path.join(pasta, f"{i:02d}_{_nome_arquivo(etapa)}")
+            perfil.dump_stats(base + ".prof")
+            texto = io.StringIO()
+            pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(LINHAS_RESUMO)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(texto.getvalue())
+            caminhos += [base + ".prof", base + ".txt"]
+
+        if self.pilhas:
+            caminho = os.path.join(pasta, ARQUIVO_PILHAS)
+            with open(caminho, "w", encoding="utf-8") as f:
+                for pilha, n in self.pilhas.most_common():
+                    f.write(f"{pilha} {n}\n")
+            caminhos.append(caminho)
+
+        return caminhos
+
+
+def _nome_arquivo(etapa):
+    ascii_ = unicodedata.normalize("NFKD", etapa).encode("ascii", "ignore").decode()
+    return "_".join("".join(c if c.isalnum() else " " for c in ascii_).split()).lower()
@@ -0,0 +1,292 @@
+"""
+Motores de referência (congelados)
+Descrição: cópia das buscas do código anterior às otimizações (commit 0fd13ba), sem a
+interface Streamlit: a busca gulosa da Cielo, a da CredShop (com o laço que refazia o
+arquivo inteiro a cada linha) e as duas passadas do Santander. As linhas de base de
+equivalencia.py foram geradas com estas funções; toda conciliação diferente delas está
+aprovada, com o motivo, em equivalencia/aprovacoes.json.
+
+Não altere a lógica deste módulo: uma correção de regra entra nos motores do app e é
+aprovada como diferença (equivalencia.py --aprovar). Em relação ao original, só mudou:
+- a penalidade de "Pessoa do Título" (101) virou parâmetro, para comparar os motores com
+  outras penalidades;
+- o laço repetido da CredShop para quando uma volta inteira não encontra mais nenhum
+  candidato (as voltas seguintes seriam idênticas a ela);
+- a 2ª passada do Santander não roda com zero pendências (o apply do original falharia);
+- logs de depuração e prints removidos.
+"""
+
+import logging
+
+import pandas as pd
+from rapidfuzz import fuzz
+
+
+PENALIDADE_PESSOA = 101
+PESSOA_SANTANDER = "Getnet Adquirencia E Servicos Para Meios de Pagamento S.a."
+
+
+# =========================
+# Cielo
+# =========================
+def conciliar_cielo(df_cielo, df_erp, tolerancia_dias=5, tolerancia_valor=0.20, penalidade=PENALIDADE_PESSOA):
+    df_cielo = df_cielo.copy()
+    df_erp = df_erp.copy()
+
+    df_erp["Chave"] = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64")
+    df_erp["Usada"] = False
+
+    df_cielo["Autorização ERP"] = None
+    df_cielo["NSU ERP"] = None
+    df_cielo["Chave ERP"] = None
+    df_cielo["Valor ERP"] = None
+    df_cielo["Emissão ERP"] = None
+    df_cielo["Parcela ERP"] = None
+    df_cielo["Total Parcelas ERP"] = None
+    df_cielo["Pessoa do Título"] = None
+    df_cielo["Status"] = "Não conciliado"
+    df_cielo["Pontuação"] = 999
+
+    for i, row in df_cielo.iterrows():
+        if pd.isna(row["AUTORIZAÇÃO"]) or pd.isna(row["NSU/DOC"]):
+            continue
+
+        candidatos = df_erp[
+            (~df_erp["Usada"]) &
+            (abs((df_erp["Emissão"] - row["DATA DA VENDA"]).dt.days) <= tolerancia_dias) &
+            (abs(df_erp["Valor"] - row["VALOR DA PARCELA"]) <= tolerancia_valor) &
+            (df_erp["Numero da Parcela"] == row["PARCELA"]) &
+            (df_erp["Total Parcelas"] == row["TOTAL_PARCELAS"])
+        ]
+
+        melhor = None
+        menor_pontuacao = float("inf")
+
+        for _, linha in candidatos.iterrows():
+            dias_dif = abs((linha["Emissão"] - row["DATA DA VENDA"]).days)
+            valor_dif = abs(linha["Valor"] - row["VALOR DA PARCELA"])
+            sim_aut = fuzz.ratio(str(linha["Autorização"]), str(row["AUTORIZAÇÃO"]))
+            sim_nsu = fuzz.ratio(str(linha["NSU"]), str(row["NSU/DOC"]))
+
+            pontuacao = dias_dif * 10 + valor_dif * 100 + (100 - sim_aut) + (100 - sim_nsu)
+            if "Pessoa do Título" in linha and linha["Pessoa do Título"] != "Cielo":
+                pontuacao += penalidade
+
+            if pontuacao < menor_pontuacao:
+                menor_pontuacao = pontuacao
+                melhor = linha
+
+        if melhor is not None:
+            # O original marca o primeiro título com a mesma Chave, não necessariamente o escolhido
+            idx_erp = df_erp.index[df_erp["Chave"] == melhor["Chave"]].tolist()
+            if idx_erp:
+                df_erp.at[idx_erp[0], "Usada"] = True
+
+            df_cielo.at[i, "Autorização ERP"] = melhor["Autorização"]
+            df_cielo.at[i, "NSU ERP"] = melhor["NSU"]
+            df_cielo.at[i, "Chave ERP"] = melhor["Chave"]
+            df_cielo.at[i, "Valor ERP"] = melhor["Valor"]
+            df_cielo.at[i, "Emissão ERP"] = melhor["Emissão"]
+            df_cielo.at[i, "Parcela ERP"] = melhor["Numero da Parcela"]
+            df_cielo.at[i, "Total Parcelas ERP"] = melhor["Total Parcelas"]
+            df_cielo.at[i, "Pessoa do Título"] = melhor.get("Pessoa do Título", None)
+            df_cielo.at[i, "Status"] = "Conciliado"
+            df_cielo.at[i, "Pontuação"] = round(menor_pontuacao, 0)
+
+    return df_cielo, df_erp
+
+
+# =========================
+# CredShop
+# =========================
+def conciliar_credshop(df_credshop, df_erp, tolerancia_dias=5, tolerancia_valor=0.20, penalidade=PENALIDADE_PESSOA):
+    df_credshop = df_credshop.copy()
+    df_erp = df_erp.copy()
+
+    df_erp["Chave"] = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64")
+    df_erp["Usada"] = False
+
+    df_credshop["NSU ERP"] = None
+    df_credshop["Chave ERP"] = None
+    df_credshop["Valor ERP"] = None
+    df_credshop["Emissão ERP"] = None
+    df_credshop["Parcela ERP"] = None
+    df_credshop["Total Parcelas ERP"] = None
+    df_credshop["Pessoa do Título"] = None
+    df_credshop["Status"] = "Não conciliado"
+    df_credshop["Pontuação"] = 999
+
+    # O original repetia a busca inteira uma vez por linha do arquivo. Cada volta revê as
+    # linhas contra os títulos que sobraram: a linha cujo título da volta anterior foi
+    # marcado como usado passa para o melhor título ainda livre (o anterior continua usado).
+    for _ in range(len(df_credshop)):
+        encontrou = False
+        for i, row in df_credshop.iterrows():
+            if pd.isna(row["NSU/DOC"]):
+                continue
+
+            candidatos = df_erp[
+                (~df_erp["Usada"]) &
+                (abs((df_erp["Emissão"] - row["DATA DA VENDA"]).dt.days) <= tolerancia_dias) &
+                (abs(df_erp["Valor"] - row["VALOR DA PARCELA"]) <= tolerancia_valor) &
+                (df_erp["Numero da Parcela"] == row["PARCELA"]) &
+                (df_erp["Total Parcelas"] == row["TOTAL_PARCELAS"])
+            ]
+
+            melhor = None
+            menor_pontuacao = float("inf")
+
+            for _, linha in candidatos.iterrows():
+                dias_dif = abs((linha["Emissão"] - row["DATA DA VENDA"]).days)
+                valor_dif = abs(linha["Valor"] - row["VALOR DA PARCELA"])
+                sim_nsu = fuzz.ratio(str(linha["NSU"]), str(row["NSU/DOC"]))
+
+                pontuacao = dias_dif * 10 + valor_dif * 100 + (100 - sim_nsu)
+                if "Pessoa do Título" in linha and linha["Pessoa do Título"] != "Credishop":
+                    pontuacao += penalidade
+
+                if pontuacao < menor_pontuacao:
+                    menor_pontuacao = pontuacao
+                    melhor = linha
+
+            if melhor is not None:
+                encontrou = True
+                idx_erp = df_erp.index[df_erp["Chave"] == melhor["Chave"]].tolist()
+                if idx_erp:
+                    df_erp.at[idx_erp[0], "Usada"] = True
+
+                df_credshop.at[i, "NSU ERP"] = melhor["NSU"]
+                df_credshop.at[i, "Chave ERP"] = melhor["Chave"]
+                df_credshop.at[i, "Valor ERP"] = melhor["Valor"]
+                df_credshop.at[i, "Emissão ERP"] = melhor["Emissão"]
+                df_credshop.at[i, "Parcela ERP"] = melhor["Numero da Parcela"]
+                df_credshop.at[i, "Total Parcelas ERP"] = melhor["Total Parcelas"]
+                df_credshop.at[i, "Pessoa do Título"] = melhor.get("Pessoa do Título", None)
+                df_credshop.at[i, "Status"] = "Conciliado"
+                df_credshop.at[i, "Pontuação"] = round(menor_pontuacao, 0)
+        if not encontrou:
+            break
+
+    return df_credshop, df_erp
+
+
+# =========================
+# Santander
+# =========================
+def selecionar_melhor_por_pontuacao_com_autorizacao_e_nsu(row, df_erp_base, tolerancia_dias=5, tolerancia_valor=0.20,
+                                                          incluir_detalhes=False, penalidade=PENALIDADE_PESSOA):
+    candidatos = df_erp_base[
+        (df_erp_base["Emissão"] - row["DATA DA VENDA"]).abs().dt.days <= tolerancia_dias
+    ]
+
+    candidatos = candidatos[
+        (candidatos["Valor"] - row["VALOR DA PARCELA"]).abs() <= tolerancia_valor
+    ]
+
+    candidatos = candidatos[
+        (candidatos["Parcela"] == row["PARCELA"]) &
+        (candidatos["Total_Parcelas"] == row["TOTAL_PARCELAS"])
+    ]
+
+    if candidatos.empty:
+        if incluir_detalhes:
+            return pd.Series([None, None, None, None, None, None, "Não Conciliado", 999])
+        return pd.Series([None, None, None, None, "Não Conciliado", 999])
+
+    melhor_resultado = None
+    menor_pontuacao = float("inf")
+
+    for _, linha in candidatos.iterrows():
+        dias_dif = abs((linha["Emissão"] - row["DATA DA VENDA"]).days)
+        valor_dif = abs(linha["Valor"] - row["VALOR DA PARCELA"])
+
+        aut_sant = str(row["AUTORIZAÇÃO"]).strip()
+        aut_erp = str(linha["Autorização"]).strip()
+        nsu_sant = str(row["NÚMERO COMPROVANTE DE VENDA (NSU)"]).strip()
+        nsu_erp = str(linha["NSU"]).strip()
+
+        if aut_sant == aut_erp or nsu_sant == nsu_erp:
+            sim_autorizacao = 100
+            sim_nsu = 100
+        else:
+            sim_autorizacao = fuzz.ratio(aut_sant, aut_erp)
+            sim_nsu = fuzz.ratio(nsu_sant, nsu_erp)
+
+        pontuacao = dias_dif * 100 + valor_dif * 100 + (200 - (sim_autorizacao + sim_nsu))
+        if "Pessoa do Título" in linha and linha["Pessoa do Título"] != PESSOA_SANTANDER:
+            pontuacao += penalidade
+
+        if pontuacao < menor_pontuacao:
+            menor_pontuacao = pontuacao
+            melhor_resultado = (
+                linha["Autorização"],
+                linha["NSU"],
+                linha["Chave"],
+                linha["Valor"],
+                dias_dif,
+                valor_dif,
+                "Conciliado por Similaridade",
+                round(pontuacao, 2)
+            )
+
+    if melhor_resultado:
+        if incluir_detalhes:
+            return pd.Series(melhor_resultado)
+        return pd.Series(melhor_resultado[:4] + melhor_resultado[-2:])  # sem dias/valor
+    if incluir_detalhes:
+        return pd.Series([None, None, None, None, None, None, "Não Conciliado", 999])
+    return pd.Series([None, None, None, None, "Não Conciliado", 999])
+
+
+def marcar_duplicados_com_pior_score(df, chave_col="Chave ERP", status_col="Status", pontuacao_col="Pontuação"):
+    duplicadas = df[df.duplicated(subset=[chave_col], keep=False)].copy()
+    if duplicadas.empty:
+        return df
+    duplicadas_sorted = duplicadas.sort_values(pontuacao_col, ascending=True)
+    duplicadas_marcadas = duplicadas_sorted.duplicated(subset=[chave_col], keep="first")
+    df.loc[duplicadas_sorted[duplicadas_marcadas].index, status_col] = "Valor Duplicado Menor Score"
+    df.loc[duplicadas_sorted[duplicadas_marcadas].index, pontuacao_col] = 998
+    return df
+
+
+def conciliar_santander(df_santander, df_erp, penalidade=PENALIDADE_PESSOA):
+    """
+    `df_santander` já sem os cancelamentos (santander.separar_cancelados). Retorna
+    (df_conciliado, df_nao_conciliado, df_erp).
+    """
+    df_erp = df_erp.copy()
+    df_segunda_conciliacao = df_santander.filter(items=[
+        "EC CENTRALIZADOR", "DATA DE VENCIMENTO", "TIPO DE LANÇAMENTO", "PARCELAS", "AUTORIZAÇÃO",
+        "NÚMERO COMPROVANTE DE VENDA (NSU)", "DATA DA VENDA", "VALOR DA PARCELA", "VALOR LÍQUIDO", "PARCELA",
+        "TOTAL_PARCELAS"])
+
+    resultados = [selecionar_melhor_por_pontuacao_com_autorizacao_e_nsu(row, df_erp, penalidade=penalidade)
+                  for _, row in df_segunda_conciliacao.iterrows()]
+    df_segunda_conciliacao[["Autorização ERP", "NSU ERP", "Chave ERP", "Valor ERP", "Status", "Pontuação"]] = \
+        pd.DataFrame(resultados, index=df_segunda_conciliacao.index)
+
+    df_terceira_conciliacao = df_segunda_conciliacao[df_segunda_conciliacao["Pontuação"] == 999].copy()
+    df_segunda_conciliacao = df_segunda_conciliacao[df_segunda_conciliacao["Pontuação"] != 999].copy()
+    df_segunda_conciliacao = marcar_duplicados_com_pior_score(df_segunda_conciliacao)
+    duplicados = df_segunda_conciliacao[df_segunda_conciliacao["Pontuação"] == 998].copy()
+    df_segunda_conciliacao = df_segunda_conciliacao[df_segunda_conciliacao["Pontuação"] != 998].copy()
+    df_terceira_conciliacao = pd.concat([df_terceira_conciliacao, duplicados], ignore_index=True)
+
+    df_conciliado = df_segunda_conciliacao
+    df_nao_conciliado = df_terceira_conciliacao
+
+    df_erp["Chave"] = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64")
+    df_conciliado["Chave ERP"] = pd.to_numeric(df_conciliado["Chave ERP"], errors="coerce").astype("Int64")
+    chaves_utilizadas = df_conciliado["Chave ERP"].dropna().unique()
+    df_erp["Usada"] = df_erp["Chave"].isin(chaves_utilizadas)
+    df_erp_disponivel = df_erp[~df_erp["Usada"]].copy()
+
+    if len(df_nao_conciliado):
+        df_nao_conciliado[["Autorização ERP", "NSU ERP", "Chave ERP", "Valor ERP", "DIF_DIAS", "DIF_VALOR", "Status",
+                           "Pontuação"]] = df_nao_conciliado.apply(
+            lambda row: selecionar_melhor_por_pontuacao_com_autorizacao_e_nsu(
+                row, df_erp_disponivel, 30, 100000.00, True, penalidade=penalidade),
+            axis=1
+        )
+    logging.debug(f"Referência Santander: {len(df_conciliado)} conciliados, {len(df_nao_conciliado)} não conciliados")
+    return df_conciliado, df_nao_conciliado, df_erp
@@ -0,0 +1,73 @@
+"""
+Cache de similaridade entre identificadores
+Descrição: os mesmos pares (autorização/NSU da adquirente, autorização/NSU do ERP) são
+pontuados várias vezes: as parcelas de uma venda repetem os códigos e o Santander pontua
+os não conciliados de novo na passada com tolerância maior. `ratio` é o fuzz.ratio com
+um cache LRU limitado (CONCILIA_CACHE_SIMILARIDADE pares, padrão 100 mil, uns 25 MB),
+compartilhado por todas as passadas e conciliações do processo.
+
+A chave é o par de textos exatamente como o conciliador os compara, então a pontuação não
+muda. O kernel compilado (kernel.py) calcula a similaridade dentro do laço, onde uma
+consulta ao cache custaria tanto quanto a conta, e não usa este cache.
+
+Acertos e faltas são contados por execução: dentro de `contando(contagem)` (cada etapa
+medida pela telemetria), as consultas vão para a Contagem daquela execução, mesmo com
+outras conciliações usando o cache ao mesmo tempo. Consultas fora de uma etapa (mesa de
+conciliação, funções do DuckDB em threads próprias) não contam para nenhuma execução.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from rapidfuzz import fuzz
+
+
+LIMITE = int(os.environ.get("CONCILIA_CACHE_SIMILARIDADE", "100000"))
+
+_contagem = ContextVar("contagem_similaridade", default=None)
+
+
+class Contagem:
+    """Consultas e faltas do cache de uma execução (as lojas em paralelo somam juntas)."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.faltas = 0
+        self._trava = threading.Lock()
+
+    def _consultar(self):
+        with self._trava:
+            self.consultas += 1
+
+    def _faltar(self):
+        with self._trava:
+            self.faltas += 1
+
+
+@contextmanager
+def contando(contagem):
+    """Conta em `contagem` as consultas feitas no bloco (nesta thread)."""
+    token = _contagem.set(contagem)
+    try:
+        yield contagem
+    finally:
+        _contagem.reset(token)
+
+
+def ratio(texto_adquirente, texto_erp):
+    """fuzz.ratio com cache: chame sempre com (texto da adquirente, texto do ERP)."""
+    contagem = _contagem.get()
+    if contagem is not None:
+        contagem._consultar()
+    return _ratio(texto_adquirente, texto_erp)
+
+
+@lru_cache(maxsize=LIMITE)
+def _ratio(texto_adquirente, texto_erp):
+    contagem = _contagem.get()
+    if contagem is not None:
+        contagem._faltar()
+    return fuzz.ratio(texto_adquirente, texto_erp)
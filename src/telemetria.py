@@ -0,0 +1,139 @@
+"""
+Telemetria de recursos da conciliação
+Descrição: mede cada etapa do pipeline (leitura, limpeza, passadas de conciliação e
+exportação) com tempo de parede, tempo de CPU, pico de memória (RSS amostrado com psutil)
+e linhas por segundo. O resultado aparece no painel "Desempenho" e é gravado em JSON ao
+lado da planilha final, junto dos contadores do motor (metricas.py). Com o perfilamento
+ligado (perfil.py), as mesmas etapas são perfiladas.
+
+Observações:
+- O tempo de CPU é o da thread que executou a etapa (time.thread_time), que não mistura
+  as outras conciliações rodando no mesmo servidor. Leitura e limpeza do ERP rodam na
+  thread de leitura (ingestao.py), sobrepostas às da adquirente.
+- O RSS é do processo inteiro: com jobs simultâneos, o pico inclui os vizinhos.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+import psutil
+
+import similaridade
+from perfil import Perfilador, modos_do_ambiente
+from metricas import Metricas
+
+
+# Intervalo entre amostras de RSS durante uma etapa (segundos)
+INTERVALO_AMOSTRAGEM = 0.05
+NOME_RELATORIO = "relatorio_execucao.json"
+
+MB = 1024 * 1024
+
+
+class _AmostradorRSS(threading.Thread):
+    """Thread que registra o maior RSS do processo enquanto a etapa roda."""
+
+    def __init__(self, processo, intervalo):
+        super().__init__(daemon=True, name="telemetria-rss")
+        self.processo = processo
+        self.intervalo = intervalo
+        self.pico = processo.memory_info().rss
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, self.processo.memory_info().rss)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        self.pico = max(self.pico, self.processo.memory_info().rss)
+        return self.pico
+
+
+class Telemetria:
+    def __init__(self, banco=None, arquivos=(), intervalo=INTERVALO_AMOSTRAGEM, perfil=None):
+        """`perfil`: modos de perfil.MODOS; None segue a variável CONCILIA_PROFILE."""
+        self.banco = banco
+        self.arquivos = [_descrever_arquivo(a) for a in arquivos]
+        self.intervalo = intervalo
+        self.inicio = datetime.now()
+        self.etapas = []
+        self._processo = psutil.Process()
+        self._relogio = time.perf_counter()
+        # Contadores do motor, preenchidos pelos conciliadores
+        self.metricas = Metricas()
+        modos = modos_do_ambiente() if perfil is None else perfil
+        self.perfilador = Perfilador(modos) if modos else None
+
+    @contextmanager
+    def etapa(self, nome, linhas=0):
+        """
+        Mede o bloco `with`. O dicionário entregue permite informar as linhas processadas
+        depois de conhecidas: `registro["linhas"] = len(df)`.
+        """
+        registro = {"etapa": nome, "linhas": linhas}
+        amostrador = _AmostradorRSS(self._processo, self.intervalo)
+        amostrador.start()
+        inicio = time.perf_counter()
+        cpu_inicio = time.thread_time()
+        sessao_perfil = self.perfilador.iniciar(nome) if self.perfilador else None
+        try:
+            with similaridade.contando(self.metricas.similaridade):
+                yield registro
+        finally:
+            if sessao_perfil is not None:
+                self.perfilador.parar(sessao_perfil)
+            parede = time.perf_counter() - inicio
+            registro["parede_s"] = round(parede, 3)
+            registro["cpu_s"] = round(time.thread_time() - cpu_inicio, 3)
+            registro["rss_pico_mb"] = round(amostrador.parar() / MB, 1)
+            registro["rss_final_mb"] = round(self._processo.memory_info().rss / MB, 1)
+            registro["linhas_por_s"] = round(registro["linhas"] / parede, 1) if parede > 0 else None
+            self.etapas.append(registro)
+            logging.info(
+                f"⏱️ {nome}: {registro['parede_s']}s (CPU {registro['cpu_s']}s), "
+                f"pico {registro['rss_pico_mb']} MB, {registro['linhas']} linhas"
+            )
+
+    def resumo(self):
+        return {
+            "banco": self.banco,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "arquivos": self.arquivos,
+            "parede_total_s": round(time.perf_counter() - self._relogio, 3),
+            "cpu_total_s": round(sum(e["cpu_s"] for e in self.etapas), 3),
+            "rss_pico_mb": max((e["rss_pico_mb"] for e in self.etapas), default=None),
+            "etapas": self.etapas,
+            "motor": self.metricas.resumo(),
+        }
+
+    def salvar(self, pasta_saida):
+        """Grava o relatório da execução em JSON e devolve o caminho."""
+        relatorio = self.resumo()
+        if self.perfilador is not None:
+            relatorio["perfil"] = {
+                "modos": list(self.perfilador.modos),
+                "arquivos": [os.path.relpath(c, pasta_saida) for c in self.perfilador.salvar(pasta_saida)],
+            }
+        relatorio["metricas"] = os.path.basename(self.metricas.salvar(pasta_saida, self.banco, self.etapas))
+        caminho = os.path.join(pasta_saida, NOME_RELATORIO)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        return caminho
+
+
+def _descrever_arquivo(arquivo):
+    nome = getattr(arquivo, "name", str(arquivo))
+    tamanho = getattr(arquivo, "size", None)
+    if tamanho is None:
+        try:
+            tamanho = os.fstat(arquivo.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            tamanho = len(arquivo.getbuffer()) if hasattr(arquivo, "getbuffer") else None
+    return {"nome": os.path.basename(nome), "bytes": tamanho}
@@ -0,0 +1,564 @@
+"""
+Simulação de tolerâncias (e se...?)
+Descrição: o financeiro ajusta tolerancia_dias e tolerancia_valor (5 dias / R$ 0,20; no
+Santander, 30 dias / R$ 100000 na passada de tolerância maior) rodando a conciliação
+inteira de novo a cada tentativa. Aqui os pares candidatos (linha da adquirente x título
+ERP) são gerados uma vez, na maior tolerância da grade, e pontuados uma vez; cada cenário
+só filtra a tabela de pares e refaz a atribuição:
+
+- Cielo / CredShop: a busca gulosa de motor.conciliar_guloso (linha a linha, título usado
+  sai da disputa, família de parcelas confirmada primeiro).
+- Santander: melhor título por linha na 1ª passada, desempate das chaves duplicadas e
+  passada de tolerância maior contra os títulos livres. Os pares da tolerância maior são
+  gerados só para as linhas que sobram, uma vez por linha, e reaproveitados entre cenários.
+
+No Santander a varredura é a conciliação do app (etapas.py). Na Cielo e na CredShop o app
+usa motor.conciliar_guloso, e a varredura fica para a simulação e a prévia (amostra.py),
+com o mesmo resultado (a varredura roda como mais um motor em equivalencia.py).
+
+Uso: python varredura.py cielo ERP.csv CIELO.xlsx [--dias 1 3 5 10] [--valor 0.05 0.2 1] [--csv saida.csv]
+"""
+
+import sys
+import logging
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+import similaridade
+from motor import (chave_familia_erp, chave_venda, preparar_resultado, registrar_resultados,
+                   LIMIAR_CONFIANCA_FAMILIA, PENALIDADE_PESSOA)
+
+
+DIAS_PADRAO = (1, 3, 5, 7, 10)
+VALOR_PADRAO = (0.05, 0.20, 0.50, 1.00)
+# Tolerâncias usadas pelo app (cenário de referência da comparação)
+TOLERANCIA_DIAS = 5
+TOLERANCIA_VALOR = 0.20
+# Linhas da adquirente por junção com o ERP e pares por junção antes de dividir o bloco
+# (limitam a memória da geração de pares)
+LINHAS_POR_BLOCO = 2000
+LIMITE_PARES_POR_BLOCO = 2_000_000
+
+
+# =========================
+# Pares candidatos
+# =========================
+def _similaridades(textos_adq, textos_erp):
+    """similaridade.ratio de cada par, calculado uma vez por par distinto."""
+    codigos, unicos = pd.factorize(pd.MultiIndex.from_arrays([textos_adq, textos_erp]))
+    valores = np.fromiter((similaridade.ratio(a, e) for a, e in unicos), dtype=np.float64, count=len(unicos))
+    return valores[codigos]
+
+
+def _gerar_pares(adq, erp, dias_max, valor_max, dias_do_filtro):
+    """
+    Junta adquirente e ERP por parcela/total e mantém os pares dentro das tolerâncias.
+    `dias_do_filtro` reproduz como cada conciliador conta os dias ao filtrar.
+
+    A junção não cresce com o histórico do ERP: a adquirente vai em blocos de datas
+    próximas e cada bloco só encontra os títulos emitidos na sua faixa de datas (com folga
+    de dias_max). Um bloco que ainda passaria de LIMITE_PARES_POR_BLOCO pares é dividido.
+    """
+    # Sem data não há par: a diferença de dias seria NaN e nunca passaria no filtro
+    adq = adq[adq["data"].notna()].sort_values("data", kind="stable")
+    erp = erp[erp["emissao"].notna()].sort_values("emissao", kind="stable")
+    emissoes = erp["emissao"].to_numpy()
+    folga = pd.Timedelta(days=dias_max + 1)
+
+    partes = []
+    blocos = [(inicio, min(inicio + LINHAS_POR_BLOCO, len(adq))) for inicio in range(0, len(adq), LINHAS_POR_BLOCO)]
+    while blocos:
+        inicio, fim = blocos.pop()
+        bloco = adq.iloc[inicio:fim]
+        datas = bloco["data"]
+        faixa = erp.iloc[np.searchsorted(emissoes, (datas.iloc[0] - folga).to_datetime64(), side="left"):
+                         np.searchsorted(emissoes, (datas.iloc[-1] + folga).to_datetime64(), side="right")]
+        por_parcela = faixa.groupby(["parcela", "total"]).size().rename("_titulos").reset_index()
+        estimativa = bloco[["parcela", "total"]].merge(por_parcela, on=["parcela", "total"])["_titulos"].sum()
+        if estimativa > LIMITE_PARES_POR_BLOCO and fim - inicio > 1:
+            meio = (inicio + fim) // 2
+            blocos += [(inicio, meio), (meio, fim)]
+            continue
+
+        pares = bloco.merge(faixa, on=["parcela", "total"])
+        diferenca = pares["emissao"] - pares["data"]
+        pares["dias"] = dias_do_filtro(diferenca)
+        pares["dias_pontuacao"] = diferenca.dt.days.abs()
+        pares["dif_valor"] = (pares["valor_erp"] - pares["valor"]).abs()
+        partes.append(pares[(pares["dias"] <= dias_max) & (pares["dif_valor"] <= valor_max)])
+    if not partes:
+        return adq.merge(erp.iloc[:0], on=["parcela", "total"]).assign(dias=0, dias_pontuacao=0, dif_valor=0.0)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _com_penalidade(base, pessoa_errada, penalidade):
+    # Soma a penalidade por último, como os conciliadores (pontuações empatadas continuam empatadas)
+    return base + np.where(pessoa_errada, penalidade, 0)
+
+
+def _contar_por_linha(mascara, ponteiros):
+    """Pares marcados em `mascara` por linha da adquirente."""
+    acumulado = np.concatenate([[0], np.cumsum(mascara)])
+    return acumulado[ponteiros[1:]] - acumulado[ponteiros[:-1]]
+
+
+class _Varredura:
+    """
+    Base das varreduras. Etapas (cada uma pode ser guardada e reaproveitada, ver etapas.py):
+    o construtor gera os pares, `pontuar(penalidade)` ordena os candidatos de cada linha e
+    `atribuir(pontuados, dias, valor)` resolve um cenário.
+    """
+
+    def _guardar_pares(self, pares, n_linhas):
+        self.n_pares = len(pares)
+        self._linha = pares["linha"].to_numpy()
+        self._pos = pares["pos"].to_numpy()
+        self._base = pares["base"].to_numpy()
+        self._pessoa_errada = pares["pessoa_errada"].to_numpy(dtype=bool)
+        self._dias = pares["dias"].to_numpy()
+        self._dif_valor = pares["dif_valor"].to_numpy()
+        self._n_linhas = n_linhas
+        self._pontuados = {}
+
+    def pontuar(self, penalidade=PENALIDADE_PESSOA):
+        """Candidatos de cada linha em ordem de (pontuação, posição no ERP)."""
+        if penalidade not in self._pontuados:
+            pontuacao = _com_penalidade(self._base, self._pessoa_errada, penalidade)
+            ordem = self._ordenar(pontuacao)
+            self._pontuados[penalidade] = {
+                "penalidade": penalidade,
+                "ordem": ordem,
+                "pos": self._pos[ordem],
+                "pontuacao": pontuacao[ordem],
+                "dias": self._dias[ordem],
+                "dif_valor": self._dif_valor[ordem],
+                "ponteiros": np.searchsorted(self._linha[ordem], np.arange(self._n_linhas + 1)),
+            }
+        return self._pontuados[penalidade]
+
+    def _ordenar(self, pontuacao):
+        return np.lexsort((self._pos, pontuacao, self._linha))
+
+    def cenario(self, tolerancia_dias, tolerancia_valor, penalidade=PENALIDADE_PESSOA):
+        return self.atribuir(self.pontuar(penalidade), tolerancia_dias, tolerancia_valor)
+
+    def resumo(self, grade, referencia=(TOLERANCIA_DIAS, TOLERANCIA_VALOR)):
+        """Uma linha por cenário: conciliados, não conciliados e mudanças em relação à `referencia`."""
+        base = self.cenario(*referencia)["melhor"]
+        linhas = []
+        for dias, valor in grade:
+            cenario = self.cenario(dias, valor)
+            conciliado = cenario["conciliado"]
+            linha = {
+                "Tolerância dias": dias,
+                "Tolerância valor": valor,
+                "Conciliados": int(conciliado.sum()),
+                "Valor conciliado": round(float(self.valor_liquido[conciliado].sum()), 2),
+                "Não conciliados": int((~conciliado).sum()),
+                "Valor não conciliado": round(float(self.valor_liquido[~conciliado].sum()), 2),
+                "Pontuação média": round(float(cenario["pontuacao"][conciliado].mean()), 2) if conciliado.any() else None,
+                "Mudanças": int((cenario["melhor"] != base).sum()),
+            }
+            for rotulo, mascara in cenario.get("extras", {}).items():
+                linha[rotulo] = int(mascara.sum())
+            linhas.append(linha)
+        return pd.DataFrame(linhas)
+
+
+# =========================
+# Busca gulosa (Cielo / CredShop)
+# =========================
+class VarreduraGulosa(_Varredura):
+    def __init__(self, df_adq, df_erp, spec, dias_max, valor_max, propagar_familias=True):
+        identificadores = spec["identificadores"]
+        colunas_id = [col_adq for col_adq, _ in identificadores]
+        self.spec = spec
+        self.propagar_familias = propagar_familias
+        self.n = len(df_adq)
+        self.chaves = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64").to_numpy()
+        self.familia = pd.factorize(chave_familia_erp(df_erp), sort=False)[0]
+        self.valor_liquido = df_adq["VALOR LÍQUIDO"].to_numpy(dtype=np.float64)
+
+        self.valida = ~df_adq[colunas_id].isna().any(axis=1).to_numpy()
+        self.vendas = [
+            chave_venda(row, colunas_id) if propagar_familias and ok else None
+            for ok, (_, row) in zip(self.valida, df_adq[colunas_id + ["DATA DA VENDA", "TOTAL_PARCELAS"]].iterrows())
+        ]
+
+        adq = pd.DataFrame({
+            "linha": np.arange(self.n),
+            "data": df_adq["DATA DA VENDA"].to_numpy(),
+            "valor": df_adq["VALOR DA PARCELA"].to_numpy(dtype=np.float64),
+            "parcela": df_adq["PARCELA"].to_numpy(),
+            "total": df_adq["TOTAL_PARCELAS"].to_numpy(),
+        })
+        erp = pd.DataFrame({
+            "pos": np.arange(len(df_erp)),
+            "emissao": df_erp["Emissão"].to_numpy(),
+            "valor_erp": df_erp["Valor"].to_numpy(dtype=np.float64),
+            "parcela": df_erp["Numero da Parcela"].to_numpy(),
+            "total": df_erp["Total Parcelas"].to_numpy(),
+            "pessoa_errada": (df_erp["Pessoa do Título"] != spec["pessoa_titulo"]).to_numpy()
+            if "Pessoa do Título" in df_erp.columns else False,
+        })
+        # Mesmo texto que o conciliador compara: str() de cada valor
+        for k, (col_adq, col_erp) in enumerate(identificadores):
+            adq[f"id_{k}"] = [str(v) for v in df_adq[col_adq].astype(object)]
+            erp[f"id_erp_{k}"] = [str(v) for v in df_erp[col_erp].astype(object)]
+
+        pares = self._gerar(adq[self.valida], erp, dias_max, valor_max, len(identificadores))
+        self._guardar_pares(pares, self.n)
+        self._usada = np.zeros(len(df_erp), dtype=bool)
+
+    def _gerar(self, adq, erp, dias_max, valor_max, n_identificadores):
+        pares = _gerar_pares(adq, erp, dias_max, valor_max, lambda diferenca: diferenca.dt.days.abs())
+        # Mesma ordem de soma do motor
+        base = pares["dias_pontuacao"].to_numpy() * 10 + pares["dif_valor"].to_numpy() * 100
+        for k in range(n_identificadores):
+            base = base + (100 - _similaridades(pares[f"id_{k}"].to_numpy(), pares[f"id_erp_{k}"].to_numpy()))
+        pares["base"] = base
+        return pares
+
+    def atribuir(self, pontuados, tolerancia_dias, tolerancia_valor):
+        """Atribuição gulosa só com os pares dentro das tolerâncias."""
+        pos, pontuacoes, ponteiros = pontuados["pos"], pontuados["pontuacao"], pontuados["ponteiros"]
+        dentro = (pontuados["dias"] <= tolerancia_dias) & (pontuados["dif_valor"] <= tolerancia_valor)
+        usada = self._usada.copy()
+        melhor = np.full(self.n, -1, dtype=np.int64)
+        pontuacao = np.full(self.n, np.nan)
+        via_familia = np.zeros(self.n, dtype=bool)
+        candidatos = np.where(self.valida, _contar_por_linha(dentro, ponteiros), -1)
+        confirmadas = {}
+
+        for r in range(self.n):
+            inicio, fim = ponteiros[r], ponteiros[r + 1]
+            if inicio == fim:
+                continue
+            indices = inicio + np.flatnonzero(dentro[inicio:fim])
+            escolhido = -1
+            venda = self.vendas[r]
+            # 1️ Família já confirmada: só os títulos dela, se algum estiver livre
+            if venda is not None and venda in confirmadas:
+                for j in indices:
+                    p = pos[j]
+                    if self.familia[p] == confirmadas[venda] and not usada[p]:
+                        escolhido = j
+                        via_familia[r] = True
+                        break
+            # 2️ Busca normal: o de menor pontuação ainda livre
+            if escolhido < 0:
+                for j in indices:
+                    if not usada[pos[j]]:
+                        escolhido = j
+                        break
+            if escolhido < 0:
+                continue
+
+            p = pos[escolhido]
+            usada[p] = True
+            melhor[r] = p
+            pontuacao[r] = pontuacoes[escolhido]
+            if venda is not None and pontuacao[r] <= LIMIAR_CONFIANCA_FAMILIA:
+                confirmadas.setdefault(venda, self.familia[p])
+
+        return {"melhor": melhor, "pontuacao": pontuacao, "conciliado": melhor >= 0,
+                "via_familia": via_familia, "candidatos": candidatos}
+
+    def conciliar(self, df_adq, df_erp, cenario, metricas=None):
+        """(df_adq, df_erp) do cenário, com as mesmas colunas de motor.conciliar_guloso."""
+        identificadores = self.spec["identificadores"]
+        df_adq, df_erp = preparar_resultado(df_adq, df_erp, identificadores)
+        return registrar_resultados(df_adq, df_erp, identificadores, cenario["melhor"], cenario["pontuacao"],
+                                    cenario["via_familia"], cenario["candidatos"], self.propagar_familias, metricas)
+
+    def resultado(self, df_adq, tolerancia_dias=TOLERANCIA_DIAS, tolerancia_valor=TOLERANCIA_VALOR):
+        """df_adq com Chave ERP, Status e Pontuação do cenário (colunas do motor)."""
+        cenario = self.cenario(tolerancia_dias, tolerancia_valor)
+        conciliado = cenario["conciliado"]
+        df = df_adq.copy()
+        df["Chave ERP"] = pd.array(np.where(conciliado, self.chaves[np.maximum(cenario["melhor"], 0)], pd.NA),
+                                   dtype="Int64")
+        df["Status"] = np.where(conciliado, "Conciliado", "Não conciliado")
+        df["Pontuação"] = [round(p, 0) if ok else 999 for p, ok in zip(cenario["pontuacao"], conciliado)]
+        return df
+
+
+# =========================
+# Santander
+# =========================
+class VarreduraSantander(_Varredura):
+    def __init__(self, df_adq, df_erp, dias_max, valor_max, tolerancia_ampla=(30, 100000.00)):
+        from santander import ADAPTADOR_SANTANDER
+
+        spec = ADAPTADOR_SANTANDER.spec
+        colunas_id = [col for col, _ in spec["identificadores"]]
+        self.n = len(df_adq)
+        self.tolerancia_ampla = tolerancia_ampla
+        self.chaves = pd.to_numeric(df_erp["Chave"], errors="coerce").astype("Int64").to_numpy()
+        # Chave como está no ERP: é por ela que o conciliador acha a família e os duplicados
+        self._chaves_brutas = df_erp["Chave"].to_numpy()
+        familias = chave_familia_erp(df_erp)
+        self.familia = pd.factorize(familias, sort=False)[0]
+        # Como no conciliador original: a última ocorrência de uma chave vale
+        codigo_da_familia = dict(zip(familias, self.familia))
+        self._familia_da_chave = {chave: codigo_da_familia[f] for chave, f in zip(self._chaves_brutas, familias)}
+        self.valor_liquido = df_adq["VALOR LÍQUIDO"].to_numpy(dtype=np.float64)
+        self.vendas = [chave_venda(row, colunas_id)
+                       for _, row in df_adq[colunas_id + ["DATA DA VENDA", "TOTAL_PARCELAS"]].iterrows()]
+
+        self._adq = pd.DataFrame({
+            "linha": np.arange(self.n),
+            "data": df_adq["DATA DA VENDA"].to_numpy(),
+            "valor": df_adq["VALOR DA PARCELA"].to_numpy(dtype=np.float64),
+            "parcela": df_adq["PARCELA"].to_numpy(),
+            "total": df_adq["TOTAL_PARCELAS"].to_numpy(),
+            "autorizacao": [str(v).strip() for v in df_adq["AUTORIZAÇÃO"].astype(object)],
+            "nsu": [str(v).strip() for v in df_adq["NÚMERO COMPROVANTE DE VENDA (NSU)"].astype(object)],
+        })
+        self._erp = pd.DataFrame({
+            "pos": np.arange(len(df_erp)),
+            "emissao": df_erp["Emissão"].to_numpy(),
+            "valor_erp": df_erp["Valor"].to_numpy(dtype=np.float64),
+            "parcela": df_erp["Parcela"].to_numpy(),
+            "total": df_erp["Total_Parcelas"].to_numpy(),
+            "pessoa_errada": (df_erp["Pessoa do Título"] != spec["pessoa_titulo"]).to_numpy()
+            if "Pessoa do Título" in df_erp.columns else False,
+            "autorizacao_erp": [str(v).strip() for v in df_erp["Autorização"].astype(object)],
+            "nsu_erp": [str(v).strip() for v in df_erp["NSU"].astype(object)],
+        })
+
+        pares = self._gerar(self._adq, dias_max, valor_max)
+        self._guardar_pares(pares, self.n)
+        self._exato = pares["exato"].to_numpy()
+        # Pares da tolerância maior, gerados sob demanda para as linhas que sobram (a
+        # varredura pode ser compartilhada entre conciliações simultâneas, ver etapas.py)
+        self._amplos = {}
+        self._trava = threading.Lock()
+
+    def _gerar(self, adq, dias_max, valor_max):
+        # Santander filtra por (Emissão - data).abs().dt.days
+        pares = _gerar_pares(adq, self._erp, dias_max, valor_max, lambda diferenca: diferenca.abs().dt.days)
+        exato = ((pares["autorizacao"] == pares["autorizacao_erp"]) | (pares["nsu"] == pares["nsu_erp"])).to_numpy()
+        sim_aut = np.where(exato, 100.0, _similaridades(pares["autorizacao"].to_numpy(), pares["autorizacao_erp"].to_numpy()))
+        sim_nsu = np.where(exato, 100.0, _similaridades(pares["nsu"].to_numpy(), pares["nsu_erp"].to_numpy()))
+        pares["base"] = (pares["dias_pontuacao"].to_numpy() * 100 + pares["dif_valor"].to_numpy() * 100
+                         + (200 - (sim_aut + sim_nsu)))
+        pares["exato"] = exato
+        return pares[["linha", "pos", "base", "pessoa_errada", "dias", "dias_pontuacao", "dif_valor", "exato"]]
+
+    def _pares_amplos(self, linhas, penalidade):
+        """{linha: pares da tolerância maior em ordem de pontuação}, só para `linhas`."""
+        with self._trava:
+            faltando = [r for r in linhas if r not in self._amplos]
+            if faltando:
+                pares = self._gerar(self._adq.iloc[faltando], *self.tolerancia_ampla)
+                grupos = {r: {coluna: grupo[coluna].to_numpy()
+                              for coluna in ("pos", "base", "pessoa_errada", "dias_pontuacao", "dif_valor")}
+                          for r, grupo in pares.groupby("linha", sort=False)}
+                for r in faltando:
+                    self._amplos[r] = grupos.get(r, {})
+
+        ordenados = {}
+        for r in linhas:
+            pares = self._amplos[r]
+            if not pares:
+                continue
+            pontuacao = _com_penalidade(pares["base"], pares["pessoa_errada"], penalidade)
+            ordem = np.lexsort((pares["pos"], pontuacao))
+            ordenados[r] = (pares["pos"][ordem], pontuacao[ordem], pares["dias_pontuacao"][ordem],
+                            pares["dif_valor"][ordem])
+        return ordenados
+
+    def atribuir(self, pontuados, tolerancia_dias, tolerancia_valor):
+        from santander import marcar_duplicados_com_pior_score
+
+        pos, pontuacoes, ponteiros = pontuados["pos"], pontuados["pontuacao"], pontuados["ponteiros"]
+        exatos = self._exato[pontuados["ordem"]]
+        dentro = (pontuados["dias"] <= tolerancia_dias) & (pontuados["dif_valor"] <= tolerancia_valor)
+        melhor = np.full(self.n, -1, dtype=np.int64)
+        pontuacao = np.full(self.n, np.nan)
+        via_familia = np.zeros(self.n, dtype=bool)
+        exata = np.zeros(self.n, dtype=bool)
+        confirmadas = {}
+
+        # 1ª passada: melhor título por linha (sem marcar usados), família confirmada primeiro
+        for r in range(self.n):
+            inicio, fim = ponteiros[r], ponteiros[r + 1]
+            indices = inicio + np.flatnonzero(dentro[inicio:fim])
+            escolhido = -1
+            venda = self.vendas[r]
+            if venda in confirmadas:
+                da_familia = indices[self.familia[pos[indices]] == confirmadas[venda]]
+                if len(da_familia):
+                    escolhido = da_familia[0]
+                    via_familia[r] = True
+            if escolhido < 0 and len(indices):
+                escolhido = indices[0]
+            if escolhido < 0:
+                continue
+            melhor[r] = pos[escolhido]
+            exata[r] = exatos[escolhido]
+            pontuacao[r] = round(float(pontuacoes[escolhido]), 2)
+            if venda is not None and pontuacao[r] <= LIMIAR_CONFIANCA_FAMILIA:
+                confirmadas.setdefault(venda, self._familia_da_chave.get(self._chaves_brutas[melhor[r]]))
+        primeira_passada = (melhor.copy(), pontuacao.copy())
+
+        # Chaves ERP duplicadas: fica a linha de menor pontuação (mesmo desempate do conciliador)
+        conciliadas = np.flatnonzero(melhor >= 0)
+        desempate = marcar_duplicados_com_pior_score(pd.DataFrame({
+            "Chave ERP": self._chaves_brutas[melhor[conciliadas]],
+            "Status": "Conciliado por Similaridade",
+            "Pontuação": pontuacao[conciliadas],
+        }, index=conciliadas))
+        duplicadas = np.zeros(self.n, dtype=bool)
+        duplicadas[desempate.index[desempate["Pontuação"] == 998]] = True
+        primeira = (melhor >= 0) & ~duplicadas
+
+        # Tolerância maior: as que sobraram contra os títulos livres
+        usadas = pd.Series(self.chaves[melhor[primeira]], dtype="Int64").dropna().unique()
+        livre = ~pd.Series(self.chaves, dtype="Int64").isin(usadas).to_numpy()
+        restantes = np.flatnonzero(~primeira)
+        melhor[restantes] = -1
+        pontuacao[restantes] = np.nan
+        dif_dias = np.full(self.n, -1, dtype=np.int64)
+        dif_valor = np.full(self.n, np.nan)
+        for r, (posicoes, pontuacoes_r, dias_r, valores_r) in self._pares_amplos(
+                restantes.tolist(), pontuados["penalidade"]).items():
+            livres = np.flatnonzero(livre[posicoes])
+            if len(livres):
+                j = livres[0]
+                melhor[r] = posicoes[j]
+                pontuacao[r] = round(float(pontuacoes_r[j]), 2)
+                dif_dias[r] = dias_r[j]
+                dif_valor[r] = valores_r[j]
+
+        conciliado = melhor >= 0
+        return {
+            "melhor": melhor,
+            "pontuacao": pontuacao,
+            "conciliado": primeira,
+            "duplicadas": duplicadas,
+            "primeira_passada": primeira_passada,
+            "via_familia": via_familia,
+            "exata": exata,
+            "dif_dias": dif_dias,
+            "dif_valor": dif_valor,
+            "candidatos": _contar_por_linha(dentro, ponteiros),
+            "extras": {"Encontrados na tolerância maior": conciliado & ~primeira, "Duplicados desfeitos": duplicadas},
+        }
+
+    def conciliar(self, df_santander, df_erp, cenario, metricas=None):
+        """(df_conciliado, df_nao_conciliado, df_erp) do cenário, com as colunas de cada passada (santander.py)."""
+        from santander import (COLUNAS_CONCILIACAO, COLUNAS_1A_PASSADA, COLUNAS_TOLERANCIA_MAIOR,
+                               marcar_e_filtrar_chaves_utilizadas)
+
+        autorizacoes = df_erp["Autorização"].to_numpy(dtype=object)
+        nsus = df_erp["NSU"].to_numpy(dtype=object)
+        valores = df_erp["Valor"].to_numpy(dtype=object)
+
+        def titulo(p):
+            return autorizacoes[p], nsus[p], self._chaves_brutas[p], valores[p]
+
+        melhor_1a, pontuacao_1a = cenario["primeira_passada"]
+        df = df_santander.filter(items=COLUNAS_CONCILIACAO)
+        df[COLUNAS_1A_PASSADA] = pd.DataFrame(
+            [(*titulo(p), "Conciliado por Similaridade", s) if p >= 0 else (None, None, None, None, "Não Conciliado", 999)
+             for p, s in zip(melhor_1a, pontuacao_1a)],
+            index=df.index)
+
+        # Não conciliadas na 1ª passada e, depois delas, as duplicadas desfeitas
+        primeira, duplicadas = cenario["conciliado"], cenario["duplicadas"]
+        restantes = np.concatenate([np.flatnonzero(melhor_1a < 0), np.flatnonzero(duplicadas)])
+        df_conciliado = df.iloc[np.flatnonzero(primeira)].copy()
+        df_nao_conciliado = pd.concat([df.iloc[np.flatnonzero(melhor_1a < 0)], df.iloc[np.flatnonzero(duplicadas)]],
+                                      ignore_index=True)
+        melhor, pontuacao = cenario["melhor"], cenario["pontuacao"]
+        df_nao_conciliado[COLUNAS_TOLERANCIA_MAIOR] = pd.DataFrame(
+            [(*titulo(melhor[r]), cenario["dif_dias"][r], cenario["dif_valor"][r], "Conciliado por Similaridade",
+              pontuacao[r]) if melhor[r] >= 0 else (None, None, None, None, None, None, "Não Conciliado", 999)
+             for r in restantes],
+            index=df_nao_conciliado.index, columns=range(len(COLUNAS_TOLERANCIA_MAIOR)))
+
+        df_erp, _ = marcar_e_filtrar_chaves_utilizadas(df_erp.copy(deep=False), df_conciliado)
+
+        if metricas is not None:
+            metricas.observar_candidatos_lote("1a_passada", cenario["candidatos"])
+            via_familia = cenario["via_familia"] & (melhor_1a >= 0)
+            metricas.resolver("familia", int(via_familia.sum()))
+            pela_busca = (melhor_1a >= 0) & ~via_familia
+            metricas.resolver("exata", int((pela_busca & cenario["exata"]).sum()))
+            metricas.resolver("similaridade", int((pela_busca & ~cenario["exata"]).sum()))
+            metricas.resolver("duplicados_desfeitos", int(duplicadas.sum()))
+            metricas.resolver("tolerancia_maior", int((melhor[restantes] >= 0).sum()))
+        return df_conciliado, df_nao_conciliado, df_erp
+
+    def resultado(self, df_adq, tolerancia_dias=TOLERANCIA_DIAS, tolerancia_valor=TOLERANCIA_VALOR):
+        cenario = self.cenario(tolerancia_dias, tolerancia_valor)
+        encontrado = cenario["melhor"] >= 0
+        df = df_adq.copy()
+        df["Chave ERP"] = pd.array(np.where(encontrado, self.chaves[np.maximum(cenario["melhor"], 0)], pd.NA),
+                                   dtype="Int64")
+        df["Status"] = np.where(encontrado, "Conciliado por Similaridade", "Não Conciliado")
+        df["Pontuação"] = np.where(encontrado, cenario["pontuacao"], 999)
+        return df
+
+
+# =========================
+# Entrada
+# =========================
+def preparar(banco, df_adq, df_erp, dias_max=TOLERANCIA_DIAS, valor_max=TOLERANCIA_VALOR, usar_duckdb=None):
+    """
+    Pares candidatos até (dias_max, valor_max), prontos para qualquer cenário dentro deles.
+    `usar_duckdb`: pares gerados e ordenados no DuckDB (analitico.py); None segue CONCILIA_DUCKDB.
+    """
+    import analitico
+
+    if analitico.ATIVO if usar_duckdb is None else usar_duckdb:
+        return analitico.preparar(banco, df_adq, df_erp, dias_max, valor_max)
+    if banco == "santander":
+        return VarreduraSantander(df_adq, df_erp, dias_max, valor_max)
+    from adquirentes import ADQUIRENTES
+
+    return VarreduraGulosa(df_adq, df_erp, ADQUIRENTES[banco], dias_max, valor_max)
+
+
+def conciliar(banco, df_adq, df_erp, tolerancia_dias=TOLERANCIA_DIAS, tolerancia_valor=TOLERANCIA_VALOR):
+    """Um cenário só, com as colunas de resultado do conciliador do banco."""
+    varredura = preparar(banco, df_adq, df_erp, tolerancia_dias, tolerancia_valor)
+    return varredura.resultado(df_adq, tolerancia_dias, tolerancia_valor)
+
+
+def varrer(banco, df_adq, df_erp, dias=DIAS_PADRAO, valores=VALOR_PADRAO):
+    """Resumo dos cenários da grade dias x valores, comparados com as tolerâncias do app."""
+    grade = [(d, v) for d in dias for v in valores]
+    varredura = preparar(banco, df_adq, df_erp, max(max(dias), TOLERANCIA_DIAS), max(max(valores), TOLERANCIA_VALOR))
+    logging.info(f"🧮 {varredura.n_pares} pares candidatos pontuados para {len(grade)} cenários")
+    return varredura.resumo(grade)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("banco", choices=["cielo", "credshop", "santander"])
+    parser.add_argument("erp")
+    parser.add_argument("adquirente")
+    parser.add_argument("--dias", nargs="+", type=int, default=list(DIAS_PADRAO))
+    parser.add_argument("--valor", nargs="+", type=float, default=list(VALOR_PADRAO))
+    parser.add_argument("--csv", help="grava a comparação neste arquivo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from equivalencia import carregar_caso
+
+    df_adq, df_erp = carregar_caso(args.banco, args.erp, args.adquirente)
+    resumo = varrer(args.banco, df_adq, df_erp, args.dias, args.valor)
+    print(resumo.to_string(index=False))
+    if args.csv:
+        resumo.to_csv(args.csv, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Vigia de pastas
+Descrição: modo serviço, sem a interface. Observa as pastas de entrada de cada adquirente
+("conciliação cielo/", "conciliação credshop/", "conciliação santander/") e concilia cada
+arquivo novo da adquirente contra o ERP mais recente da mesma pasta. A planilha e o
+relatório da execução vão para <saida>/<banco>/<nome do arquivo>/, gravados numa pasta
+temporária e renomeados no fim (quem lê a saída nunca vê uma planilha pela metade).
+
+- Descoberta por varredura periódica (INTERVALO s): funciona em qualquer sistema e em
+  pastas de rede, onde o inotify não enxerga as gravações de outras máquinas. Um arquivo
+  só entra quando tamanho e data de modificação não mudam entre duas varreduras (cópia
+  terminada); temporários do Excel (~$...) e downloads parciais são ignorados.
+- ERP: o CSV da pasta com o cabeçalho do ERP ("Chave", "Emissão"), o modificado por
+  último. O mesmo ERP é lido uma vez: as próximas conciliações reaproveitam a leitura
+  (etapas.py) e o cache em Parquet (cache_parquet.py).
+- Pool limitado: TRABALHADORES conciliações ao mesmo tempo e no máximo FILA arquivos
+  prontos esperando. Com a fila cheia a varredura para de enfileirar (contrapressão); o
+  que sobrou entra nas próximas varreduras.
+- Estado em <saida>/vigia.json: o que já foi conciliado não é refeito ao reiniciar; um
+  arquivo substituído (outro tamanho ou data) é conciliado de novo.
+
+Uso: python vigia.py [--raiz PASTA] [--saida saidas] [--intervalo 30] [--uma-vez]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import logging
+import argparse
+import importlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from adquirentes import ADQUIRENTES
+from inicializacao import configurar_logging
+from jobs import MAX_JOBS_SIMULTANEOS
+
+
+INTERVALO = float(os.environ.get("CONCILIA_VIGIA_INTERVALO", "30"))  # segundos entre varreduras
+TRABALHADORES = MAX_JOBS_SIMULTANEOS
+FILA = int(os.environ.get("CONCILIA_VIGIA_FILA", "4"))
+PASTA_SAIDA = os.environ.get("CONCILIA_VIGIA_SAIDA", "saidas")
+PREFIXO_PASTA = "conciliação "
+NOME_ESTADO = "vigia.json"
+
+# Em --uma-vez não há segunda varredura: vale a idade do arquivo
+IDADE_MINIMA_S = 5
+PREFIXOS_IGNORADOS = ("~$", ".")
+SUFIXOS_IGNORADOS = (".part", ".tmp", ".crdownload")
+
+
+def pastas_de_entrada(raiz):
+    """{banco: pasta} das pastas "conciliação <banco>" existentes em `raiz`."""
+    pastas = {}
+    for banco in ADQUIRENTES:
+        pasta = os.path.join(raiz, PREFIXO_PASTA + banco)
+        if os.path.isdir(pasta):
+            pastas[banco] = pasta
+    return pastas
+
+
+def eh_erp(caminho):
+    """CSV com o cabeçalho do ERP (primeira linha com "Chave" e "Emissão")."""
+    if not caminho.lower().endswith(".csv"):
+        return False
+    with open(caminho, "rb") as f:
+        cabecalho = f.readline(4096)
+    return b"Chave" in cabecalho and b"Emiss" in cabecalho
+
+
+def _copiar(caminho):
+    # Mesmo formato do upload do app (painel._copiar_upload)
+    with open(caminho, "rb") as f:
+        copia = io.BytesIO(f.read())
+    copia.name = os.path.basename(caminho)
+    return copia
+
+
+class Vigia:
+    def __init__(self, raiz=".", saida=PASTA_SAIDA, intervalo=INTERVALO, trabalhadores=TRABALHADORES, fila=FILA):
+        self.pastas = pastas_de_entrada(raiz)
+        self.saida = saida
+        self.intervalo = intervalo
+        self.trabalhadores = trabalhadores
+        self.parar = threading.Event()
+        self._vagas = threading.BoundedSemaphore(trabalhadores + fila)
+        self._trava = threading.Lock()
+        self._vistos = {}          # caminho -> (tamanho, mtime) da varredura anterior
+        self._em_andamento = set()
+        self._caminho_estado = os.path.join(saida, NOME_ESTADO)
+        self._estado = self._carregar_estado()
+
+    # --- Estado
+    def _carregar_estado(self):
+        try:
+            with open(self._caminho_estado, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _gravar_estado(self):
+        os.makedirs(self.saida, exist_ok=True)
+        temporario = self._caminho_estado + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self._estado, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self._caminho_estado)
+
+    # --- Descoberta
+    @staticmethod
+    def _assinatura(caminho):
+        info = os.stat(caminho)
+        return [info.st_size, info.st_mtime_ns]
+
+    def _pronto(self, caminho, assinatura, uma_vez):
+        if uma_vez:
+            return time.time() - assinatura[1] / 1e9 >= IDADE_MINIMA_S
+        anterior = self._vistos.get(caminho)
+        self._vistos[caminho] = assinatura
+        return anterior == assinatura
+
+    def varrer(self, uma_vez=False):
+        """[(banco, arquivo da adquirente, ERP)] prontos e ainda não conciliados nesta versão."""
+        prontos = []
+        for banco, pasta in self.pastas.items():
+            extensoes = tuple("." + e for e in ADQUIRENTES[banco]["tipos_arquivo"]) + (".zip",)
+            erps, arquivos = [], []
+            for nome in sorted(os.listdir(pasta)):
+                caminho = os.path.join(pasta, nome)
+                if nome.startswith(PREFIXOS_IGNORADOS) or nome.lower().endswith(SUFIXOS_IGNORADOS) \
+                        or not os.path.isfile(caminho):
+                    continue
+                try:
+                    if eh_erp(caminho):
+                        erps.append(caminho)
+                    elif nome.lower().endswith(extensoes):
+                        arquivos.append((caminho, self._assinatura(caminho)))
+                except OSError:  # apagado ou bloqueado durante a varredura
+                    continue
+            if not erps:
+                if arquivos:
+                    logging.warning(f"⚠️ {pasta}: nenhum ERP (CSV com 'Chave' e 'Emissão') para conciliar")
+                continue
+            erp = max(erps, key=os.path.getmtime)
+            for caminho, assinatura in arquivos:
+                registro = self._estado.get(caminho)
+                if registro is not None and registro["assinatura"] == assinatura:
+                    continue
+                with self._trava:
+                    if caminho in self._em_andamento:
+                        continue
+                if self._pronto(caminho, assinatura, uma_vez):
+                    prontos.append((banco, caminho, erp, assinatura))
+        return prontos
+
+    # --- Execução
+    def _conciliar(self, banco, caminho, erp, assinatura):
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        destino = os.path.join(self.saida, banco, nome)
+        temporario = destino + ".parcial"
+        inicio = time.perf_counter()
+        registro = {"assinatura": assinatura, "banco": banco, "erp": os.path.basename(erp),
+                    "quando": datetime.now().isoformat(timespec="seconds")}
+        try:
+            shutil.rmtree(temporario, ignore_errors=True)
+            os.makedirs(temporario)
+            modulo = importlib.import_module(ADQUIRENTES[banco]["modulo"])
+            resultado = modulo.processar(_copiar(erp), [_copiar(caminho)], pasta_saida=temporario)
+            shutil.rmtree(destino, ignore_errors=True)
+            os.replace(temporario, destino)
+            registro.update(estado="Concluído", saida=destino,
+                            metricas=[f"{rotulo}: {valor} ({detalhe})" for rotulo, valor, detalhe in resultado["metricas"]],
+                            avisos=resultado["avisos"])
+            logging.info(f"✅ {banco} · {os.path.basename(caminho)} conciliado em "
+                         f"{time.perf_counter() - inicio:.1f} s -> {destino}")
+        except Exception as e:
+            shutil.rmtree(temporario, ignore_errors=True)
+            registro.update(estado="Erro", erro=str(e))
+            logging.error(f"❌ {banco} · {os.path.basename(caminho)}: {e}", exc_info=True)
+        with self._trava:
+            self._estado[caminho] = registro
+            self._em_andamento.discard(caminho)
+            self._gravar_estado()
+
+    def _enfileirar(self, pool, banco, caminho, erp, assinatura):
+        """Espera uma vaga no pool (contrapressão). False se o vigia foi parado antes."""
+        while not self._vagas.acquire(timeout=1):
+            if self.parar.is_set():
+                return False
+        with self._trava:
+            self._em_andamento.add(caminho)
+        futuro = pool.submit(self._conciliar, banco, caminho, erp, assinatura)
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        logging.info(f"📥 {banco} · {os.path.basename(caminho)} na fila (ERP: {os.path.basename(erp)})")
+        return True
+
+    def executar(self, uma_vez=False):
+        """Varre até ser parado (ou uma vez só, esperando as conciliações terminarem)."""
+        if not self.pastas:
+            raise ValueError("❌ Nenhuma pasta 'conciliação <banco>' encontrada.")
+        logging.info(f"👀 Vigiando {', '.join(self.pastas.values())} -> {self.saida}")
+        with ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="vigia") as pool:
+            while not self.parar.is_set():
+                for pronto in self.varrer(uma_vez):
+                    if not self._enfileirar(pool, *pronto):
+                        break
+                if uma_vez:
+                    break
+                self.parar.wait(self.intervalo)
+        logging.info("🛑 Vigia encerrado")
+        return self._estado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--raiz", default=".", help="pasta com as pastas 'conciliação <banco>'")
+    parser.add_argument("--saida", default=PASTA_SAIDA)
+    parser.add_argument("--intervalo", type=float, default=INTERVALO, help="segundos entre varreduras")
+    parser.add_argument("--uma-vez", action="store_true", help="concilia o que houver e termina")
+    args = parser.parse_args()
+
+    configurar_logging()
+    vigia = Vigia(args.raiz, args.saida, args.intervalo)
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: vigia.parar.set())
+    estado = vigia.executar(uma_vez=args.uma_vez)
+    return 1 if any(r["estado"] == "Erro" for r in estado.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
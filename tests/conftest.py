@@ -0,0 +1,10 @@
+"""
+Testes do app
+Descrição: rode da raiz do repositório com `python -m pytest tests`. Os módulos do app
+ficam soltos em src/ (importados pelo nome, como no app), então src/ entra no sys.path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,104 @@
+import io
+import json
+import threading
+import http.client
+
+import pytest
+
+import api
+
+
+FRONTEIRA = "fronteira-teste"
+TIPO = f"multipart/form-data; boundary={FRONTEIRA}"
+
+
+def _formulario(campos=(), arquivos=()):
+    partes = []
+    for nome, valor in campos:
+        partes.append(f'--{FRONTEIRA}\r\nContent-Disposition: form-data; name="{nome}"\r\n\r\n{valor}\r\n'.encode())
+    for nome, arquivo, conteudo in arquivos:
+        partes.append(f'--{FRONTEIRA}\r\nContent-Disposition: form-data; name="{nome}"; filename="{arquivo}"\r\n'
+                      f'Content-Type: application/octet-stream\r\n\r\n'.encode() + conteudo + b"\r\n")
+    return b"".join(partes) + f"--{FRONTEIRA}--\r\n".encode()
+
+
+ARQUIVOS = [("erp", "erp.csv", b"a;b\r\n1;2\r\n"), ("adquirente", "semana1.xlsx", b"\x00\x01"),
+            ("adquirente", "lote/semana2.xlsx", b"\x02")]
+
+
+def test_ler_formulario_campos_e_arquivos():
+    campos = api.ler_formulario(TIPO, _formulario([("tolerancia_dias", " 3 ")], ARQUIVOS))
+
+    assert campos["tolerancia_dias"] == ["3"]
+    (erp,) = campos["erp"]
+    assert isinstance(erp, io.BytesIO) and erp.name == "erp.csv"
+    assert erp.getvalue() == b"a;b\r\n1;2\r\n"  # conteúdo binário intacto
+    assert [a.name for a in campos["adquirente"]] == ["semana1.xlsx", "semana2.xlsx"]
+
+
+def test_ler_formulario_recusa_outro_tipo():
+    with pytest.raises(api.ErroDaRequisicao) as erro:
+        api.ler_formulario("application/json", b"{}")
+    assert erro.value.status == 415
+
+
+@pytest.mark.parametrize("campos", [
+    {},
+    {"erp": [io.BytesIO(b"x")]},
+    {"erp": ["texto"], "adquirente": [io.BytesIO(b"x")]},
+    {"erp": [io.BytesIO(b"x"), io.BytesIO(b"y")], "adquirente": [io.BytesIO(b"x")]},
+])
+def test_submeter_exige_um_erp_e_ao_menos_uma_adquirente(campos):
+    with pytest.raises(api.ErroDaRequisicao) as erro:
+        api.submeter("cielo", campos)
+    assert erro.value.status == 400
+
+
+def test_submeter_banco_desconhecido():
+    with pytest.raises(api.ErroDaRequisicao) as erro:
+        api.submeter("rede", {})
+    assert erro.value.status == 404
+
+
+@pytest.fixture
+def servidor():
+    servidor = api.criar_servidor(porta=0)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor.server_address[1]
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _post(porta, corpo, tipo=TIPO, cabecalhos=None):
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=10)
+    conexao.request("POST", "/conciliacoes/cielo", body=corpo, headers={"Content-Type": tipo, **(cabecalhos or {})})
+    resposta = conexao.getresponse()
+    retorno = resposta.status, dict(resposta.getheaders()), json.loads(resposta.read())
+    conexao.close()
+    return retorno
+
+
+def test_corpo_acima_do_limite(servidor, monkeypatch):
+    monkeypatch.setattr(api, "LIMITE_MB", 1)
+    status, _, corpo = _post(servidor, b"x", cabecalhos={"Content-Length": str(1024 * 1024 + 1)})
+    assert status == 413
+    assert "1 MB" in corpo["erro"]
+
+
+def test_corpo_sem_tamanho(servidor):
+    status, _, _ = _post(servidor, None)
+    assert status == 411
+
+
+def test_fila_cheia(servidor, monkeypatch):
+    monkeypatch.setattr(api, "MAX_PENDENTES", 0)
+    status, cabecalhos, _ = _post(servidor, _formulario(arquivos=ARQUIVOS))
+    assert status == 429
+    assert cabecalhos["Retry-After"] == str(api.ESPERA_FILA_CHEIA)
+
+
+def test_parametro_invalido(servidor):
+    status, _, corpo = _post(servidor, _formulario([("tolerancia_dias", "cinco")], ARQUIVOS))
+    assert status == 400
+    assert "Parâmetro inválido" in corpo["erro"]
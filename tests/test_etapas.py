@@ -0,0 +1,127 @@
+import io
+import sys
+import types
+
+import pytest
+
+import etapas
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio():
+    etapas.limpar()
+    yield
+    etapas.limpar()
+
+
+@pytest.fixture
+def varredura_falsa(monkeypatch):
+    """Substitui varredura.py e conta quantas vezes cada etapa do Santander é calculada."""
+    chamadas = {"preparar": 0, "pontuar": 0, "atribuir": 0}
+
+    class Pares:
+        n_pares = 10
+
+        def __init__(self, teto):
+            self.teto = teto
+
+        def pontuar(self, penalidade):
+            chamadas["pontuar"] += 1
+            return ("pontuação", penalidade)
+
+        def atribuir(self, pontuacao, dias, valor):
+            chamadas["atribuir"] += 1
+            return ("cenário", pontuacao, dias, valor)
+
+    def preparar(banco, df_adq, df_erp, dias, valor):
+        chamadas["preparar"] += 1
+        return Pares((dias, valor))
+
+    monkeypatch.setitem(sys.modules, "varredura", types.SimpleNamespace(preparar=preparar))
+    return chamadas
+
+
+def _atribuir(leitura="leitura-1", loja=None, **informados):
+    leitura = etapas.Etapa(leitura, None, False)
+    return etapas._atribuir("santander", leitura, [], [], etapas.parametros(informados), None, None, loja)
+
+
+def test_calcular_reaproveita_pela_chave_das_entradas():
+    calculos = []
+    primeira = etapas.calcular("Etapa", ("a", 1), lambda: calculos.append(1) or "valor")
+    segunda = etapas.calcular("Etapa", ("a", 1), lambda: calculos.append(1) or "outro")
+    terceira = etapas.calcular("Etapa", ("a", 2), lambda: calculos.append(1) or "novo")
+
+    assert (primeira.reaproveitada, segunda.reaproveitada, terceira.reaproveitada) == (False, True, False)
+    assert segunda.valor == "valor" and segunda.chave == primeira.chave
+    assert terceira.valor == "novo" and terceira.chave != primeira.chave
+    assert len(calculos) == 2
+
+
+def test_mesmos_parametros_reaproveitam_tudo(varredura_falsa):
+    _atribuir()
+    _atribuir()
+    assert varredura_falsa == {"preparar": 1, "pontuar": 1, "atribuir": 1}
+
+
+def test_tolerancia_refaz_so_a_atribuicao(varredura_falsa):
+    _atribuir()
+    _, cenario = _atribuir(tolerancia_dias=3, tolerancia_valor=0.5)
+    assert varredura_falsa == {"preparar": 1, "pontuar": 1, "atribuir": 2}
+    assert cenario[2:] == (3, 0.5)
+
+
+def test_penalidade_refaz_pontuacao_e_atribuicao(varredura_falsa):
+    _atribuir()
+    _, cenario = _atribuir(penalidade_pessoa=0)
+    assert varredura_falsa == {"preparar": 1, "pontuar": 2, "atribuir": 2}
+    assert cenario[1] == ("pontuação", 0)
+
+
+def test_tolerancia_acima_do_teto_refaz_os_pares(varredura_falsa):
+    _atribuir()
+    pares, _ = _atribuir(tolerancia_dias=etapas.TETO_DIAS + 5)
+    assert varredura_falsa == {"preparar": 2, "pontuar": 2, "atribuir": 2}
+    assert pares.teto == (etapas.TETO_DIAS + 5, etapas.TETO_VALOR)
+
+
+def test_outra_leitura_ou_loja_refaz_tudo(varredura_falsa):
+    _atribuir()
+    _atribuir(leitura="leitura-2")
+    _atribuir(loja="Loja 1")
+    assert varredura_falsa == {"preparar": 3, "pontuar": 3, "atribuir": 3}
+
+
+def test_limite_descarta_as_menos_usadas(monkeypatch):
+    monkeypatch.setattr(etapas, "LIMITE_ETAPAS", 2)
+    etapas.calcular("Etapa", (1,), lambda: 1)
+    etapas.calcular("Etapa", (2,), lambda: 2)
+    etapas.calcular("Etapa", (1,), lambda: 1)  # 1 passa a ser a mais recente
+    etapas.calcular("Etapa", (3,), lambda: 3)  # descarta a 2
+
+    assert etapas.calcular("Etapa", (1,), lambda: None).reaproveitada
+    assert not etapas.calcular("Etapa", (2,), lambda: None).reaproveitada
+
+
+def test_assinatura_muda_com_o_conteudo_e_com_o_leitor(monkeypatch):
+    def arquivo(conteudo):
+        f = io.BytesIO(conteudo)
+        f.name = "erp.csv"
+        return f
+
+    leitor = ("ingestao",)
+    base = etapas.assinatura("cielo", leitor, [arquivo(b"a;b\n1;2\n")], True)
+    assert etapas.assinatura("cielo", leitor, [arquivo(b"a;b\n1;2\n")], True) == base
+    assert etapas.assinatura("cielo", leitor, [arquivo(b"a;b\n1;3\n")], True) != base
+    assert etapas.assinatura("cielo", leitor, [arquivo(b"a;b\n1;2\n")], False) != base
+
+    import cache_parquet
+    monkeypatch.setattr(cache_parquet, "VERSAO", cache_parquet.VERSAO + 1)
+    assert etapas.assinatura("cielo", leitor, [arquivo(b"a;b\n1;2\n")], True) != base
+
+
+def test_parametros_recusa_tolerancia_negativa():
+    assert etapas.parametros() == etapas.PARAMETROS_PADRAO
+    assert etapas.parametros({"tolerancia_dias": None})["tolerancia_dias"] == etapas.PARAMETROS_PADRAO["tolerancia_dias"]
+    with pytest.raises(ValueError):
+        etapas.parametros({"tolerancia_valor": -1})
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+
+from indice_ids import IndiceIdentificadores, normalizar
+
+
+def _codigos(quantidade, semente):
+    gerador = random.Random(semente)
+    codigos = []
+    for _ in range(quantidade):
+        base = "".join(gerador.choice("0123456789") for _ in range(gerador.randint(4, 12)))
+        codigos.append(base)
+        # Variações próximas: um dígito trocado, removido ou inserido, zeros à esquerda
+        i = gerador.randrange(len(base))
+        codigos.append(base[:i] + gerador.choice("0123456789") + base[i + 1:])
+        codigos.append(base[:i] + base[i + 1:])
+        codigos.append("00" + base)
+    return codigos
+
+
+def _forca_bruta(indice, consulta, limiar):
+    texto = normalizar(consulta)
+    return {t for t in indice.textos if fuzz.ratio(texto, t) >= limiar}
+
+
+@pytest.mark.parametrize("limiar", [60, 80, 90, 100])
+def test_buscar_encontra_tudo_que_o_fuzz_ratio_aceita(limiar):
+    codigos = _codigos(300, semente=limiar)
+    indice = IndiceIdentificadores(codigos)
+    consultas = _codigos(40, semente=limiar + 1) + codigos[:40] + ["1", "12"]
+    for consulta in consultas:
+        encontrados = indice.buscar(consulta, limiar)
+        assert {texto for texto, _, _ in encontrados} == _forca_bruta(indice, consulta, limiar), consulta
+
+
+def test_buscar_ordena_e_devolve_posicoes():
+    codigos = ["123456", None, "123457", "123456", float("nan"), "999999"]
+    indice = IndiceIdentificadores(codigos)
+    encontrados = indice.buscar("123456", 80)
+    assert [texto for texto, _, _ in encontrados] == ["123456", "123457"]
+    assert [pontuacao for _, pontuacao, _ in encontrados] == sorted((p for _, p, _ in encontrados), reverse=True)
+    np.testing.assert_array_equal(encontrados[0][2], [0, 3])
+    np.testing.assert_array_equal(encontrados[1][2], [2])
+
+
+def test_normalizacao():
+    assert normalizar(12345.0) == "12345"
+    assert normalizar(" 00-12 ab ") == "0012AB"
+    assert normalizar(float("nan")) is None
+    assert normalizar("") is None
+    indice = IndiceIdentificadores([12345.0, "012345", "12 345"])
+    np.testing.assert_array_equal(indice.exatos("12345"), [0, 2])
+    np.testing.assert_array_equal(indice.exatos(12345), [0, 2])
+    assert indice.exatos("0").size == 0
+    assert indice.buscar(None) == []
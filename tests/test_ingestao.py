@@ -0,0 +1,123 @@
+import io
+import threading
+from concurrent.futures import Future
+
+import pandas as pd
+import pytest
+
+import ingestao
+
+
+def _csv(linhas):
+    texto = "Chave;Emissão;Valor;NSU;Parcela\n" + "\n".join(";".join(map(str, linha)) for linha in linhas) + "\n"
+    arquivo = io.BytesIO(texto.encode("latin1"))
+    arquivo.name = "erp.csv"
+    return arquivo
+
+
+LINHAS = [
+    (1, "01/06/2025", "10.5", "000123", 1),
+    (2, "10/06/2025", "20", "000456", 1),
+    (3, "15/06/2025", "30", "789", 2),
+    (4, "20/06/2025", "40", "000999", 1),
+    (5, "28/06/2025", "50", "1011", 3),
+    (6, "30/07/2025", "60", "A1B2", ""),  # NSU alfanumérico e parcela vazia só no último bloco
+]
+
+
+def test_janela_de_datas_cobre_a_tolerancia_com_folga():
+    datas = pd.Series([pd.Timestamp("2025-06-10"), pd.Timestamp("2025-06-15 13:45"), None])
+    inicio, fim = ingestao.janela_de_datas(datas, 5)
+    margem = 5 + ingestao.FOLGA_DIAS
+    assert inicio == pd.Timestamp("2025-06-10") - pd.Timedelta(days=margem)
+    # Fim exclusivo: o último dia da margem entra inteiro
+    assert fim == pd.Timestamp("2025-06-15") + pd.Timedelta(days=margem + 1)
+
+
+def test_janela_de_datas_sem_data_valida():
+    assert ingestao.janela_de_datas(pd.Series([None, "lixo"]), 5) is None
+
+
+def test_ler_erp_csv_sem_janela_igual_ao_read_csv():
+    esperado = pd.read_csv(_csv(LINHAS), sep=";", encoding="latin1")
+    lido = ingestao.ler_erp_csv(_csv(LINHAS), None)
+    pd.testing.assert_frame_equal(lido, esperado)
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 2, 4, 100])
+def test_ler_erp_csv_recorta_pela_janela(tamanho_bloco):
+    janela = (pd.Timestamp("2025-06-09"), pd.Timestamp("2025-06-21"))
+    estatisticas = {}
+    lido = ingestao.ler_erp_csv(_csv(LINHAS), janela, tamanho_bloco=tamanho_bloco, estatisticas=estatisticas)
+
+    assert lido["Chave"].tolist() == [2, 3, 4]
+    assert estatisticas == {"lidas": len(LINHAS), "mantidas": 3}
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 2, 4, 100])
+def test_ler_erp_csv_infere_tipos_pelo_arquivo_inteiro(tamanho_bloco):
+    inteiro = pd.read_csv(_csv(LINHAS), sep=";", encoding="latin1")
+    janela = (pd.Timestamp("2025-06-09"), pd.Timestamp("2025-06-21"))
+    lido = ingestao.ler_erp_csv(_csv(LINHAS), janela, tamanho_bloco=tamanho_bloco)
+
+    # O NSU alfanumérico ficou fora da janela, mas mantém a coluna como texto (zeros à esquerda)
+    assert lido.dtypes.to_dict() == inteiro.dtypes.to_dict()
+    assert lido["NSU"].tolist() == ["000456", "789", "000999"]
+    assert lido["Valor"].tolist() == [20.0, 30.0, 40.0]  # "10.5" ficou fora da janela
+    assert lido["Parcela"].tolist() == [1.0, 2.0, 1.0]
+
+
+def test_ler_erp_csv_dtype_fixo():
+    janela = (pd.Timestamp("2025-06-01"), pd.Timestamp("2025-07-01"))
+    lido = ingestao.ler_erp_csv(_csv(LINHAS[:5]), janela, dtype={"NSU": str}, tamanho_bloco=2)
+    assert lido["NSU"].tolist() == ["000123", "000456", "789", "000999", "1011"]
+    assert pd.api.types.is_integer_dtype(lido["Parcela"])
+
+
+def test_ler_erp_csv_so_cabecalho():
+    lido = ingestao.ler_erp_csv(_csv([]), (pd.Timestamp("2025-06-01"), pd.Timestamp("2025-07-01")))
+    assert list(lido.columns) == ["Chave", "Emissão", "Valor", "NSU", "Parcela"]
+    assert lido.empty
+
+
+def test_ler_erp_csv_com_janela_que_chega_depois():
+    janela = Future()
+    threading.Timer(0.05, janela.set_result, [(pd.Timestamp("2025-06-09"), pd.Timestamp("2025-06-21"))]).start()
+    lido = ingestao.ler_erp_csv(_csv(LINHAS), janela, tamanho_bloco=1)
+    assert lido["Chave"].tolist() == [2, 3, 4]
+
+
+def _ler(arquivo, janela):
+    return ingestao.ler_erp_csv(arquivo, janela, tamanho_bloco=1)
+
+
+def test_leitura_do_erp_usa_a_janela_da_adquirente():
+    with ingestao.LeituraDoErp(_ler, _csv(LINHAS)) as leitura:
+        leitura.definir_janela(pd.Series(pd.to_datetime(["2025-06-15"])), 4)
+    assert leitura.resultado()["Chave"].tolist() == [2, 3, 4]
+
+
+def test_leitura_do_erp_sem_janela_le_tudo():
+    with ingestao.LeituraDoErp(_ler, _csv(LINHAS), usar_janela=False) as leitura:
+        pass
+    assert leitura.resultado()["Chave"].tolist() == [1, 2, 3, 4, 5, 6]
+
+
+def test_leitura_do_erp_com_erro_na_adquirente():
+    with pytest.raises(ValueError, match="adquirente"):
+        with ingestao.LeituraDoErp(_ler, _csv(LINHAS)):
+            raise ValueError("adquirente inválida")
+
+
+def test_filtrar_janela_e_filtros_da_janela_concordam(tmp_path):
+    df = pd.DataFrame({"Emissão": pd.to_datetime(["2025-06-08 00:00", "2025-06-09 00:00", "2025-06-20 23:59", "2025-06-21 00:00", None]),
+                       "Valor": [1.0, 2.0, 3.0, 4.0, 5.0]})
+    janela = (pd.Timestamp("2025-06-09"), pd.Timestamp("2025-06-21"))
+    recortado = ingestao.filtrar_janela(df, janela)
+    assert recortado["Valor"].tolist() == [2.0, 3.0]
+
+    pytest.importorskip("pyarrow")
+    caminho = tmp_path / "erp.parquet"
+    df.to_parquet(caminho)
+    lido = pd.read_parquet(caminho, filters=ingestao.filtros_da_janela(janela)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(lido, recortado)
@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from adquirentes import ADQUIRENTES
+from mesa import Mesa
+
+
+SPEC = ADQUIRENTES["cielo"]
+
+
+@pytest.fixture
+def erp():
+    return pd.DataFrame({
+        "Chave": [101, 102, 103, 104],
+        "Emissão": pd.to_datetime(["2025-06-10", "2025-06-10", "2025-06-11", "2025-06-10"]),
+        "Valor": [50.0, 50.0, 50.1, 50.0],
+        "Numero da Parcela": [1, 1, 1, 1],
+        "Total Parcelas": [1, 1, 1, 1],
+        "Autorização": ["A1", "A2", "A3", "A4"],
+        "NSU": ["111", "222", "333", "444"],
+        "Pessoa do Título": ["Cielo"] * 4,
+        "Usada": [False, False, False, True],  # 104 já conciliado pela busca automática
+    })
+
+
+@pytest.fixture
+def mesa(erp):
+    linhas = pd.DataFrame({
+        "DATA DA VENDA": pd.to_datetime(["2025-06-10", "2025-06-10"]),
+        "VALOR DA PARCELA": [50.0, 50.0],
+        "VALOR LÍQUIDO": [48.0, 47.0],
+        "PARCELA": [1, 1],
+        "TOTAL_PARCELAS": [1, 1],
+        "AUTORIZAÇÃO": ["A1", "A2"],
+        "NSU/DOC": ["111", "222"],
+    }, index=[7, 9])
+    return Mesa(linhas, erp, SPEC, conciliados=10, liquido_conciliado=1000.0)
+
+
+def _chaves(mesa, linha):
+    return mesa.candidatos(linha)["Chave"].tolist()
+
+
+def test_titulos_usados_pela_busca_nao_sao_candidatos(mesa):
+    assert 104 not in _chaves(mesa, 0)
+    assert _chaves(mesa, 0)[0] == 101  # mesmo identificador, data e valor
+
+
+def test_aceitar_tira_o_titulo_das_outras_linhas(mesa):
+    mesa.aceitar(0, 0, pontuacao=0.0)
+
+    assert 101 not in _chaves(mesa, 1)
+    assert mesa.usada.tolist() == [True, False, False, True]
+    with pytest.raises(ValueError):
+        mesa.aceitar(1, 0)  # título já conciliado
+    with pytest.raises(ValueError):
+        mesa.aceitar(0, 1)  # linha já conciliada
+    assert mesa.usada.tolist() == [True, False, False, True]
+    assert list(mesa.aceitas) == [0]
+
+
+def test_nao_aceita_titulo_da_busca_automatica(mesa):
+    with pytest.raises(ValueError):
+        mesa.aceitar(0, 3)
+    assert not mesa.aceitas
+
+
+def test_totais_acompanham_aceitar_e_desfazer(mesa):
+    mesa.aceitar(0, 0)
+    mesa.aceitar(1, 1)
+    assert (mesa.conciliados, mesa.liquido_conciliado) == (12, 1095.0)
+    assert mesa.pendentes().empty
+    assert mesa.manuais()["Chave ERP"].tolist() == [101, 102]
+
+    mesa.desfazer(0)
+    assert (mesa.conciliados, mesa.liquido_conciliado) == (11, 1047.0)
+    assert mesa.usada.tolist() == [False, True, False, True]
+    assert 101 in _chaves(mesa, 0)
+    assert mesa.pendentes().index.tolist() == [0]
+    assert mesa.metricas()[1] == ("⚠ Não Conciliados", "R$ 48.00", "1 títulos")
+
+
+def test_erp_da_execucao_nao_e_alterado(mesa, erp):
+    mesa.aceitar(0, 0)
+    assert erp["Usada"].tolist() == [False, False, False, True]
+
+
+def test_penalidade_pessoa_da_execucao(erp):
+    erp.loc[1, "Pessoa do Título"] = "Outra"
+    linhas = pd.DataFrame({
+        "DATA DA VENDA": pd.to_datetime(["2025-06-10"]), "VALOR DA PARCELA": [50.0], "VALOR LÍQUIDO": [48.0],
+        "PARCELA": [1], "TOTAL_PARCELAS": [1], "AUTORIZAÇÃO": ["A2"], "NSU/DOC": ["222"],
+    })
+    candidatos = Mesa(linhas, erp, SPEC, 0, 0.0, penalidade_pessoa=7).candidatos(0).set_index("Chave")
+    assert candidatos.at[102, "Pontos pessoa"] == 7
+    assert candidatos.at[101, "Pontos pessoa"] == 0
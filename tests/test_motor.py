@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor import IndiceFamilias, chave_familia_erp
+
+
+@pytest.mark.parametrize("coluna", ["chcriacao", "Ch Criação"])
+def test_chave_familia_sem_valor_nao_forma_familia(coluna):
+    erp = pd.DataFrame({coluna: [10.0, np.nan, np.nan, 10.0]}, index=[5, 6, 7, 8])
+    chave = chave_familia_erp(erp)
+    assert chave.loc[5] == chave.loc[8] == "10.0"
+    assert chave.nunique() == 3
+    assert not chave.isin(["nan"]).any()
+
+
+def test_chave_familia_pelo_prefixo_do_numero():
+    erp = pd.DataFrame({"Numero": ["313522077-4", "313522077-5", None, None]})
+    assert chave_familia_erp(erp).tolist()[:2] == ["313522077", "313522077"]
+    assert chave_familia_erp(erp).nunique() == 3
+
+
+def test_indice_nao_junta_titulos_sem_chave():
+    erp = pd.DataFrame({"chcriacao": [np.nan, np.nan], "Numero da Parcela": [1, 1], "Total Parcelas": [2, 2]})
+    indice = IndiceFamilias(erp)
+    assert [len(rotulos) for rotulos in indice.grupos.values()] == [1, 1]